@@ -1,5 +1,6 @@
 from django.db import models
 from django.conf import settings
+from records.events import publish_audit_events
 from records.models import MailRecord
 
 
@@ -49,6 +50,12 @@ class AuditTrail(models.Model):
     def __str__(self):
         return f"{self.action} - {self.mail_record.sl_no} by {self.performed_by.full_name}"
 
+    def save(self, *args, **kwargs):
+        adding = self._state.adding
+        super().save(*args, **kwargs)
+        if adding:
+            publish_audit_events([self])
+
     @classmethod
     def log_action(cls, mail_record, action, performed_by, remarks='', old_value=None, new_value=None):
         """
@@ -3,6 +3,10 @@ ASGI config for config project.
 
 It exposes the ASGI callable as a module-level variable named ``application``.
 
+Run with uvicorn (``uvicorn config.asgi:application``). Besides the Django app
+this serves the record event stream (records.streams), which is deliberately
+not routed on the WSGI app: every open stream would pin a gunicorn thread.
+
 For more information on this file, see
 https://docs.djangoproject.com/en/6.0/howto/deployment/asgi/
 """
@@ -13,4 +17,14 @@ from django.core.asgi import get_asgi_application
 
 os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'config.settings')
 
-application = get_asgi_application()
+django_application = get_asgi_application()
+
+# Imported after setup: the stream module touches models.
+from records.streams import EVENT_STREAM_PATH, event_stream_app  # noqa: E402
+
+
+async def application(scope, receive, send):
+    if scope['type'] == 'http' and scope['path'] == EVENT_STREAM_PATH:
+        await event_stream_app(scope, receive, send)
+        return
+    await django_application(scope, receive, send)
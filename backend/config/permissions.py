@@ -1,5 +1,7 @@
 from rest_framework import permissions
-from django.db.models import Q
+
+from records.visibility import is_scoped_role, user_can_see_mail
+from users.scope import get_user_scope
 
 
 class IsAG(permissions.BasePermission):
@@ -64,8 +66,9 @@ class MailRecordPermission(permissions.BasePermission):
             'multi_assign', 'assignments', 'update_assignment',
             'complete_assignment', 'add_assignment_remark',
             'reassign_assignment', 'update_current_action',
-            'reassign_candidates', 'assignable_users',
-            'upload_pdf', 'get_pdf_metadata', 'view_pdf',
+            'reassign_candidates', 'assignable_users', 'autocomplete', 'changes',
+            'upload_pdf', 'pdf_upload_url', 'finalize_pdf_upload',
+            'get_pdf_metadata', 'view_pdf',
         ]:
             return True
 
@@ -75,46 +78,20 @@ class MailRecordPermission(permissions.BasePermission):
         """Helper: check if user can view this mail record"""
         if user.role == 'DAG':
             section_id = obj.section_id or (obj.subsection.section_id if obj.subsection_id else None)
-            return bool(section_id and user.sections.filter(id=section_id).exists())
-
-        if user.role == 'SrAO':
-            if user.subsection_id and obj.subsection_id == user.subsection_id:
-                return True
-            if obj.current_handler_id == user.id:
-                return True
-            return self._has_active_assignment(user, obj)
-
-        if user.role == 'AAO':
-            if obj.created_by.role == 'auditor' and user.subsection_id and obj.subsection_id == user.subsection_id:
-                return True
-            if obj.created_by_id == user.id:
-                return True
-            if obj.current_handler_id == user.id:
-                return True
-            return self._has_active_assignment(user, obj)
+            return get_user_scope(user).manages_section(section_id)
 
-        if user.role in ['clerk', 'auditor']:
-            if obj.created_by_id == user.id:
-                return True
-            if obj.current_handler_id == user.id:
-                return True
-            return self._has_active_assignment(user, obj)
+        if is_scoped_role(user):
+            return user_can_see_mail(user, obj.id)
 
         return False
 
     def _is_dag_for_section(self, user, obj):
         """Helper: check if DAG manages the mail's section"""
         section_id = obj.section_id or (obj.subsection.section_id if obj.subsection_id else None)
-        return user.role == 'DAG' and section_id and user.sections.filter(id=section_id).exists()
+        return user.role == 'DAG' and get_user_scope(user).manages_section(section_id)
 
     def _has_active_assignment(self, user, obj):
-        from records.models import MailAssignment
-        return MailAssignment.objects.filter(
-            mail_record=obj,
-            status='Active'
-        ).filter(
-            Q(assigned_to=user) | Q(reassigned_to=user)
-        ).exists()
+        return get_user_scope(user).has_active_assignment(obj.id)
 
     def has_object_permission(self, request, view, obj):
         """Check if user can perform action on specific mail record"""
@@ -159,7 +136,7 @@ class MailRecordPermission(permissions.BasePermission):
         ]:
             return self._can_view_mail(user, obj, request)
 
-        if view.action == 'upload_pdf':
+        if view.action in ['upload_pdf', 'pdf_upload_url', 'finalize_pdf_upload']:
             # If a user can legitimately see the mail in their workflow scope,
             # allow attaching the stage PDF as well. This keeps create-stage and
             # close-stage uploads functional even after current_handler changes.
@@ -80,6 +80,7 @@ INSTALLED_APPS = [
     'records',
     'audit',
     'returns',
+    'jobs',
 ]
 
 USE_R2_FOR_PDFS = env_bool('USE_R2', 'False')
@@ -201,6 +202,7 @@ R2_BUCKET_NAME = os.environ.get('R2_BUCKET_NAME', '').strip()
 R2_ENDPOINT_URL = os.environ.get('R2_ENDPOINT_URL', '').strip()
 R2_REGION = os.environ.get('R2_REGION', 'auto').strip()
 R2_PDF_PREFIX = os.environ.get('R2_PDF_PREFIX', 'pdfs').strip('/')
+R2_IMPORT_PREFIX = os.environ.get('R2_IMPORT_PREFIX', 'user-imports').strip('/')
 
 missing_r2 = []
 if not R2_BUCKET_NAME:
@@ -236,11 +238,41 @@ STORAGES = {
             "default_acl": None,
             "file_overwrite": False,
             "querystring_auth": True,
+            # SigV4, so presigned upload URLs can sign Content-Length and the checksum header.
+            "signature_version": "s3v4",
             "location": R2_PDF_PREFIX,
         },
     },
+    # Uploaded user import files, read back by the run_workers process (users/import_jobs.py).
+    "imports": {
+        "BACKEND": "storages.backends.s3.S3Storage",
+        "OPTIONS": {
+            "bucket_name": R2_BUCKET_NAME,
+            "endpoint_url": R2_ENDPOINT_URL,
+            "access_key": R2_ACCESS_KEY_ID,
+            "secret_key": R2_SECRET_ACCESS_KEY,
+            "region_name": R2_REGION,
+            "default_acl": None,
+            "file_overwrite": False,
+            "location": R2_IMPORT_PREFIX,
+        },
+    },
 }
 
+# Optional read-through disk cache in front of R2 for PDF reads (records/pdf_cache.py).
+# Leave PDF_CACHE_DIR empty to read straight from R2.
+PDF_CACHE_DIR = os.environ.get('PDF_CACHE_DIR', '').strip()
+PDF_CACHE_MAX_BYTES = int(os.environ.get('PDF_CACHE_MAX_MB', '512')) * 1024 * 1024
+if PDF_CACHE_DIR:
+    STORAGES["pdfs_cache"] = {
+        "BACKEND": "records.pdf_cache.LocalCacheStorage",
+        "OPTIONS": {
+            "origin": "pdfs",
+            "location": PDF_CACHE_DIR,
+            "max_bytes": PDF_CACHE_MAX_BYTES,
+        },
+    }
+
 # Default primary key field type
 # https://docs.djangoproject.com/en/6.0/ref/settings/#default-auto-field
 
@@ -252,7 +284,8 @@ AUTH_USER_MODEL = 'users.User'
 # REST Framework configuration
 REST_FRAMEWORK = {
     'DEFAULT_AUTHENTICATION_CLASSES': (
-        'rest_framework_simplejwt.authentication.JWTAuthentication',
+        # simplejwt plus a process-local user/scope cache keyed by User.scope_version.
+        'users.authentication.CachedJWTAuthentication',
     ),
     'DEFAULT_PERMISSION_CLASSES': (
         'rest_framework.permissions.IsAuthenticated',
@@ -297,10 +330,35 @@ CSRF_COOKIE_SECURE = os.environ.get('CSRF_COOKIE_SECURE', 'True' if not DEBUG el
 # File upload size limits (10MB max for PDF uploads)
 FILE_UPLOAD_MAX_MEMORY_SIZE = 10 * 1024 * 1024
 DATA_UPLOAD_MAX_MEMORY_SIZE = 10 * 1024 * 1024
+MAX_PDF_SIZE_MB = int(os.environ.get('MAX_PDF_SIZE_MB', '10'))
+
+# Direct-to-R2 uploads (/pdf/upload-url/ then /pdf/finalize/): lifetime of the presigned PUT.
+# The bucket needs a CORS rule allowing PUT (Content-Type, x-amz-checksum-sha256) from the frontend origins.
+PDF_UPLOAD_URL_EXPIRY_SECONDS = int(os.environ.get('PDF_UPLOAD_URL_EXPIRY_SECONDS', '600'))
+
+# /pdf/view/: 'proxy' streams through Django with Range support. 'redirect' sends a presigned GET
+# URL valid for PDF_URL_EXPIRY_SECONDS; the frontend fetches the PDF as an XHR blob, so it needs a
+# bucket CORS rule allowing GET from the frontend origins before it can be switched on.
+PDF_DELIVERY_MODE = os.environ.get('PDF_DELIVERY_MODE', 'proxy').strip().lower()
+PDF_URL_EXPIRY_SECONDS = int(os.environ.get('PDF_URL_EXPIRY_SECONDS', '300'))
 
 # Performance observability
 SLOW_REQUEST_MS = int(os.environ.get('SLOW_REQUEST_MS', '500'))
 
+# Live record events (/api/records/events/): 'poll' has each worker poll AuditTrail so streams
+# see writes from every worker; 'memory' fans out in-process and needs a single worker.
+RECORD_EVENTS_BACKEND = os.environ.get('RECORD_EVENTS_BACKEND', 'poll').strip().lower()
+RECORD_EVENTS_POLL_SECONDS = float(os.environ.get('RECORD_EVENTS_POLL_SECONDS', '2'))
+# Streams (served by config/asgi.py) end after this long so the caller's scope is re-read;
+# the client reconnects with a fresh ticket.
+RECORD_EVENTS_STREAM_SECONDS = int(os.environ.get('RECORD_EVENTS_STREAM_SECONDS', '300'))
+# Lifetime of the ticket from /api/records/events/ticket/ that opens a stream.
+RECORD_EVENTS_TICKET_SECONDS = int(os.environ.get('RECORD_EVENTS_TICKET_SECONDS', '30'))
+
+# Background jobs (jobs app), run by `python manage.py run_workers`.
+JOB_WORKER_CONCURRENCY = int(os.environ.get('JOB_WORKER_CONCURRENCY', '2'))
+JOB_POLL_SECONDS = float(os.environ.get('JOB_POLL_SECONDS', '1'))
+
 LOGGING = {
     'version': 1,
     'disable_existing_loggers': False,
@@ -28,6 +28,7 @@ from users.views import (
 )
 from sections.views import SectionViewSet, SubsectionViewSet
 from records.views import MailRecordViewSet, MailAssignmentViewSet
+from records.streams import EventStreamTicketView
 from audit.views import AuditTrailViewSet
 from returns.views import ReturnEntryViewSet
 from .views import health_check
@@ -51,6 +52,9 @@ urlpatterns = [
     path('api/auth/change-password/', ChangePasswordView.as_view(), name='change_password'),
     path('api/auth/signup/', SignupView.as_view(), name='signup'),
     path('api/auth/signup-metadata/', SignupMetadataView.as_view(), name='signup_metadata'),
+    # Ticket for the server-sent event stream, which config/asgi.py serves (not this URLconf).
+    # Must precede the router, whose records/<pk>/ route would match "events".
+    path('api/records/events/ticket/', EventStreamTicketView.as_view(), name='record_event_ticket'),
     # API endpoints
     path('api/', include(router.urls)),
 ]
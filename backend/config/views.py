@@ -3,6 +3,8 @@ from django.db import connection
 from django.http import JsonResponse
 from django.utils import timezone
 
+from records.models import get_pdf_read_storage
+
 
 def health_check(request):
     db_ok = True
@@ -25,4 +27,9 @@ def health_check(request):
     if db_error:
         payload["database_error"] = db_error
 
+    pdf_storage = get_pdf_read_storage()
+    if hasattr(pdf_storage, "stats"):
+        # Counters are per worker process.
+        payload["pdf_cache"] = pdf_storage.stats()
+
     return JsonResponse(payload, status=status_code)
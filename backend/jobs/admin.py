@@ -0,0 +1,40 @@
+from django.contrib import admin, messages
+from django.utils import timezone
+
+from .models import Job
+
+
+@admin.register(Job)
+class JobAdmin(admin.ModelAdmin):
+    list_display = ['id', 'task', 'status', 'attempts', 'max_attempts', 'run_after', 'locked_by', 'created_at', 'finished_at']
+    list_filter = ['status', 'task']
+    search_fields = ['task', 'key', 'locked_by']
+    readonly_fields = [
+        'task',
+        'payload',
+        'key',
+        'status',
+        'attempts',
+        'max_attempts',
+        'run_after',
+        'locked_by',
+        'locked_until',
+        'last_error',
+        'created_at',
+        'started_at',
+        'finished_at',
+    ]
+    actions = ['retry_jobs']
+
+    def has_add_permission(self, request):
+        return False
+
+    @admin.action(description='Retry selected failed jobs')
+    def retry_jobs(self, request, queryset):
+        updated = queryset.filter(status=Job.STATUS_FAILED).update(
+            status=Job.STATUS_QUEUED,
+            attempts=0,
+            run_after=timezone.now(),
+            finished_at=None,
+        )
+        self.message_user(request, f'Queued {updated} job(s) for retry.', messages.SUCCESS)
@@ -0,0 +1,11 @@
+from django.apps import AppConfig
+from django.utils.module_loading import autodiscover_modules
+
+
+class JobsConfig(AppConfig):
+    default_auto_field = 'django.db.models.AutoField'
+    name = 'jobs'
+
+    def ready(self):
+        # Each app registers its background tasks in <app>/tasks.py.
+        autodiscover_modules('tasks')
@@ -0,0 +1,94 @@
+import signal
+import threading
+
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+from django.db import close_old_connections
+
+from jobs.queue import TASKS, claim_job, default_worker_id, run_job, run_pending_jobs, schedule_periodic_tasks
+
+
+class Command(BaseCommand):
+    help = "Run background job workers (user imports, return period generation, blob cleanup, ...)."
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--concurrency",
+            type=int,
+            default=getattr(settings, "JOB_WORKER_CONCURRENCY", 2),
+            help="Worker threads in this process.",
+        )
+        parser.add_argument(
+            "--poll-interval",
+            type=float,
+            default=getattr(settings, "JOB_POLL_SECONDS", 1.0),
+            help="Seconds to wait when no job is runnable.",
+        )
+        parser.add_argument(
+            "--task",
+            dest="task_names",
+            action="append",
+            default=[],
+            help="Only run this task (repeatable).",
+        )
+        parser.add_argument(
+            "--once",
+            action="store_true",
+            help="Run runnable jobs in the current thread, then exit.",
+        )
+
+    def handle(self, *args, **options):
+        task_names = options["task_names"] or list(TASKS)
+        unknown = sorted(set(task_names) - set(TASKS))
+        if unknown:
+            raise CommandError(f"Unknown task(s): {', '.join(unknown)}")
+        if options["concurrency"] < 1:
+            raise CommandError("--concurrency must be at least 1.")
+
+        if options["once"]:
+            count = run_pending_jobs(task_names=task_names)
+            self.stdout.write(self.style.SUCCESS(f"Ran {count} job(s)"))
+            return
+
+        stop = threading.Event()
+        for signum in (signal.SIGINT, signal.SIGTERM):
+            signal.signal(signum, lambda *_: stop.set())
+
+        def work():
+            worker_id = default_worker_id()
+            while not stop.is_set():
+                try:
+                    close_old_connections()
+                    job = claim_job(worker_id, task_names)
+                    if job is None:
+                        stop.wait(options["poll_interval"])
+                        continue
+                    run_job(job)
+                except Exception as exc:
+                    self.stderr.write(f"Worker {worker_id} error: {exc}")
+                    stop.wait(options["poll_interval"])
+            close_old_connections()
+
+        threads = [
+            threading.Thread(target=work, name=f"job-worker-{index}", daemon=True)
+            for index in range(options["concurrency"])
+        ]
+        for thread in threads:
+            thread.start()
+        self.stdout.write(self.style.SUCCESS(
+            f"Started {len(threads)} worker thread(s) for {len(task_names)} task(s)"
+        ))
+
+        # The main thread keeps periodic tasks scheduled until shutdown.
+        while not stop.is_set():
+            try:
+                close_old_connections()
+                schedule_periodic_tasks()
+            except Exception as exc:
+                self.stderr.write(f"Periodic scheduling failed: {exc}")
+            stop.wait(max(options["poll_interval"], 5))
+
+        for thread in threads:
+            thread.join()
+        close_old_connections()
+        self.stdout.write(self.style.SUCCESS("Workers stopped"))
@@ -0,0 +1,229 @@
+"""
+Database-backed background jobs.
+
+Tasks register with @task in <app>/tasks.py and are queued with enqueue(),
+normally inside the same transaction as the data they act on. `manage.py
+run_workers` claims queued jobs: with SELECT ... FOR UPDATE SKIP LOCKED where the
+database supports it (PostgreSQL), and with a compare-and-set UPDATE otherwise
+(SQLite). A claimed job is leased until locked_until; if its worker dies the
+lease runs out and another worker picks it up, so tasks must be idempotent.
+Long tasks call extend_lease() as they make progress so a live worker keeps
+its job.
+"""
+import logging
+import os
+import socket
+import threading
+import traceback
+from dataclasses import dataclass
+from datetime import timedelta
+
+from django.db import connection, transaction
+from django.db.models import Count, F, Max, Q
+from django.utils import timezone
+
+from .models import Job
+
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_TIMEOUT = timedelta(minutes=10)
+DEFAULT_RETRY_DELAY = timedelta(seconds=30)
+PERIODIC_KEY = 'periodic'
+
+
+@dataclass(frozen=True)
+class Task:
+    name: str
+    func: object
+    max_attempts: int = 3
+    concurrency: int | None = None
+    timeout: timedelta = DEFAULT_TIMEOUT
+    retry_delay: timedelta = DEFAULT_RETRY_DELAY
+    every: timedelta | None = None
+
+
+TASKS = {}
+
+# The job run_job() is executing in this thread, for extend_lease().
+_running = threading.local()
+
+
+class LeaseLost(Exception):
+    """The running job's lease expired and another worker claimed it."""
+
+
+def task(name, *, max_attempts=3, concurrency=None, timeout=DEFAULT_TIMEOUT,
+         retry_delay=DEFAULT_RETRY_DELAY, every=None):
+    """
+    Register func as a background task. The job payload is passed as keyword
+    arguments. concurrency caps how many jobs of this task run at once across
+    all workers; every makes the workers schedule it periodically.
+    """
+    def decorator(func):
+        TASKS[name] = Task(
+            name=name,
+            func=func,
+            max_attempts=max_attempts,
+            concurrency=concurrency,
+            timeout=timeout,
+            retry_delay=retry_delay,
+            every=every,
+        )
+        return func
+    return decorator
+
+
+def enqueue(task_name, payload=None, *, key='', run_after=None, max_attempts=None):
+    """Queue a job; returns None when a job with the same task and key is still queued or running."""
+    if task_name not in TASKS:
+        raise ValueError(f'Unknown task "{task_name}".')
+    if key and Job.objects.filter(task=task_name, key=key, status__in=Job.ACTIVE_STATUSES).exists():
+        return None
+    return Job.objects.create(
+        task=task_name,
+        payload=payload or {},
+        key=key,
+        run_after=run_after or timezone.now(),
+        max_attempts=max_attempts or TASKS[task_name].max_attempts,
+    )
+
+
+def default_worker_id():
+    return f'{socket.gethostname()}:{os.getpid()}:{threading.get_ident()}'
+
+
+def _available_jobs(now, task_names):
+    limited = [name for name in task_names if name in TASKS and TASKS[name].concurrency is not None]
+    running = {}
+    if limited:
+        running = dict(
+            Job.objects.filter(status=Job.STATUS_RUNNING, locked_until__gte=now, task__in=limited)
+            .order_by()
+            .values('task')
+            .annotate(running=Count('id'))
+            .values_list('task', 'running')
+        )
+    saturated = [name for name in limited if running.get(name, 0) >= TASKS[name].concurrency]
+
+    # Running jobs whose lease has expired belong to a dead worker and are claimable again.
+    return (
+        Job.objects.filter(
+            Q(status=Job.STATUS_QUEUED, run_after__lte=now)
+            | Q(status=Job.STATUS_RUNNING, locked_until__lt=now),
+            task__in=task_names,
+        )
+        .exclude(task__in=saturated)
+        .order_by('run_after', 'id')
+    )
+
+
+def claim_job(worker_id=None, task_names=None, now=None):
+    """Lease the next runnable job to worker_id, or return None."""
+    worker_id = worker_id or default_worker_id()
+    now = now or timezone.now()
+    task_names = list(task_names or TASKS)
+    candidates = _available_jobs(now, task_names)
+
+    if connection.features.has_select_for_update_skip_locked:
+        with transaction.atomic():
+            job = candidates.select_for_update(skip_locked=True).first()
+            if job is None:
+                return None
+            job.status = Job.STATUS_RUNNING
+            job.locked_by = worker_id
+            job.locked_until = now + TASKS[job.task].timeout
+            job.attempts += 1
+            job.started_at = now
+            job.save(update_fields=['status', 'locked_by', 'locked_until', 'attempts', 'started_at'])
+            return job
+
+    # No row locks (SQLite): claim by a conditional UPDATE on the state we read.
+    for job in candidates[:10]:
+        claimed = Job.objects.filter(id=job.id, status=job.status, attempts=job.attempts).update(
+            status=Job.STATUS_RUNNING,
+            locked_by=worker_id,
+            locked_until=now + TASKS[job.task].timeout,
+            attempts=F('attempts') + 1,
+            started_at=now,
+        )
+        if claimed:
+            job.refresh_from_db()
+            return job
+    return None
+
+
+def _finish(job, **fields):
+    """Write the outcome unless the lease was lost to another worker meanwhile."""
+    fields.update(locked_by='', locked_until=None)
+    return Job.objects.filter(id=job.id, locked_by=job.locked_by, attempts=job.attempts).update(**fields)
+
+
+def extend_lease():
+    """
+    Renew the lease of the job running in this thread for another task timeout.
+    Returns False when the lease was already lost, and True outside a job.
+    """
+    job = getattr(_running, 'job', None)
+    if job is None:
+        return True
+    locked_until = timezone.now() + TASKS[job.task].timeout
+    return bool(
+        Job.objects.filter(id=job.id, locked_by=job.locked_by, attempts=job.attempts).update(
+            locked_until=locked_until
+        )
+    )
+
+
+def run_job(job):
+    task_def = TASKS.get(job.task)
+    if task_def is None:
+        _finish(job, status=Job.STATUS_FAILED, last_error=f'Unknown task "{job.task}".', finished_at=timezone.now())
+        return False
+
+    _running.job = job
+    try:
+        task_def.func(**job.payload)
+    except LeaseLost:
+        # The job now belongs to another worker; leave its row alone.
+        logger.warning('Job %s (%s) lost its lease', job.id, job.task)
+        return False
+    except Exception:
+        logger.exception('Job %s (%s) failed on attempt %s', job.id, job.task, job.attempts)
+        error = traceback.format_exc(limit=5)
+        if job.attempts >= job.max_attempts:
+            _finish(job, status=Job.STATUS_FAILED, last_error=error, finished_at=timezone.now())
+        else:
+            delay = task_def.retry_delay * (2 ** (job.attempts - 1))
+            _finish(job, status=Job.STATUS_QUEUED, last_error=error, run_after=timezone.now() + delay)
+        return False
+    finally:
+        _running.job = None
+
+    _finish(job, status=Job.STATUS_COMPLETED, last_error='', finished_at=timezone.now())
+    return True
+
+
+def schedule_periodic_tasks(now=None):
+    """Queue the next run of every periodic task that has no queued or running job."""
+    now = now or timezone.now()
+    for task_def in TASKS.values():
+        if task_def.every is None:
+            continue
+        last_finished = Job.objects.filter(
+            task=task_def.name,
+            key=PERIODIC_KEY,
+        ).aggregate(value=Max('finished_at'))['value']
+        run_after = max(now, last_finished + task_def.every) if last_finished else now
+        enqueue(task_def.name, key=PERIODIC_KEY, run_after=run_after)
+
+
+def run_pending_jobs(worker_id=None, task_names=None):
+    """Run jobs in the calling thread until none is runnable; returns how many ran."""
+    count = 0
+    while True:
+        job = claim_job(worker_id, task_names)
+        if job is None:
+            return count
+        run_job(job)
+        count += 1
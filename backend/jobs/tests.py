@@ -0,0 +1,184 @@
+import os
+import subprocess
+import sys
+import tempfile
+from datetime import timedelta
+from io import StringIO
+from pathlib import Path
+from unittest import skipIf
+
+from django.conf import settings
+from django.core.management import call_command
+from django.test import SimpleTestCase, TestCase
+from django.utils import timezone
+
+from jobs.models import Job
+from jobs.queue import (
+    TASKS,
+    LeaseLost,
+    claim_job,
+    enqueue,
+    extend_lease,
+    run_job,
+    schedule_periodic_tasks,
+    task,
+)
+
+try:
+    import yaml
+except ImportError:  # pragma: no cover - optional in local environments
+    yaml = None
+
+
+calls = []
+
+
+@task('tests.record', max_attempts=2, retry_delay=timedelta(0))
+def record_call(value, fail=False):
+    calls.append(value)
+    if fail:
+        raise RuntimeError('boom')
+
+
+@task('tests.limited', concurrency=1)
+def limited_call():
+    pass
+
+
+@task('tests.long_running', timeout=timedelta(minutes=5))
+def long_running_call(steal=False):
+    if steal:
+        # Another worker reclaims the job as if this one had stalled past its lease.
+        later = timezone.now() + TASKS['tests.long_running'].timeout + timedelta(seconds=1)
+        calls.append(claim_job('w2', ['tests.long_running'], now=later).locked_by)
+    if not extend_lease():
+        raise LeaseLost()
+    calls.append(Job.objects.get(task='tests.long_running').locked_until)
+
+
+@task('tests.periodic', every=timedelta(hours=1))
+def periodic_call():
+    calls.append('periodic')
+
+
+class JobQueueTests(TestCase):
+    def setUp(self):
+        calls.clear()
+
+    def test_enqueue_runs_once_and_dedupes_by_key(self):
+        first = enqueue('tests.record', {'value': 1}, key='same')
+        self.assertIsNone(enqueue('tests.record', {'value': 2}, key='same'))
+
+        call_command('run_workers', once=True, stdout=StringIO())
+
+        first.refresh_from_db()
+        self.assertEqual(first.status, Job.STATUS_COMPLETED)
+        self.assertEqual(first.attempts, 1)
+        self.assertEqual(calls, [1])
+        self.assertIsNotNone(enqueue('tests.record', {'value': 3}, key='same'))
+
+    def test_failed_job_is_retried_until_max_attempts(self):
+        job = enqueue('tests.record', {'value': 'x', 'fail': True})
+
+        run_job(claim_job('w1'))
+        job.refresh_from_db()
+        self.assertEqual((job.status, job.attempts), (Job.STATUS_QUEUED, 1))
+        self.assertIn('boom', job.last_error)
+
+        run_job(claim_job('w1'))
+        job.refresh_from_db()
+        self.assertEqual((job.status, job.attempts), (Job.STATUS_FAILED, 2))
+        self.assertIsNone(claim_job('w1'))
+        self.assertEqual(calls, ['x', 'x'])
+
+    def test_expired_lease_is_reclaimed_and_concurrency_is_capped(self):
+        first = enqueue('tests.limited')
+        second = enqueue('tests.limited')
+
+        claimed = claim_job('w1', ['tests.limited'])
+        self.assertEqual(claimed.id, first.id)
+        self.assertIsNone(claim_job('w2', ['tests.limited']))
+
+        later = timezone.now() + TASKS['tests.limited'].timeout + timedelta(seconds=1)
+        reclaimed = claim_job('w2', ['tests.limited'], now=later)
+        self.assertEqual(reclaimed.id, first.id)
+        self.assertEqual((reclaimed.locked_by, reclaimed.attempts), ('w2', 2))
+
+        # The first worker lost its lease, so its late result is discarded.
+        run_job(claimed)
+        first.refresh_from_db()
+        self.assertEqual(first.status, Job.STATUS_RUNNING)
+        run_job(reclaimed)
+        first.refresh_from_db()
+        self.assertEqual(first.status, Job.STATUS_COMPLETED)
+        self.assertEqual(claim_job('w2', ['tests.limited']).id, second.id)
+
+    def test_running_job_extends_its_lease_until_it_is_lost(self):
+        job = enqueue('tests.long_running')
+        claimed = claim_job('w1')
+        run_job(claimed)
+        self.assertGreater(calls[0], claimed.locked_until)
+        job.refresh_from_db()
+        self.assertEqual(job.status, Job.STATUS_COMPLETED)
+
+        calls.clear()
+        job = enqueue('tests.long_running', {'steal': True})
+        self.assertFalse(run_job(claim_job('w1')))
+        job.refresh_from_db()
+        # The lost lease leaves the job with the worker that reclaimed it.
+        self.assertEqual(calls, ['w2'])
+        self.assertEqual((job.status, job.locked_by), (Job.STATUS_RUNNING, 'w2'))
+
+    def test_periodic_task_is_scheduled_after_last_run(self):
+        schedule_periodic_tasks()
+        schedule_periodic_tasks()
+        self.assertEqual(Job.objects.filter(task='tests.periodic').count(), 1)
+
+        call_command('run_workers', once=True, task_names=['tests.periodic'], stdout=StringIO())
+        self.assertEqual(calls, ['periodic'])
+
+        schedule_periodic_tasks()
+        next_run = Job.objects.get(task='tests.periodic', status=Job.STATUS_QUEUED)
+        self.assertGreater(next_run.run_after, timezone.now() + timedelta(minutes=59))
+
+
+@skipIf(yaml is None, 'PyYAML is not installed')
+class WorkerDeployTests(SimpleTestCase):
+    def _render_env(self, service_name, database_url):
+        """The environment Render gives a service, with dashboard-set values filled in."""
+        blueprint = yaml.safe_load((settings.PROJECT_ROOT / 'render.yaml').read_text())
+        services = {service['name']: service for service in blueprint['services']}
+        env = {}
+        for var in services[service_name]['envVars']:
+            if 'value' in var:
+                env[var['key']] = str(var['value'])
+            elif 'fromDatabase' in var:
+                env[var['key']] = database_url
+            elif 'fromService' in var:
+                source = services[var['fromService']['name']]
+                source_keys = {item['key'] for item in source['envVars']}
+                self.assertIn(var['fromService']['envVarKey'], source_keys)
+                env[var['key']] = f"{var['fromService']['envVarKey'].lower()}-value"
+            else:
+                env[var['key']] = f"{var['key'].lower()}-value"
+        return env
+
+    def _boot(self, service_name, command):
+        with tempfile.TemporaryDirectory() as directory:
+            env = self._render_env(service_name, f"sqlite:///{Path(directory) / 'service.sqlite3'}")
+            env['PATH'] = os.environ.get('PATH', '')
+            return subprocess.run(
+                [sys.executable, *command],
+                cwd=settings.BASE_DIR,
+                env=env,
+                capture_output=True,
+                text=True,
+            )
+
+    def test_worker_boots_with_its_render_environment(self):
+        result = self._boot('mail-tracker-worker', ['manage.py', 'check'])
+        self.assertEqual(result.returncode, 0, result.stderr)
+
+    def test_event_service_boots_with_its_render_environment(self):
+        result = self._boot('mail-tracker-events', ['-c', 'import config.asgi'])
+        self.assertEqual(result.returncode, 0, result.stderr)
@@ -1,5 +1,11 @@
 from django.apps import AppConfig
+from django.db.models.signals import post_migrate
 
 
 class RecordsConfig(AppConfig):
     name = 'records'
+
+    def ready(self):
+        from .search import ensure_search_index
+
+        post_migrate.connect(ensure_search_index, sender=self)
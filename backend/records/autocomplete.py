@@ -0,0 +1,167 @@
+"""
+Prefix/fuzzy suggestions for from_office and letter_no on the Create Mail form.
+
+PostgreSQL: pg_trgm GIN indexes answer both the prefix (ILIKE 'q%') and the
+fuzzy (similarity) match. Other backends: a per-process sorted table of the
+distinct values, rebuilt every TABLE_TTL_SECONDS, searched with bisect.
+
+The global sources above draw on every record. AG gets their results as is;
+other roles pass their visible records, and a wider set of global candidates
+is intersected with the values used on that mail in one indexed IN lookup.
+Only the bare field values are returned, never ids or subjects.
+"""
+import difflib
+import threading
+import time
+from bisect import bisect_left
+
+from django.db import connections
+
+
+AUTOCOMPLETE_FIELDS = ('from_office', 'letter_no')
+DEFAULT_LIMIT = 10
+MAX_LIMIT = 25
+
+TABLE = 'records_mailrecord'
+TABLE_TTL_SECONDS = 300
+# difflib scans the whole list; beyond this many distinct values only prefix matches are offered.
+FUZZY_SCAN_LIMIT = 5000
+FUZZY_CUTOFF = 0.6
+# Scoped callers draw limit * this many global candidates before the visibility filter.
+VISIBLE_CANDIDATE_FACTOR = 20
+
+
+def install_trigram_indexes(connection):
+    if connection.vendor != 'postgresql':
+        return
+    with connection.cursor() as cursor:
+        cursor.execute('CREATE EXTENSION IF NOT EXISTS pg_trgm')
+        for field in AUTOCOMPLETE_FIELDS:
+            cursor.execute(
+                f'CREATE INDEX IF NOT EXISTS {TABLE}_{field}_trgm '
+                f'ON {TABLE} USING GIN ({field} gin_trgm_ops)'
+            )
+
+
+def remove_trigram_indexes(connection):
+    if connection.vendor != 'postgresql':
+        return
+    with connection.cursor() as cursor:
+        for field in AUTOCOMPLETE_FIELDS:
+            cursor.execute(f'DROP INDEX IF EXISTS {TABLE}_{field}_trgm')
+
+
+def _escape_like(value):
+    return value.replace('\\', '\\\\').replace('%', '\\%').replace('_', '\\_')
+
+
+def _postgres_suggestions(connection, field, term, limit):
+    # Prefix hits rank above fuzzy hits; similarity orders within each group.
+    sql = (
+        f"SELECT DISTINCT {field}, "
+        f"(CASE WHEN {field} ILIKE %s THEN 1 ELSE 0 END) + similarity({field}, %s) AS score "
+        f"FROM {TABLE} "
+        f"WHERE {field} ILIKE %s OR {field} %% %s "
+        f"ORDER BY score DESC, {field} "
+        f"LIMIT %s"
+    )
+    prefix = f'{_escape_like(term)}%'
+    with connection.cursor() as cursor:
+        cursor.execute(sql, [prefix, term, prefix, term, limit])
+        return [row[0] for row in cursor.fetchall()]
+
+
+class SortedValueTable:
+    """Distinct values of one column, case-folded and sorted, refreshed on a TTL."""
+
+    def __init__(self, field, ttl=TABLE_TTL_SECONDS):
+        self.field = field
+        self.ttl = ttl
+        self._lock = threading.Lock()
+        # (keys, values, positions) swapped in as one tuple so readers never see a half-built table.
+        self._snapshot = ([], [], {})
+        self._built_at = None
+
+    def invalidate(self):
+        self._built_at = None
+
+    def _rebuild(self, using):
+        from .models import MailRecord
+
+        rows = {}
+        for value in MailRecord.objects.using(using).values_list(self.field, flat=True).distinct().iterator():
+            if value:
+                rows.setdefault(value.casefold(), value)
+        keys = sorted(rows)
+        self._snapshot = (
+            keys,
+            [rows[key] for key in keys],
+            {key: position for position, key in enumerate(keys)},
+        )
+        self._built_at = time.monotonic()
+
+    def _ensure_fresh(self, using):
+        if self._built_at is not None and time.monotonic() - self._built_at < self.ttl:
+            return
+        with self._lock:
+            if self._built_at is None or time.monotonic() - self._built_at >= self.ttl:
+                self._rebuild(using)
+
+    def suggest(self, term, limit, using='default'):
+        self._ensure_fresh(using)
+        keys, values, positions = self._snapshot
+        needle = term.casefold()
+
+        results = []
+        index = bisect_left(keys, needle)
+        while index < len(keys) and len(results) < limit and keys[index].startswith(needle):
+            results.append(values[index])
+            index += 1
+
+        if len(results) < limit and len(keys) <= FUZZY_SCAN_LIMIT:
+            seen = set(results)
+            for key in difflib.get_close_matches(needle, keys, n=limit, cutoff=FUZZY_CUTOFF):
+                value = values[positions[key]]
+                if value not in seen:
+                    results.append(value)
+                    seen.add(value)
+                if len(results) >= limit:
+                    break
+        return results
+
+
+value_tables = {field: SortedValueTable(field) for field in AUTOCOMPLETE_FIELDS}
+
+
+def _global_suggestions(field, term, limit, using):
+    connection = connections[using]
+    if connection.vendor == 'postgresql':
+        return _postgres_suggestions(connection, field, term, limit)
+    return value_tables[field].suggest(term, limit, using=using)
+
+
+def _visible_suggestions(records, field, term, limit, using):
+    candidates = _global_suggestions(field, term, limit * VISIBLE_CANDIDATE_FACTOR, using)
+    if not candidates:
+        return []
+    visible = set(
+        records.filter(**{f'{field}__in': candidates}).order_by().values_list(field, flat=True).distinct()
+    )
+    return [value for value in candidates if value in visible][:limit]
+
+
+def suggest(field, term, limit=None, using='default', records=None):
+    """
+    Top `limit` (default DEFAULT_LIMIT, capped at MAX_LIMIT) distinct values of
+    `field` that start with, or closely resemble, `term`. `records` limits the
+    source to a MailRecord queryset the caller may see; None means every record.
+    """
+    if field not in AUTOCOMPLETE_FIELDS:
+        raise ValueError(f'Autocomplete is not available for {field!r}.')
+    limit = max(1, min(limit or DEFAULT_LIMIT, MAX_LIMIT))
+    term = (term or '').strip()
+    if not term:
+        return []
+    if records is not None:
+        return _visible_suggestions(records, field, term, limit, using)
+    return _global_suggestions(field, term, limit, using)
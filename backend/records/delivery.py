@@ -0,0 +1,156 @@
+"""
+PDF delivery for view_pdf, after the record permission check.
+
+PDF_DELIVERY_MODE = 'proxy' (the default) streams through Django, honouring
+Range and If-None-Match, reading through the local disk cache when one is
+configured. 'redirect' answers with a 302 to a short-lived presigned GET URL,
+so the bytes go straight to object storage; the frontend's XHR follows that
+redirect cross-origin, so the bucket needs a CORS rule for GET first. Stored PDFs never change under a given attachment id, so the id
+serves as a strong ETag.
+"""
+import re
+
+from django.conf import settings
+from django.http import HttpResponse, HttpResponseRedirect, StreamingHttpResponse
+
+from .models import get_pdf_read_storage
+from .uploads import object_location
+
+
+DELIVERY_REDIRECT = 'redirect'
+DELIVERY_PROXY = 'proxy'
+CHUNK_SIZE = 64 * 1024
+
+RANGE_RE = re.compile(r'^bytes=(\d*)-(\d*)$')
+
+
+def delivery_mode():
+    mode = getattr(settings, 'PDF_DELIVERY_MODE', DELIVERY_PROXY)
+    return mode if mode in {DELIVERY_REDIRECT, DELIVERY_PROXY} else DELIVERY_PROXY
+
+
+def inline_disposition(attachment):
+    safe_filename = attachment.original_filename.replace('"', '').replace('\\', '')
+    return f'inline; filename="{safe_filename}"'
+
+
+def attachment_etag(attachment):
+    return f'"{attachment.id}"'
+
+
+def parse_range(header, size):
+    """
+    (start, end) inclusive for a single 'bytes=' range, None to serve the whole
+    file (no header, or a form we do not handle such as multiple ranges), or
+    'unsatisfiable'.
+    """
+    match = RANGE_RE.match((header or '').strip())
+    if not match or size == 0:
+        return None
+    first, last = match.groups()
+    if not first and not last:
+        return None
+    if not first:
+        # Suffix range: the last N bytes.
+        length = int(last)
+        if length == 0:
+            return 'unsatisfiable'
+        return max(size - length, 0), size - 1
+    start = int(first)
+    end = min(int(last), size - 1) if last else size - 1
+    if start >= size or end < start:
+        return 'unsatisfiable'
+    return start, end
+
+
+def _etag_matches(header, etag):
+    tags = [tag.strip() for tag in header.split(',')]
+    return '*' in tags or etag in tags or f'W/{etag}' in tags
+
+
+def iter_file_range(storage, name, start, end, chunk_size=CHUNK_SIZE):
+    """Yield bytes start..end (inclusive) of a stored file, fetching only that range."""
+    if hasattr(storage, 'bucket_name'):
+        bucket, key = object_location(storage, name)
+        body = storage.connection.meta.client.get_object(
+            Bucket=bucket,
+            Key=key,
+            Range=f'bytes={start}-{end}',
+        )['Body']
+        try:
+            yield from body.iter_chunks(chunk_size)
+        finally:
+            body.close()
+        return
+
+    with storage.open(name, 'rb') as file:
+        file.seek(start)
+        remaining = end - start + 1
+        while remaining > 0:
+            chunk = file.read(min(chunk_size, remaining))
+            if not chunk:
+                break
+            remaining -= len(chunk)
+            yield chunk
+
+
+def redirect_response(attachment):
+    expires_in = getattr(settings, 'PDF_URL_EXPIRY_SECONDS', 300)
+    url = attachment.file.storage.url(
+        attachment.file.name,
+        parameters={
+            'ResponseContentType': 'application/pdf',
+            'ResponseContentDisposition': inline_disposition(attachment),
+        },
+        expire=expires_in,
+    )
+    response = HttpResponseRedirect(url)
+    # The URL carries a signature that expires; never let a cache replay it.
+    response['Cache-Control'] = 'private, no-store'
+    return response
+
+
+def proxy_response(request, attachment):
+    etag = attachment_etag(attachment)
+    size = attachment.file_size
+
+    if_none_match = request.headers.get('If-None-Match')
+    if if_none_match and _etag_matches(if_none_match, etag):
+        response = HttpResponse(status=304)
+        response['ETag'] = etag
+        return response
+
+    byte_range = parse_range(request.headers.get('Range'), size)
+    if_range = request.headers.get('If-Range')
+    if byte_range is not None and if_range and if_range.strip() != etag:
+        byte_range = None
+
+    if byte_range == 'unsatisfiable':
+        response = HttpResponse(status=416)
+        response['Content-Range'] = f'bytes */{size}'
+        return response
+
+    start, end = byte_range or (0, size - 1)
+    if size == 0:
+        response = HttpResponse(b'', content_type='application/pdf')
+    else:
+        response = StreamingHttpResponse(
+            iter_file_range(get_pdf_read_storage(), attachment.file.name, start, end),
+            content_type='application/pdf',
+            status=206 if byte_range else 200,
+        )
+        response['Content-Length'] = str(end - start + 1)
+    if byte_range:
+        response['Content-Range'] = f'bytes {start}-{end}/{size}'
+    response['Accept-Ranges'] = 'bytes'
+    response['ETag'] = etag
+    # The stage's current attachment can change, so revalidate against the ETag each time.
+    response['Cache-Control'] = 'private, no-cache'
+    response['Content-Disposition'] = inline_disposition(attachment)
+    return response
+
+
+def pdf_response(request, attachment):
+    if delivery_mode() == DELIVERY_PROXY:
+        return proxy_response(request, attachment)
+    return redirect_response(attachment)
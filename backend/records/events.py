@@ -0,0 +1,193 @@
+"""
+Live record activity for the SSE stream (/api/records/events/).
+
+Events come from the AuditTrail rows the record views write. With the default
+'poll' backend each stream-serving process runs one poller thread (while it
+has open streams) that reads new AuditTrail rows and fans them out locally, so
+streams see the writes of every gunicorn worker. The 'memory' backend fans out
+in-process after the transaction commits, which only reaches streams held by
+the same process: use it only when one ASGI process serves both the API and
+the stream.
+"""
+import logging
+import queue
+import threading
+import time
+from datetime import timedelta
+
+from django.conf import settings
+from django.db import close_old_connections, transaction
+from django.utils import timezone
+
+
+logger = logging.getLogger(__name__)
+
+# Audit actions that are pushed, keyed to the SSE event name.
+EVENT_TYPES = {
+    'CREATE': 'mail.created',
+    'ASSIGN': 'mail.reassigned',
+    'MULTI_ASSIGN': 'mail.reassigned',
+    'REASSIGN': 'mail.reassigned',
+    'ASSIGNMENT_COMPLETE': 'assignment.completed',
+    'CLOSE': 'mail.closed',
+}
+
+SUBSCRIBER_QUEUE_SIZE = 100
+POLL_OVERLAP = timedelta(seconds=5)
+
+
+def events_backend():
+    return getattr(settings, 'RECORD_EVENTS_BACKEND', 'poll')
+
+
+def event_audience(mail_record_id):
+    """Who may receive events for this mail: scoped user ids plus the owning section (for DAGs)."""
+    from .models import MailRecord, MailVisibility
+
+    mail = MailRecord.objects.filter(id=mail_record_id).values('section_id', 'subsection__section_id').first()
+    if mail is None:
+        return None
+    return {
+        'user_ids': frozenset(
+            MailVisibility.objects.filter(mail_record_id=mail_record_id).values_list('user_id', flat=True)
+        ),
+        'section_id': mail['section_id'] or mail['subsection__section_id'],
+    }
+
+
+def build_event(audit_entry, audience):
+    return {
+        'id': audit_entry.id,
+        'type': EVENT_TYPES[audit_entry.action],
+        'audience': audience,
+        'data': {
+            'mail_record': audit_entry.mail_record_id,
+            'action': audit_entry.action,
+            'performed_by': audit_entry.performed_by_id,
+            'timestamp': (audit_entry.timestamp or timezone.now()).isoformat(),
+        },
+    }
+
+
+class Subscription:
+    """One open stream: the caller's scope plus a bounded queue the stream drains."""
+
+    def __init__(self, user):
+        from users.scope import get_user_scope
+        from .visibility import is_scoped_role
+
+        self.user_id = user.id
+        self.role = user.role
+        self.is_scoped = is_scoped_role(user)
+        self.section_ids = get_user_scope(user).section_ids
+        self.queue = queue.Queue(maxsize=SUBSCRIBER_QUEUE_SIZE)
+        self.overflowed = False
+
+    def wants(self, audience):
+        if self.role == 'AG':
+            return True
+        if self.role == 'DAG':
+            return audience['section_id'] in self.section_ids
+        if self.is_scoped:
+            return self.user_id in audience['user_ids']
+        return False
+
+    def deliver(self, event):
+        try:
+            self.queue.put_nowait(event)
+        except queue.Full:
+            # A stalled client loses events; the stream tells it to resync via the change feed.
+            self.overflowed = True
+
+
+class EventBroker:
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._subscriptions = set()
+        self._poller = None
+
+    def has_subscribers(self):
+        return bool(self._subscriptions)
+
+    def subscribe(self, user):
+        subscription = Subscription(user)
+        with self._lock:
+            self._subscriptions.add(subscription)
+            if events_backend() == 'poll' and (self._poller is None or not self._poller.is_alive()):
+                self._poller = AuditPoller(self)
+                self._poller.start()
+        return subscription
+
+    def unsubscribe(self, subscription):
+        with self._lock:
+            self._subscriptions.discard(subscription)
+
+    def publish(self, event):
+        with self._lock:
+            subscriptions = list(self._subscriptions)
+        for subscription in subscriptions:
+            if subscription.wants(event['audience']):
+                subscription.deliver(event)
+
+    def publish_audit_entries(self, entries):
+        if not self.has_subscribers():
+            return
+        audiences = {}
+        for entry in entries:
+            if entry.action not in EVENT_TYPES:
+                continue
+            if entry.mail_record_id not in audiences:
+                audiences[entry.mail_record_id] = event_audience(entry.mail_record_id)
+            audience = audiences[entry.mail_record_id]
+            if audience is not None:
+                self.publish(build_event(entry, audience))
+
+
+class AuditPoller(threading.Thread):
+    """Per-process DB poller for the 'poll' backend; exits when the last stream closes."""
+
+    def __init__(self, broker):
+        super().__init__(name='record-events-poller', daemon=True)
+        self.broker = broker
+        self.interval = getattr(settings, 'RECORD_EVENTS_POLL_SECONDS', 2.0)
+        self.since = timezone.now()
+        self.seen = {}
+
+    def poll_once(self):
+        from audit.models import AuditTrail
+
+        entries = list(
+            AuditTrail.objects.filter(
+                timestamp__gt=self.since - POLL_OVERLAP,
+                action__in=EVENT_TYPES,
+            ).exclude(id__in=list(self.seen)).order_by('timestamp', 'id')[:500]
+        )
+        for entry in entries:
+            self.seen[entry.id] = entry.timestamp
+            self.since = max(self.since, entry.timestamp)
+        # Only ids inside the overlap window can come back; forget the rest.
+        horizon = self.since - POLL_OVERLAP
+        self.seen = {entry_id: ts for entry_id, ts in self.seen.items() if ts > horizon}
+        self.broker.publish_audit_entries(entries)
+
+    def run(self):
+        while self.broker.has_subscribers():
+            try:
+                close_old_connections()
+                self.poll_once()
+            except Exception:
+                logger.exception('Record event poll failed')
+            time.sleep(self.interval)
+        close_old_connections()
+
+
+broker = EventBroker()
+
+
+def publish_audit_events(entries):
+    """Push audit rows to open streams once the surrounding transaction commits."""
+    if events_backend() != 'memory' or not broker.has_subscribers():
+        return
+    entries = [entry for entry in entries if entry.action in EVENT_TYPES]
+    if entries:
+        transaction.on_commit(lambda: broker.publish_audit_entries(entries))
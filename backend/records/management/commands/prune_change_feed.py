@@ -0,0 +1,13 @@
+from django.core.management.base import BaseCommand
+
+from records.changes import CHANGE_FEED_RETENTION, prune_removals
+
+
+class Command(BaseCommand):
+    help = "Delete change-feed tombstones older than the token retention window."
+
+    def handle(self, *args, **options):
+        deleted = prune_removals()
+        self.stdout.write(self.style.SUCCESS(
+            f"Pruned {deleted} tombstone(s) older than {CHANGE_FEED_RETENTION.days} days"
+        ))
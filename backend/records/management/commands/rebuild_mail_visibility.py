@@ -0,0 +1,41 @@
+from django.core.management.base import BaseCommand, CommandError
+from django.db.models import Q
+
+from records.visibility import SCOPED_ROLES, sync_user_visibility
+from users.models import User
+
+
+class Command(BaseCommand):
+    help = "Backfill or rebuild the materialized per-user mail visibility table."
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--user",
+            dest="usernames",
+            action="append",
+            default=[],
+            help="Only rebuild grants for this username (repeatable).",
+        )
+
+    def handle(self, *args, **options):
+        usernames = options["usernames"]
+        if usernames:
+            users = User.objects.filter(username__in=usernames)
+            missing = sorted(set(usernames) - set(users.values_list("username", flat=True)))
+            if missing:
+                raise CommandError(f"Unknown username(s): {', '.join(missing)}")
+        else:
+            # Include users who left the scoped roles so their stale grants are removed.
+            users = User.objects.filter(
+                Q(role__in=SCOPED_ROLES) | Q(mail_visibility_grants__isnull=False)
+            ).distinct()
+
+        total_removed = 0
+        total_added = 0
+        for user in users.order_by("id").iterator():
+            removed, added = sync_user_visibility(user)
+            total_removed += removed
+            total_added += added
+
+        self.stdout.write(self.style.SUCCESS(f"Visibility grants added: {total_added}"))
+        self.stdout.write(self.style.SUCCESS(f"Visibility grants removed: {total_removed}"))
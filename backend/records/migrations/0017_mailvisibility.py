@@ -0,0 +1,72 @@
+import django.db.models.deletion
+from django.conf import settings
+from django.db import migrations, models
+from django.db.models import Q
+
+
+def backfill_mail_visibility(apps, schema_editor):
+    User = apps.get_model('users', 'User')
+    MailRecord = apps.get_model('records', 'MailRecord')
+    MailAssignment = apps.get_model('records', 'MailAssignment')
+    MailVisibility = apps.get_model('records', 'MailVisibility')
+
+    rows = []
+    for user in User.objects.filter(role__in=['SrAO', 'AAO', 'clerk', 'auditor']).iterator():
+        # Highest-priority reason wins: handler, assignee, creator, subsection.
+        grants = {}
+        for mail_id in MailRecord.objects.filter(current_handler_id=user.id).values_list('id', flat=True):
+            grants.setdefault(mail_id, 'handler')
+        for mail_id in MailAssignment.objects.filter(
+            Q(assigned_to_id=user.id) | Q(reassigned_to_id=user.id),
+            status='Active',
+        ).values_list('mail_record_id', flat=True):
+            grants.setdefault(mail_id, 'assignee')
+        if user.role in ('AAO', 'clerk', 'auditor'):
+            for mail_id in MailRecord.objects.filter(created_by_id=user.id).values_list('id', flat=True):
+                grants.setdefault(mail_id, 'creator')
+        if user.subsection_id and user.role in ('SrAO', 'AAO'):
+            subsection_mails = MailRecord.objects.filter(subsection_id=user.subsection_id)
+            if user.role == 'AAO':
+                subsection_mails = subsection_mails.filter(created_by__role='auditor')
+            for mail_id in subsection_mails.values_list('id', flat=True):
+                grants.setdefault(mail_id, 'subsection')
+
+        rows.extend(
+            MailVisibility(mail_record_id=mail_id, user_id=user.id, reason=reason)
+            for mail_id, reason in grants.items()
+        )
+        if len(rows) >= 1000:
+            MailVisibility.objects.bulk_create(rows, ignore_conflicts=True)
+            rows = []
+
+    if rows:
+        MailVisibility.objects.bulk_create(rows, ignore_conflicts=True)
+
+
+def noop_reverse(apps, schema_editor):
+    pass
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('records', '0016_mailrecord_dated'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='MailVisibility',
+            fields=[
+                ('id', models.AutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('reason', models.CharField(choices=[('handler', 'Current handler'), ('assignee', 'Active assignee'), ('creator', 'Creator'), ('subsection', 'Subsection scope')], max_length=10)),
+                ('mail_record', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='visibility_grants', to='records.mailrecord')),
+                ('user', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='mail_visibility_grants', to=settings.AUTH_USER_MODEL)),
+            ],
+            options={
+                'indexes': [models.Index(fields=['user', 'mail_record'], name='records_mai_user_id_df7532_idx')],
+                'constraints': [models.UniqueConstraint(fields=('mail_record', 'user'), name='unique_mail_visibility_per_user')],
+            },
+        ),
+        migrations.RunPython(backfill_mail_visibility, noop_reverse),
+    ]
@@ -0,0 +1,43 @@
+from django.db import migrations, models
+
+
+def seed_sl_no_counters(apps, schema_editor):
+    MailRecord = apps.get_model('records', 'MailRecord')
+    SlNoCounter = apps.get_model('records', 'SlNoCounter')
+
+    # Numeric max per year; string ordering would put 2026/999 after 2026/1000.
+    highest = {}
+    for sl_no in MailRecord.objects.values_list('sl_no', flat=True).iterator():
+        year, _, number = sl_no.partition('/')
+        if year.isdigit() and number.isdigit():
+            highest[int(year)] = max(highest.get(int(year), 0), int(number))
+
+    SlNoCounter.objects.bulk_create(
+        [SlNoCounter(year=year, last_value=last_value) for year, last_value in highest.items()]
+    )
+
+
+def noop_reverse(apps, schema_editor):
+    pass
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('records', '0017_mailvisibility'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='SlNoCounter',
+            fields=[
+                ('year', models.PositiveIntegerField(primary_key=True, serialize=False)),
+                ('last_value', models.PositiveIntegerField(default=0)),
+            ],
+            options={
+                'verbose_name': 'Serial Number Counter',
+                'verbose_name_plural': 'Serial Number Counters',
+            },
+        ),
+        migrations.RunPython(seed_sl_no_counters, noop_reverse),
+    ]
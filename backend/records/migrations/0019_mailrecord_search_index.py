@@ -0,0 +1,24 @@
+from django.db import migrations
+
+
+def install_search_index(apps, schema_editor):
+    from records.search import install_search_index as install
+
+    install(schema_editor.connection)
+
+
+def remove_search_index(apps, schema_editor):
+    from records.search import remove_search_index as remove
+
+    remove(schema_editor.connection)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('records', '0018_slnocounter'),
+    ]
+
+    operations = [
+        migrations.RunPython(install_search_index, remove_search_index),
+    ]
@@ -0,0 +1,24 @@
+from django.db import migrations
+
+
+def install_trigram_indexes(apps, schema_editor):
+    from records.autocomplete import install_trigram_indexes as install
+
+    install(schema_editor.connection)
+
+
+def remove_trigram_indexes(apps, schema_editor):
+    from records.autocomplete import remove_trigram_indexes as remove
+
+    remove(schema_editor.connection)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('records', '0019_mailrecord_search_index'),
+    ]
+
+    operations = [
+        migrations.RunPython(install_trigram_indexes, remove_trigram_indexes),
+    ]
@@ -0,0 +1,56 @@
+import django.db.models.deletion
+import django.utils.timezone
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('records', '0020_autocomplete_trigram_indexes'),
+        ('sections', '0003_alter_section_id_alter_section_name_and_more'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='MailRemoval',
+            fields=[
+                ('id', models.AutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('mail_record_id', models.PositiveIntegerField()),
+                ('removed_at', models.DateTimeField(auto_now_add=True)),
+            ],
+        ),
+        migrations.AddField(
+            model_name='mailvisibility',
+            name='granted_at',
+            field=models.DateTimeField(auto_now_add=True, default=django.utils.timezone.now),
+            preserve_default=False,
+        ),
+        migrations.AddIndex(
+            model_name='mailassignment',
+            index=models.Index(fields=['updated_at'], name='records_mai_updated_534d7c_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='mailrecord',
+            index=models.Index(fields=['updated_at'], name='records_mai_updated_54a0cb_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='mailvisibility',
+            index=models.Index(fields=['user', 'granted_at'], name='records_mai_user_id_59ed61_idx'),
+        ),
+        migrations.AddField(
+            model_name='mailremoval',
+            name='section',
+            field=models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.CASCADE, related_name='+', to='sections.section'),
+        ),
+        migrations.AddField(
+            model_name='mailremoval',
+            name='user',
+            field=models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.CASCADE, related_name='+', to=settings.AUTH_USER_MODEL),
+        ),
+        migrations.AddIndex(
+            model_name='mailremoval',
+            index=models.Index(fields=['removed_at'], name='records_mai_removed_721026_idx'),
+        ),
+    ]
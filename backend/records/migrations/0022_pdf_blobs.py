@@ -0,0 +1,31 @@
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('records', '0021_change_feed'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='PdfBlob',
+            fields=[
+                ('id', models.AutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('content_hash', models.CharField(help_text='SHA-256 of the file', max_length=64, unique=True)),
+                ('name', models.CharField(help_text='Name of the file in the PDF storage', max_length=255)),
+                ('size', models.PositiveIntegerField(help_text='File size in bytes')),
+                ('ref_count', models.PositiveIntegerField(default=0)),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+            ],
+            options={
+                'verbose_name': 'PDF Blob',
+                'verbose_name_plural': 'PDF Blobs',
+            },
+        ),
+        migrations.AddField(
+            model_name='recordattachment',
+            name='content_hash',
+            field=models.CharField(blank=True, db_index=True, default='', help_text='SHA-256 of the file; attachments with the same hash share one PdfBlob. Empty for files stored before deduplication.', max_length=64),
+        ),
+    ]
@@ -0,0 +1,22 @@
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('records', '0022_pdf_blobs'),
+        ('sections', '0003_alter_section_id_alter_section_name_and_more'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='mailrecord',
+            index=models.Index(fields=['from_office'], name='records_mai_from_of_40f87b_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='mailrecord',
+            index=models.Index(fields=['letter_no'], name='records_mai_letter__a38fcf_idx'),
+        ),
+    ]
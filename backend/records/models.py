@@ -1,12 +1,27 @@
 import uuid
 import os
+import re
 
-from django.db import models
+from django.db import IntegrityError, models, transaction
 from django.conf import settings as django_settings
 from django.core.exceptions import ValidationError
 from django.core.files.storage import storages
+from django.db.models.signals import post_delete, post_save
+from django.dispatch import receiver
 from django.utils import timezone
+from jobs.queue import enqueue
 from sections.models import Section, Subsection
+from users.scope import get_user_scope
+
+from .visibility import (
+    ASSIGNMENT_VISIBILITY_FIELDS,
+    MAIL_VISIBILITY_FIELDS,
+    is_scoped_role,
+    sync_mail_visibility,
+    sync_user_visibility,
+    touches_visibility,
+    user_can_see_mail,
+)
 
 
 def get_pdf_storage():
@@ -14,6 +29,13 @@ def get_pdf_storage():
     return storages["pdfs"]
 
 
+def get_pdf_read_storage():
+    """Storage for reading PDF bytes: the local disk cache in front of R2 when PDF_CACHE_DIR is set."""
+    if "pdfs_cache" in django_settings.STORAGES:
+        return storages["pdfs_cache"]
+    return get_pdf_storage()
+
+
 def pdf_upload_path(instance, filename):
     """Store PDF as UUID.pdf, ignoring original filename to prevent path traversal."""
     return f"{uuid.uuid4()}.pdf"
@@ -32,6 +54,92 @@ def validate_pdf_size(value):
         raise ValidationError(f'File size exceeds {max_mb}MB limit.')
 
 
+SL_NO_FORMAT = re.compile(r'^(\d{4})/(\d+)$')
+
+
+def format_sl_no(year, number):
+    """YYYY/NNN, zero-padded to three digits and growing naturally past 999."""
+    return f"{year}/{number:03d}"
+
+
+def allocate_sl_numbers(count=1, year=None):
+    """
+    Hand out `count` consecutive sl_no values for `year` (default: current year).
+    Use count > 1 to reserve a block for bulk imports.
+    """
+    if count < 1:
+        raise ValueError('count must be at least 1.')
+    year = year or timezone.now().year
+    first = SlNoCounter.reserve(year, count)
+    return [format_sl_no(year, number) for number in range(first, first + count)]
+
+
+def claim_sl_no(sl_no):
+    """Advance the year's counter past an explicitly supplied YYYY/NNN value."""
+    match = SL_NO_FORMAT.match(sl_no)
+    if match:
+        SlNoCounter.claim(int(match.group(1)), int(match.group(2)))
+
+
+class SlNoCounter(models.Model):
+    """
+    Per-year sl_no sequence. The row is locked for the duration of the
+    increment, so concurrent creates never race into the sl_no unique constraint.
+    """
+    year = models.PositiveIntegerField(primary_key=True)
+    last_value = models.PositiveIntegerField(default=0)
+
+    class Meta:
+        verbose_name = 'Serial Number Counter'
+        verbose_name_plural = 'Serial Number Counters'
+
+    def __str__(self):
+        return f"{self.year}: {self.last_value}"
+
+    @staticmethod
+    def highest_issued(year):
+        """Highest number already used in MailRecord for this year (numeric, not string, max)."""
+        prefix = f"{year}/"
+        numbers = [
+            int(sl_no[len(prefix):])
+            for sl_no in MailRecord.objects.filter(sl_no__startswith=prefix).values_list('sl_no', flat=True)
+            if sl_no[len(prefix):].isdigit()
+        ]
+        return max(numbers, default=0)
+
+    @classmethod
+    def _locked(cls, year):
+        """The year's counter row, locked for update. Call inside a transaction."""
+        counter = cls.objects.select_for_update().filter(year=year).first()
+        if counter is None:
+            try:
+                # First allocation of the year: seed from any pre-existing records.
+                with transaction.atomic():
+                    counter = cls.objects.create(year=year, last_value=cls.highest_issued(year))
+            except IntegrityError:
+                counter = cls.objects.select_for_update().get(year=year)
+        return counter
+
+    @classmethod
+    def reserve(cls, year, count=1):
+        """Advance the counter by `count` and return the first number of the block."""
+        with transaction.atomic():
+            counter = cls._locked(year)
+            first = counter.last_value + 1
+            counter.last_value += count
+            counter.save(update_fields=['last_value'])
+        return first
+
+    @classmethod
+    def claim(cls, year, number):
+        """Record an explicitly chosen number so later allocations skip past it."""
+        with transaction.atomic():
+            counter = cls._locked(year)
+            if number > counter.last_value:
+                counter.last_value = number
+                counter.save(update_fields=['last_value'])
+
+
 class MailRecord(models.Model):
     CURRENT_ACTION_STATUS_CHOICES = [
         ('Under Review', 'Under Review'),
@@ -164,8 +272,11 @@ class MailRecord(models.Model):
             models.Index(fields=['assigned_to']),
             models.Index(fields=['due_date']),
             models.Index(fields=['created_at']),
+            models.Index(fields=['updated_at']),  # Change feed
             models.Index(fields=['section', 'status']),  # Composite for common filter
             models.Index(fields=['current_action_status']),  # For filtering by current work status
+            models.Index(fields=['from_office']),  # Autocomplete candidates checked against visible mail
+            models.Index(fields=['letter_no']),
         ]
 
     def __str__(self):
@@ -174,18 +285,9 @@ class MailRecord(models.Model):
     def save(self, *args, **kwargs):
         # Generate sl_no if not exists
         if not self.sl_no:
-            year = timezone.now().year
-            last_record = MailRecord.objects.filter(
-                sl_no__startswith=f"{year}/"
-            ).order_by('-sl_no').first()
-
-            if last_record:
-                last_number = int(last_record.sl_no.split('/')[1])
-                new_number = last_number + 1
-            else:
-                new_number = 1
-
-            self.sl_no = f"{year}/{new_number:03d}"
+            self.sl_no = allocate_sl_numbers()[0]
+        elif self._state.adding:
+            claim_sl_no(self.sl_no)
 
         # Auto-set current_handler for open mails when missing.
         # Closed mails intentionally keep current_handler empty.
@@ -196,7 +298,36 @@ class MailRecord(models.Model):
         if not self.monitoring_officer_id and self.assigned_to:
             self.monitoring_officer = self.assigned_to.get_dag()
 
+        previous_scope = getattr(self, '_loaded_scope', None)
         super().save(*args, **kwargs)
+        self._loaded_scope = (self.section_id, self.subsection_id)
+
+        if previous_scope and previous_scope != self._loaded_scope:
+            self._record_section_exit(*previous_scope)
+
+        if touches_visibility(kwargs.get('update_fields'), MAIL_VISIBILITY_FIELDS):
+            sync_mail_visibility(self)
+
+    @classmethod
+    def from_db(cls, db, field_names, values):
+        instance = super().from_db(db, field_names, values)
+        # Remember the owning section as loaded so save() can tell DAGs the mail left their scope.
+        instance._loaded_scope = (
+            instance.__dict__.get('section_id'),
+            instance.__dict__.get('subsection_id'),
+        )
+        return instance
+
+    def _record_section_exit(self, old_section_id, old_subsection_id):
+        if old_section_id is None and old_subsection_id:
+            old_section_id = Subsection.objects.filter(id=old_subsection_id).values_list(
+                'section_id', flat=True
+            ).first()
+        new_section_id = self.section_id
+        if new_section_id is None and self.subsection_id:
+            new_section_id = self.subsection.section_id
+        if old_section_id and old_section_id != new_section_id:
+            MailRemoval.objects.create(mail_record_id=self.id, section_id=old_section_id)
 
     def time_in_current_stage(self):
         """Calculate time spent in current stage
@@ -239,48 +370,10 @@ class MailRecord(models.Model):
 
         if user.is_dag():
             section_id = self.section_id or (self.subsection.section_id if self.subsection_id else None)
-            return bool(section_id and user.sections.filter(id=section_id).exists())
-
-        if user.role == 'SrAO':
-            if user.subsection_id and self.subsection_id == user.subsection_id:
-                return True
-            if self.current_handler_id == user.id:
-                return True
-            from django.db.models import Q
-            return MailAssignment.objects.filter(
-                mail_record=self,
-                status='Active'
-            ).filter(
-                Q(assigned_to=user) | Q(reassigned_to=user)
-            ).exists()
-
-        if user.role == 'AAO':
-            if self.created_by.role == 'auditor' and user.subsection_id and self.subsection_id == user.subsection_id:
-                return True
-            if self.created_by_id == user.id:
-                return True
-            if self.current_handler_id == user.id:
-                return True
-            from django.db.models import Q
-            return MailAssignment.objects.filter(
-                mail_record=self,
-                status='Active'
-            ).filter(
-                Q(assigned_to=user) | Q(reassigned_to=user)
-            ).exists()
-
-        if user.role in ['clerk', 'auditor']:
-            if self.created_by_id == user.id:
-                return True
-            if self.current_handler_id == user.id:
-                return True
-            from django.db.models import Q
-            return MailAssignment.objects.filter(
-                mail_record=self,
-                status='Active'
-            ).filter(
-                Q(assigned_to=user) | Q(reassigned_to=user)
-            ).exists()
+            return get_user_scope(user).manages_section(section_id)
+
+        if is_scoped_role(user):
+            return user_can_see_mail(user, self.id)
 
         return False
 
@@ -295,7 +388,7 @@ class MailRecord(models.Model):
 
         if user.is_dag():
             # DAG can reassign if mail belongs to any of their managed sections
-            return self.section and user.sections.filter(id=self.section.id).exists()
+            return get_user_scope(user).manages_section(self.section_id)
 
         # Current handler can reassign their own mail
         return self.current_handler == user
@@ -322,7 +415,7 @@ class MailRecord(models.Model):
             return True
         if user.is_dag():
             # DAG can multi-assign if mail belongs to any of their managed sections
-            return self.section and user.sections.filter(id=self.section.id).exists()
+            return get_user_scope(user).manages_section(self.section_id)
         return False
 
     @property
@@ -334,7 +427,15 @@ class MailRecord(models.Model):
         return bool(self.current_attachment)
 
     def get_attachment_metadata(self):
-        attachments = list(self.attachments.filter(is_current=True).order_by('upload_stage', '-uploaded_at'))
+        # List views prefetch current attachments for the whole page (see
+        # MailRecordViewSet.get_queryset); fall back to a per-record query otherwise.
+        attachments = getattr(self, 'prefetched_current_attachments', None)
+        if attachments is None:
+            attachments = list(
+                self.attachments.filter(is_current=True)
+                .select_related('uploaded_by')
+                .order_by('upload_stage', '-uploaded_at')
+            )
         if not attachments:
             return {
                 'has_attachment': False,
@@ -437,6 +538,7 @@ class MailAssignment(models.Model):
         indexes = [
             models.Index(fields=['mail_record', 'status']),
             models.Index(fields=['assigned_to', 'status']),
+            models.Index(fields=['updated_at']),  # Change feed
         ]
         # Prevent duplicate active assignments to same user for same mail
         constraints = [
@@ -450,6 +552,11 @@ class MailAssignment(models.Model):
     def __str__(self):
         return f"{self.mail_record.sl_no} -> {self.assigned_to.full_name} ({self.status})"
 
+    def save(self, *args, **kwargs):
+        super().save(*args, **kwargs)
+        if touches_visibility(kwargs.get('update_fields'), ASSIGNMENT_VISIBILITY_FIELDS):
+            sync_mail_visibility(self.mail_record)
+
     def get_remarks_timeline(self):
         """Get all remarks in chronological order"""
         return self.remarks_timeline.all()
@@ -459,6 +566,91 @@ class MailAssignment(models.Model):
         return self.reassigned_to or self.assigned_to
 
 
+class MailVisibility(models.Model):
+    """
+    Materialized visibility grant for SrAO/AAO/clerk/auditor users.
+    One row per (mail, user); maintained on write by records.visibility.
+    """
+    REASON_CHOICES = [
+        ('handler', 'Current handler'),
+        ('assignee', 'Active assignee'),
+        ('creator', 'Creator'),
+        ('subsection', 'Subsection scope'),
+    ]
+
+    mail_record = models.ForeignKey(
+        MailRecord,
+        on_delete=models.CASCADE,
+        related_name='visibility_grants'
+    )
+    user = models.ForeignKey(
+        django_settings.AUTH_USER_MODEL,
+        on_delete=models.CASCADE,
+        related_name='mail_visibility_grants'
+    )
+    reason = models.CharField(max_length=10, choices=REASON_CHOICES)
+    granted_at = models.DateTimeField(auto_now_add=True)
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(
+                fields=['mail_record', 'user'],
+                name='unique_mail_visibility_per_user'
+            )
+        ]
+        indexes = [
+            models.Index(fields=['user', 'mail_record']),
+            models.Index(fields=['user', 'granted_at']),
+        ]
+
+    def __str__(self):
+        return f"{self.mail_record_id} -> user {self.user_id} ({self.reason})"
+
+
+class MailRemoval(models.Model):
+    """
+    Tombstone for the change feed (/api/records/changes/).
+    No user/section: the mail was deleted. user: it left that user's grants.
+    section: it moved out of that section, so the section's DAGs lost it.
+    """
+    mail_record_id = models.PositiveIntegerField()
+    user = models.ForeignKey(
+        django_settings.AUTH_USER_MODEL,
+        on_delete=models.CASCADE,
+        null=True,
+        blank=True,
+        related_name='+'
+    )
+    section = models.ForeignKey(
+        Section,
+        on_delete=models.CASCADE,
+        null=True,
+        blank=True,
+        related_name='+'
+    )
+    removed_at = models.DateTimeField(auto_now_add=True)
+
+    class Meta:
+        indexes = [
+            models.Index(fields=['removed_at']),
+        ]
+
+    def __str__(self):
+        return f"{self.mail_record_id} removed at {self.removed_at}"
+
+
+@receiver(post_delete, sender=MailRecord)
+def record_mail_deletion(sender, instance, **kwargs):
+    MailRemoval.objects.create(mail_record_id=instance.id)
+
+
+@receiver(post_save, sender=django_settings.AUTH_USER_MODEL)
+def grant_new_user_visibility(sender, instance, created, raw=False, **kwargs):
+    # New SrAO/AAO users see their subsection's mail; later role/subsection edits re-sync explicitly.
+    if created and not raw and is_scoped_role(instance):
+        sync_user_visibility(instance)
+
+
 class AssignmentRemark(models.Model):
     """
     Append-only remarks timeline for each assignment.
@@ -525,6 +717,13 @@ class RecordAttachment(models.Model):
         default=True,
         help_text="False when superseded by a replacement for the same stage"
     )
+    content_hash = models.CharField(
+        max_length=64,
+        blank=True,
+        default='',
+        db_index=True,
+        help_text="SHA-256 of the file; attachments with the same hash share one PdfBlob. Empty for files stored before deduplication."
+    )
 
     class Meta:
         ordering = ['-uploaded_at']
@@ -562,9 +761,63 @@ class RecordAttachment(models.Model):
             return f"{size_bytes / (1024 * 1024):.1f} MB"
 
     def delete_file(self):
-        """Delete file from configured storage backend."""
-        if self.file:
-            storage = self.file.storage
-            file_name = self.file.name
-            if file_name and storage.exists(file_name):
-                storage.delete(file_name)
+        """
+        Delete file from configured storage backend. A deduplicated file is
+        only deleted once no other attachment references its PdfBlob.
+        """
+        if not self.file:
+            return
+        storage = self.file.storage
+        file_name = self.file.name
+        if self.content_hash:
+            with transaction.atomic():
+                blob = PdfBlob.objects.select_for_update().filter(content_hash=self.content_hash).first()
+                if blob is None:
+                    return
+                # This attachment's own reference is released when its row is deleted.
+                own_reference = int(
+                    self.pk is not None and RecordAttachment.objects.filter(pk=self.pk).exists()
+                )
+                if blob.ref_count > own_reference:
+                    return
+                file_name = blob.name
+                blob.delete()
+            storage.delete(file_name)
+            return
+        if file_name and storage.exists(file_name):
+            storage.delete(file_name)
+
+
+class PdfBlob(models.Model):
+    """
+    One stored PDF per unique content. RecordAttachments with the same
+    content_hash point at the same file; ref_count is how many of them exist.
+    """
+    content_hash = models.CharField(max_length=64, unique=True, help_text="SHA-256 of the file")
+    name = models.CharField(max_length=255, help_text="Name of the file in the PDF storage")
+    size = models.PositiveIntegerField(help_text="File size in bytes")
+    ref_count = models.PositiveIntegerField(default=0)
+    created_at = models.DateTimeField(auto_now_add=True)
+
+    class Meta:
+        verbose_name = 'PDF Blob'
+        verbose_name_plural = 'PDF Blobs'
+
+    def __str__(self):
+        return f"{self.name} ({self.ref_count} references)"
+
+
+@receiver(post_delete, sender=RecordAttachment)
+def release_pdf_blob(sender, instance, **kwargs):
+    """Drop the attachment's reference; the last one deletes the blob and queues its file for removal."""
+    if not instance.content_hash:
+        return
+    with transaction.atomic():
+        blob = PdfBlob.objects.select_for_update().filter(content_hash=instance.content_hash).first()
+        if blob is None:
+            return
+        if blob.ref_count > 1:
+            PdfBlob.objects.filter(pk=blob.pk).update(ref_count=models.F('ref_count') - 1)
+            return
+        blob.delete()
+        enqueue('records.delete_blobs', {'names': [blob.name]})
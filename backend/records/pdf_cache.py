@@ -0,0 +1,174 @@
+"""
+Read-through local disk cache in front of the R2 PDF storage.
+
+Configured as STORAGES["pdfs_cache"] when PDF_CACHE_DIR is set and used for
+server-side reads of attachment bytes (see get_pdf_read_storage). Writes and
+deletes go straight to the origin storage. Stored names are UUIDs that are
+never reused, so cached copies never go stale and only need evicting for space.
+
+Several gunicorn workers share the directory: copies are downloaded to a temp
+file and renamed into place atomically, reads touch the file's mtime, and
+eviction (oldest mtime first, until the directory fits max_bytes) runs under
+an flock so workers do not evict on top of each other. Removing a file another
+worker is still reading is safe on POSIX.
+"""
+import logging
+import os
+import tempfile
+import threading
+import time
+
+from django.core.files import File
+from django.core.files.storage import Storage, storages
+from django.utils.functional import cached_property
+from django.utils.text import get_valid_filename
+
+try:
+    import fcntl
+except ImportError:  # Windows dev machines: eviction still works, just without the lock
+    fcntl = None
+
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_MAX_BYTES = 512 * 1024 * 1024
+TMP_PREFIX = '.tmp-'
+LOCK_NAME = '.evict.lock'
+STALE_TMP_SECONDS = 3600
+
+
+class LocalCacheStorage(Storage):
+    def __init__(self, origin='pdfs', location=None, max_bytes=DEFAULT_MAX_BYTES):
+        self._origin = origin
+        self.location = os.path.abspath(location or os.path.join(tempfile.gettempdir(), 'pdf-cache'))
+        self.max_bytes = int(max_bytes)
+        self._stats_lock = threading.Lock()
+        self._stats = {'hits': 0, 'misses': 0, 'evictions': 0}
+        os.makedirs(self.location, exist_ok=True)
+
+    @cached_property
+    def origin(self):
+        """The wrapped storage; `origin` may be a STORAGES alias or a Storage instance."""
+        return storages[self._origin] if isinstance(self._origin, str) else self._origin
+
+    def stats(self):
+        """Hit/miss/eviction counts for this process."""
+        with self._stats_lock:
+            return {**self._stats, 'max_bytes': self.max_bytes}
+
+    def _count(self, key, amount=1):
+        with self._stats_lock:
+            self._stats[key] += amount
+
+    def cache_path(self, name):
+        return os.path.join(self.location, get_valid_filename(name.replace('/', '__')))
+
+    def _open(self, name, mode='rb'):
+        if any(flag in mode for flag in 'wa+'):
+            return self.origin.open(name, mode)
+
+        path = self.cache_path(name)
+        try:
+            cached = open(path, 'rb')
+        except FileNotFoundError:
+            self._count('misses')
+            self._fill(name, path)
+            try:
+                cached = open(path, 'rb')
+            except FileNotFoundError:
+                # Evicted by another worker straight away; read from the origin this time.
+                return self.origin.open(name, mode)
+        else:
+            self._count('hits')
+            try:
+                os.utime(path)
+            except OSError:
+                pass
+        return File(cached, name=name)
+
+    def _fill(self, name, path):
+        fd, tmp_path = tempfile.mkstemp(prefix=TMP_PREFIX, dir=self.location)
+        try:
+            with os.fdopen(fd, 'wb') as target, self.origin.open(name, 'rb') as source:
+                for chunk in source.chunks():
+                    target.write(chunk)
+            os.replace(tmp_path, path)
+        except BaseException:
+            try:
+                os.remove(tmp_path)
+            except OSError:
+                pass
+            raise
+        self.evict()
+
+    def _entries(self):
+        now = time.time()
+        entries = []
+        with os.scandir(self.location) as scan:
+            for entry in scan:
+                if entry.name == LOCK_NAME or not entry.is_file():
+                    continue
+                try:
+                    stat = entry.stat()
+                except FileNotFoundError:
+                    continue
+                if entry.name.startswith(TMP_PREFIX):
+                    # Left behind by a worker that died mid-download.
+                    if now - stat.st_mtime > STALE_TMP_SECONDS:
+                        self._remove(entry.path)
+                    continue
+                entries.append((stat.st_mtime, stat.st_size, entry.path))
+        return entries
+
+    @staticmethod
+    def _remove(path):
+        try:
+            os.remove(path)
+            return True
+        except OSError:
+            return False
+
+    def evict(self):
+        """Remove least recently read copies until the cache fits max_bytes; returns how many went."""
+        with open(os.path.join(self.location, LOCK_NAME), 'a') as lock_file:
+            if fcntl is not None:
+                fcntl.flock(lock_file, fcntl.LOCK_EX)
+            try:
+                entries = self._entries()
+                total = sum(size for _, size, _ in entries)
+                evicted = 0
+                for _, size, path in sorted(entries):
+                    if total <= self.max_bytes:
+                        break
+                    if self._remove(path):
+                        evicted += 1
+                    total -= size
+            finally:
+                if fcntl is not None:
+                    fcntl.flock(lock_file, fcntl.LOCK_UN)
+        if evicted:
+            self._count('evictions', evicted)
+            logger.info('PDF cache evicted %s file(s); %s bytes remain', evicted, total)
+        return evicted
+
+    def save(self, name, content, max_length=None):
+        return self.origin.save(name, content, max_length=max_length)
+
+    def delete(self, name):
+        self._remove(self.cache_path(name))
+        self.origin.delete(name)
+
+    def exists(self, name):
+        return os.path.exists(self.cache_path(name)) or self.origin.exists(name)
+
+    def size(self, name):
+        try:
+            return os.path.getsize(self.cache_path(name))
+        except OSError:
+            return self.origin.size(name)
+
+    def listdir(self, path):
+        return self.origin.listdir(path)
+
+    def url(self, name):
+        return self.origin.url(name)
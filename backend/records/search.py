@@ -0,0 +1,175 @@
+"""
+Database-native full-text search over mail records.
+
+PostgreSQL: a generated `search_vector` tsvector column with a GIN index.
+SQLite: an external-content FTS5 table kept in step by triggers.
+Other backends fall back to DRF's icontains search.
+
+The column/table live outside the Django model; install_search_index() is run
+by migration 0019 and again after every migrate, because SQLite table rebuilds
+(ALTER emulation) drop the triggers.
+"""
+import re
+
+from django.db import connections
+from django.db.models import BooleanField, FloatField
+from django.db.models.expressions import RawSQL
+from rest_framework.filters import SearchFilter
+
+
+TABLE = 'records_mailrecord'
+FTS_TABLE = 'records_mailrecord_fts'
+
+# (column, PostgreSQL weight, SQLite bm25 weight), most significant first.
+SEARCH_COLUMNS = [
+    ('mail_reference_subject', 'A', 10.0),
+    ('letter_no', 'A', 10.0),
+    ('from_office', 'B', 5.0),
+    ('action_required', 'C', 2.0),
+    ('current_action_remarks', 'D', 1.0),
+    ('consolidated_remarks', 'D', 1.0),
+]
+
+SL_NO_PATTERN = re.compile(r'^\d{4}/\d*$')
+
+
+def _postgres_install_sql():
+    vector = ' || '.join(
+        f"setweight(to_tsvector('simple'::regconfig, coalesce({column}, '')), '{weight}')"
+        for column, weight, _ in SEARCH_COLUMNS
+    )
+    return [
+        f'ALTER TABLE {TABLE} ADD COLUMN IF NOT EXISTS search_vector tsvector '
+        f'GENERATED ALWAYS AS ({vector}) STORED',
+        f'CREATE INDEX IF NOT EXISTS {TABLE}_search_gin ON {TABLE} USING GIN (search_vector)',
+    ]
+
+
+def _sqlite_install_sql():
+    columns = [column for column, _, _ in SEARCH_COLUMNS]
+    column_list = ', '.join(columns)
+    new_values = ', '.join(f'new.{column}' for column in columns)
+    old_values = ', '.join(f'old.{column}' for column in columns)
+    delete_old = (
+        f"INSERT INTO {FTS_TABLE}({FTS_TABLE}, rowid, {column_list}) "
+        f"VALUES('delete', old.id, {old_values});"
+    )
+    insert_new = f'INSERT INTO {FTS_TABLE}(rowid, {column_list}) VALUES (new.id, {new_values});'
+    return [
+        f"CREATE VIRTUAL TABLE IF NOT EXISTS {FTS_TABLE} USING fts5("
+        f"{column_list}, content='{TABLE}', content_rowid='id')",
+        f'CREATE TRIGGER IF NOT EXISTS {FTS_TABLE}_ai AFTER INSERT ON {TABLE} BEGIN {insert_new} END',
+        f'CREATE TRIGGER IF NOT EXISTS {FTS_TABLE}_ad AFTER DELETE ON {TABLE} BEGIN {delete_old} END',
+        f'CREATE TRIGGER IF NOT EXISTS {FTS_TABLE}_au AFTER UPDATE ON {TABLE} BEGIN {delete_old} {insert_new} END',
+    ]
+
+
+def _sqlite_triggers_present(cursor):
+    cursor.execute(
+        "SELECT COUNT(*) FROM sqlite_master WHERE type = 'trigger' AND tbl_name = %s AND name LIKE %s",
+        [TABLE, f'{FTS_TABLE}_%'],
+    )
+    return cursor.fetchone()[0] == 3
+
+
+def install_search_index(connection):
+    """Create (idempotently) the search column/table for this connection's backend."""
+    if connection.vendor == 'postgresql':
+        with connection.cursor() as cursor:
+            for statement in _postgres_install_sql():
+                cursor.execute(statement)
+    elif connection.vendor == 'sqlite':
+        with connection.cursor() as cursor:
+            if _sqlite_triggers_present(cursor):
+                return
+            for statement in _sqlite_install_sql():
+                cursor.execute(statement)
+            # Missing triggers mean writes may have gone unindexed; re-read the content table.
+            cursor.execute(f"INSERT INTO {FTS_TABLE}({FTS_TABLE}) VALUES('rebuild')")
+
+
+def remove_search_index(connection):
+    if connection.vendor == 'postgresql':
+        with connection.cursor() as cursor:
+            cursor.execute(f'DROP INDEX IF EXISTS {TABLE}_search_gin')
+            cursor.execute(f'ALTER TABLE {TABLE} DROP COLUMN IF EXISTS search_vector')
+    elif connection.vendor == 'sqlite':
+        with connection.cursor() as cursor:
+            for suffix in ('ai', 'ad', 'au'):
+                cursor.execute(f'DROP TRIGGER IF EXISTS {FTS_TABLE}_{suffix}')
+            cursor.execute(f'DROP TABLE IF EXISTS {FTS_TABLE}')
+
+
+def ensure_search_index(sender, using='default', **kwargs):
+    """post_migrate hook: reinstall triggers dropped by SQLite table rebuilds."""
+    connection = connections[using]
+    if TABLE in connection.introspection.table_names():
+        install_search_index(connection)
+
+
+def search_tokens(term):
+    return re.findall(r'\w+', term or '')
+
+
+def apply_full_text_search(queryset, term):
+    """
+    Restrict `queryset` to records matching `term` and annotate `search_rank`
+    (higher is better). Every token must match, as a prefix.
+    Returns None when the backend has no native index.
+    """
+    tokens = search_tokens(term)
+    vendor = connections[queryset.db].vendor
+    if not tokens or vendor not in ('postgresql', 'sqlite'):
+        return None
+
+    if vendor == 'postgresql':
+        tsquery = ' & '.join(f'{token}:*' for token in tokens)
+        match = RawSQL(
+            f"{TABLE}.search_vector @@ to_tsquery('simple', %s)",
+            (tsquery,),
+            output_field=BooleanField(),
+        )
+        rank = RawSQL(
+            f"ts_rank_cd({TABLE}.search_vector, to_tsquery('simple', %s))",
+            (tsquery,),
+            output_field=FloatField(),
+        )
+    else:
+        fts_query = ' '.join(f'"{token}"*' for token in tokens)
+        weights = ', '.join(str(weight) for _, _, weight in SEARCH_COLUMNS)
+        match = RawSQL(
+            f'{TABLE}.id IN (SELECT rowid FROM {FTS_TABLE} WHERE {FTS_TABLE} MATCH %s)',
+            (fts_query,),
+            output_field=BooleanField(),
+        )
+        # bm25() is lower-is-better; negate so both backends sort rank descending.
+        rank = RawSQL(
+            f'(SELECT -bm25({FTS_TABLE}, {weights}) FROM {FTS_TABLE} '
+            f'WHERE {FTS_TABLE} MATCH %s AND rowid = {TABLE}.id)',
+            (fts_query,),
+            output_field=FloatField(),
+        )
+
+    return (
+        queryset.filter(match)
+        .annotate(search_rank=rank)
+        .order_by('-search_rank', '-created_at', '-id')
+    )
+
+
+class MailRecordSearchFilter(SearchFilter):
+    """
+    `?search=` backed by the native index, ranked by relevance.
+    sl_no lookups ("2025/01") keep using the unique index on sl_no.
+    """
+
+    def filter_queryset(self, request, queryset, view):
+        term = ' '.join(self.get_search_terms(request))
+        if not term:
+            return queryset
+        if SL_NO_PATTERN.match(term):
+            return queryset.filter(sl_no__startswith=term)
+        ranked = apply_full_text_search(queryset, term)
+        if ranked is None:
+            return super().filter_queryset(request, queryset, view)
+        return ranked
@@ -2,16 +2,36 @@ import os
 
 from rest_framework import serializers
 from .models import MailRecord, MailAssignment, AssignmentRemark
+from users.scope import get_user_scope
 from users.serializers import UserMinimalSerializer
 from sections.serializers import SectionSerializer, SubsectionSerializer
 from sections.models import Section, Subsection
+from users.models import User
 
 
-def _officer_in_dag_sections(officer, dag_section_ids):
+def _dag_sections_by_officer(user):
+    """
+    {DAG id: managed section ids} for every DAG, read with one query and kept
+    for as long as the caller's scope snapshot (i.e. the request).
+    """
+    scope = get_user_scope(user)
+    cached = user.__dict__.get('_dag_sections_by_officer')
+    if cached is not None and cached[0] is scope:
+        return cached[1]
+    sections = {}
+    for officer_id, section_id in User.sections.through.objects.filter(user__role='DAG').values_list(
+        'user_id', 'section_id'
+    ):
+        sections.setdefault(officer_id, set()).add(section_id)
+    user.__dict__['_dag_sections_by_officer'] = (scope, sections)
+    return sections
+
+
+def _officer_in_dag_sections(officer, dag_section_ids, dag_sections_by_officer):
     if not officer:
         return False
     if officer.role == 'DAG':
-        return officer.sections.filter(id__in=dag_section_ids).exists()
+        return bool(dag_sections_by_officer.get(officer.id, set()) & dag_section_ids)
     if officer.subsection_id:
         return officer.subsection.section_id in dag_section_ids
     return False
@@ -28,7 +48,8 @@ def _get_visible_assignments(obj, user):
         return assignments
 
     if user.is_dag():
-        dag_section_ids = set(user.sections.values_list('id', flat=True))
+        dag_section_ids = get_user_scope(user).section_ids
+        dag_sections_by_officer = None
         visible = []
         for assignment in assignments:
             current_assignee = assignment.reassigned_to or assignment.assigned_to
@@ -43,10 +64,12 @@ def _get_visible_assignments(obj, user):
                 continue
 
             # Include assignments in DAG-managed section scope only
+            if dag_sections_by_officer is None:
+                dag_sections_by_officer = _dag_sections_by_officer(user)
             if (
-                _officer_in_dag_sections(assignment.assigned_to, dag_section_ids)
-                or _officer_in_dag_sections(assignment.reassigned_to, dag_section_ids)
-                or _officer_in_dag_sections(current_assignee, dag_section_ids)
+                _officer_in_dag_sections(assignment.assigned_to, dag_section_ids, dag_sections_by_officer)
+                or _officer_in_dag_sections(assignment.reassigned_to, dag_section_ids, dag_sections_by_officer)
+                or _officer_in_dag_sections(current_assignee, dag_section_ids, dag_sections_by_officer)
             ):
                 visible.append(assignment)
         return visible
@@ -358,7 +381,7 @@ class MailRecordCreateSerializer(serializers.ModelSerializer):
             elif user.is_dag():
                 # DAG: validate selected section is one they manage
                 if selected_section is not None:
-                    if not user.sections.filter(id=selected_section_id).exists():
+                    if not get_user_scope(user).manages_section(selected_section_id):
                         raise serializers.ValidationError({
                             'section': 'You can only create mails for sections you manage.'
                         })
@@ -585,14 +608,53 @@ class PDFUploadSerializer(serializers.Serializer):
 
         # Validate size (settings fallback if not configured)
         from django.conf import settings
-        max_size = getattr(settings, 'FILE_UPLOAD_MAX_MEMORY_SIZE', 10 * 1024 * 1024)
-        if value.size > max_size:
-            max_mb = max_size // (1024 * 1024)
+        max_mb = getattr(settings, 'MAX_PDF_SIZE_MB', 10)
+        if value.size > max_mb * 1024 * 1024:
             raise serializers.ValidationError(f"File size exceeds {max_mb}MB limit. Received {value.size / (1024*1024):.1f}MB.")
 
         return value
 
 
+class PDFUploadUrlSerializer(serializers.Serializer):
+    """Request for a presigned direct-to-storage upload URL."""
+    filename = serializers.CharField(
+        max_length=255,
+        help_text="Original file name; must end in .pdf."
+    )
+    upload_stage = serializers.ChoiceField(
+        choices=[('created', 'Created'), ('closed', 'Closed')],
+        help_text="Workflow stage this PDF belongs to: 'created' or 'closed'."
+    )
+    sha256 = serializers.RegexField(
+        r'^[0-9a-fA-F]{64}$',
+        help_text="Hex SHA-256 of the file; signed into the upload URL and checked on finalize."
+    )
+    size = serializers.IntegerField(
+        min_value=1,
+        help_text="File size in bytes; signed into the upload URL."
+    )
+
+    def validate_filename(self, value):
+        if os.path.splitext(value)[1].lower() != '.pdf':
+            raise serializers.ValidationError("Only PDF files are allowed. File must have a .pdf extension.")
+        return value
+
+    def validate_sha256(self, value):
+        return value.lower()
+
+    def validate_size(self, value):
+        from django.conf import settings
+        max_mb = getattr(settings, 'MAX_PDF_SIZE_MB', 10)
+        if value > max_mb * 1024 * 1024:
+            raise serializers.ValidationError(f"File size exceeds {max_mb}MB limit.")
+        return value
+
+
+class PDFFinalizeSerializer(serializers.Serializer):
+    """Completes a direct upload issued by the upload-url endpoint."""
+    upload_token = serializers.CharField()
+
+
 class PDFMetadataSerializer(serializers.Serializer):
     """Read-only serializer for PDF attachment metadata response."""
     exists = serializers.BooleanField()
@@ -0,0 +1,155 @@
+"""
+Server-sent event stream of record activity (see records.events).
+
+The stream is served by config/asgi.py (uvicorn) and is not routed on the
+WSGI app: an open stream only costs a coroutine there, where under gunicorn it
+would hold a worker thread for as long as the tab stays open.
+
+EventSource cannot send headers, and a JWT in the query string ends up in
+access and proxy logs. Clients therefore POST to /api/records/events/ticket/
+(normal JWT auth, served by either app) for a short-lived ticket that is only
+good for opening the stream, and pass that as ?ticket=...
+"""
+import asyncio
+import json
+import queue
+from urllib.parse import parse_qs
+
+from asgiref.sync import sync_to_async
+from django.conf import settings
+from django.core import signing
+from django.db import close_old_connections
+from rest_framework import status
+from rest_framework.permissions import IsAuthenticated
+from rest_framework.response import Response
+from rest_framework.views import APIView
+
+from users.models import User
+from .events import broker
+
+
+EVENT_STREAM_PATH = '/api/records/events/'
+HEARTBEAT_SECONDS = 15
+RECONNECT_MS = 5000
+# How often an idle stream checks its queue; events are fed from threads (the poller, or commits).
+DELIVERY_CHECK_SECONDS = 0.5
+TICKET_SALT = 'records.event-stream'
+
+
+def stream_lifetime():
+    return getattr(settings, 'RECORD_EVENTS_STREAM_SECONDS', 300)
+
+
+def ticket_max_age():
+    return getattr(settings, 'RECORD_EVENTS_TICKET_SECONDS', 30)
+
+
+class EventStreamTicketView(APIView):
+    """POST /api/records/events/ticket/ -> {"ticket": ..., "expires_in": seconds}"""
+    permission_classes = [IsAuthenticated]
+
+    def post(self, request):
+        ticket = signing.dumps({'user': request.user.id}, salt=TICKET_SALT)
+        return Response({'ticket': ticket, 'expires_in': ticket_max_age()}, status=status.HTTP_200_OK)
+
+
+def _authenticate(ticket):
+    if not ticket:
+        return None
+    try:
+        payload = signing.loads(ticket, salt=TICKET_SALT, max_age=ticket_max_age())
+    except signing.BadSignature:
+        return None
+    return User.objects.filter(pk=payload['user'], is_active=True).first()
+
+
+def _open_subscription(ticket):
+    close_old_connections()
+    user = _authenticate(ticket)
+    if user is None:
+        return None
+    return broker.subscribe(user)
+
+
+def format_event(event):
+    lines = []
+    if event.get('id') is not None:
+        lines.append(f"id: {event['id']}")
+    lines.append(f"event: {event['type']}")
+    lines.append(f"data: {json.dumps(event['data'], separators=(',', ':'))}")
+    return '\n'.join(lines) + '\n\n'
+
+
+async def _event_chunks(subscription, lifetime, disconnected):
+    loop = asyncio.get_running_loop()
+    deadline = loop.time() + lifetime
+    heartbeat_at = loop.time() + HEARTBEAT_SECONDS
+    yield f'retry: {RECONNECT_MS}\n\n'
+    while not disconnected.is_set() and loop.time() < deadline:
+        try:
+            event = subscription.queue.get_nowait()
+        except queue.Empty:
+            if loop.time() >= heartbeat_at:
+                heartbeat_at = loop.time() + HEARTBEAT_SECONDS
+                yield ': keep-alive\n\n'
+            await asyncio.sleep(min(DELIVERY_CHECK_SECONDS, max(deadline - loop.time(), 0)))
+            continue
+        yield format_event(event)
+        if subscription.overflowed:
+            subscription.overflowed = False
+            yield format_event({'type': 'resync', 'data': {}})
+
+
+def _cors_headers(scope):
+    origin = dict(scope.get('headers', [])).get(b'origin', b'').decode('latin-1')
+    if origin and origin in getattr(settings, 'CORS_ALLOWED_ORIGINS', []):
+        return [(b'access-control-allow-origin', origin.encode('latin-1')), (b'vary', b'origin')]
+    return []
+
+
+async def _send_json(scope, send, status_code, payload):
+    await send({
+        'type': 'http.response.start',
+        'status': status_code,
+        'headers': [(b'content-type', b'application/json'), *_cors_headers(scope)],
+    })
+    await send({'type': 'http.response.body', 'body': json.dumps(payload).encode('utf-8')})
+
+
+async def event_stream_app(scope, receive, send):
+    """ASGI app for GET /api/records/events/?ticket=..."""
+    if scope['method'] != 'GET':
+        await _send_json(scope, send, 405, {'error': 'Method not allowed'})
+        return
+    ticket = parse_qs(scope.get('query_string', b'').decode('latin-1')).get('ticket', [''])[0]
+    subscription = await sync_to_async(_open_subscription)(ticket)
+    if subscription is None:
+        await _send_json(scope, send, 401, {'error': 'Stream ticket is missing, invalid or expired.'})
+        return
+
+    disconnected = asyncio.Event()
+
+    async def watch_disconnect():
+        while (await receive())['type'] != 'http.disconnect':
+            pass
+        disconnected.set()
+
+    watcher = asyncio.ensure_future(watch_disconnect())
+    try:
+        await send({
+            'type': 'http.response.start',
+            'status': 200,
+            'headers': [
+                (b'content-type', b'text/event-stream'),
+                (b'cache-control', b'no-cache'),
+                # nginx must not buffer the stream.
+                (b'x-accel-buffering', b'no'),
+                *_cors_headers(scope),
+            ],
+        })
+        async for chunk in _event_chunks(subscription, stream_lifetime(), disconnected):
+            await send({'type': 'http.response.body', 'body': chunk.encode('utf-8'), 'more_body': True})
+        await send({'type': 'http.response.body', 'body': b''})
+    finally:
+        watcher.cancel()
+        broker.unsubscribe(subscription)
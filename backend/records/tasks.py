@@ -0,0 +1,19 @@
+from datetime import timedelta
+
+from jobs.queue import task
+
+from .changes import prune_removals
+from .models import get_pdf_storage
+
+
+@task('records.delete_blobs', max_attempts=5)
+def delete_blobs(names):
+    # Deleting a missing key is a no-op on S3/R2, so a retried job is safe.
+    storage = get_pdf_storage()
+    for name in names:
+        storage.delete(name)
+
+
+@task('records.prune_change_feed', every=timedelta(days=1))
+def prune_change_feed():
+    prune_removals()
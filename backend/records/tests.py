@@ -1,18 +1,54 @@
+import asyncio
+import hashlib
+import os
 from datetime import timedelta
+from io import StringIO
 import shutil
 import tempfile
-
+from unittest import skipIf
+from unittest.mock import patch
+
+from asgiref.sync import async_to_sync
+from django.conf import settings
+from django.core import signing
+from django.core.files.base import ContentFile
+from django.core.files.storage import FileSystemStorage
 from django.core.files.uploadedfile import SimpleUploadedFile
-from django.test import override_settings
+from django.core.management import call_command
+from django.db import connection
+from django.test import SimpleTestCase, override_settings
+from django.test.utils import CaptureQueriesContext
 from django.urls import reverse
 from django.utils import timezone
 from rest_framework import status
 from rest_framework.test import APITestCase
-
-from records.models import MailAssignment, MailRecord
+from storages.backends.s3 import S3Storage
+
+from jobs.queue import run_pending_jobs
+from records.autocomplete import value_tables
+from records.events import broker
+from records.models import (
+    MailAssignment,
+    MailRecord,
+    MailVisibility,
+    PdfBlob,
+    RecordAttachment,
+    SlNoCounter,
+    allocate_sl_numbers,
+)
+from records.pdf_cache import LocalCacheStorage
+from records.streams import EVENT_STREAM_PATH, RECONNECT_MS
+from records.uploads import UploadRejected, attach_pdf, claim_upload, verify_upload
+from records.visibility import sync_created_mail_visibility
 from sections.models import Section, Subsection
 from users.models import User
 
+try:
+    import requests
+    from moto import mock_aws
+except ImportError:  # moto is a test-only dependency
+    mock_aws = None
+
 
 class MailRecordWorkflowTests(APITestCase):
     @staticmethod
@@ -240,6 +276,89 @@ class MailRecordListFilteringTests(APITestCase):
             created_by=self.ag,
         )
 
+    def test_search_is_ranked_and_respects_role_scope(self):
+        subject_hit = self._create_mail('PENS/11', 'Pension revision arrears', self.alpha_aao,
+                                        self.section_alpha, self.sub_alpha_1)
+        remark_hit = self._create_mail('GEN/12', 'General correspondence', self.alpha_aao,
+                                       self.section_alpha, self.sub_alpha_1)
+        remark_hit.current_action_remarks = 'Awaiting pension file'
+        remark_hit.save(update_fields=['current_action_remarks'])
+        self._create_mail('PENS/13', 'Pension revision for beta', self.beta_aao,
+                          self.section_beta, self.sub_beta_1)
+        self._create_mail('GEN/14', 'Unrelated', self.alpha_aao, self.section_alpha, self.sub_alpha_1)
+
+        self.client.force_authenticate(self.alpha_aao)
+        response = self.client.get(reverse('mailrecord-list'), {'search': 'pens'})
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual([row['id'] for row in self._rows(response)], [subject_hit.id, remark_hit.id])
+
+        # Cursor pagination would re-sort by recency; searches keep relevance order.
+        response = self.client.get(reverse('mailrecord-list'), {'search': 'pens', 'pagination': 'cursor'})
+        self.assertEqual([row['id'] for row in self._rows(response)], [subject_hit.id, remark_hit.id])
+
+        response = self.client.get(reverse('mailrecord-list'), {'search': 'pension revision'})
+        self.assertEqual([row['id'] for row in self._rows(response)], [subject_hit.id])
+
+        response = self.client.get(reverse('mailrecord-list'), {'search': subject_hit.sl_no})
+        self.assertEqual([row['id'] for row in self._rows(response)], [subject_hit.id])
+
+    def test_autocomplete_returns_prefix_then_fuzzy_distinct_values(self):
+        offices = ['Accountant General Office', 'Accounts Branch', 'Treasury Office', 'Treasury Office']
+        for idx, office in enumerate(offices):
+            mail = self._create_mail(f'AC/{idx}', 'Autocomplete', self.alpha_aao,
+                                     self.section_alpha, self.sub_alpha_1)
+            mail.from_office = office
+            mail.save(update_fields=['from_office'])
+        hidden = self._create_mail('AC/HIDDEN', 'Autocomplete', self.beta_aao,
+                                   self.section_beta, self.sub_beta_1)
+        hidden.from_office = 'Accounts Vigilance Cell'
+        hidden.save(update_fields=['from_office'])
+        value_tables['from_office'].invalidate()
+
+        # Scoped callers only get values from mail they can see.
+        self.client.force_authenticate(self.alpha_aao)
+        url = reverse('mailrecord-autocomplete')
+        response = self.client.get(url, {'field': 'from_office', 'q': 'acc'})
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(response.data['results'], ['Accountant General Office', 'Accounts Branch'])
+        # Candidates come from the index (here the sorted table), not a LIKE scan of visible mail.
+        with CaptureQueriesContext(connection) as ctx:
+            self.client.get(url, {'field': 'from_office', 'q': 'acc'})
+        self.assertFalse([query for query in ctx.captured_queries if 'LIKE' in query['sql']])
+
+        self.client.force_authenticate(self.ag)
+        response = self.client.get(url, {'field': 'from_office', 'q': 'acc'})
+        self.assertEqual(
+            response.data['results'],
+            ['Accountant General Office', 'Accounts Branch', 'Accounts Vigilance Cell'],
+        )
+
+        self.client.force_authenticate(self.alpha_aao)
+
+        response = self.client.get(url, {'field': 'from_office', 'q': 'Tresury Office'})
+        self.assertEqual(response.data['results'], ['Treasury Office'])
+
+        response = self.client.get(url, {'field': 'subject', 'q': 'x'})
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+
+    def test_dag_list_reads_managed_sections_once_per_request(self):
+        dag_beta = self._mk_user('dag_filter_beta', 'DAG', None)
+        dag_beta.sections.set([self.section_beta])
+        for idx in range(5):
+            mail = self._create_mail(f'DAG-SCOPE-{idx}', f'Scope {idx}', self.alpha_aao,
+                                     self.section_alpha, self.sub_alpha_1)
+            # Assignments to another DAG are checked against that DAG's sections.
+            MailAssignment.objects.create(mail_record=mail, assigned_to=dag_beta, assigned_by=self.ag, status='Active')
+
+        self.client.force_authenticate(self.dag_alpha)
+        with CaptureQueriesContext(connection) as ctx:
+            response = self.client.get(reverse('mailrecord-list'))
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(response.data['count'], 5)
+        # The caller's sections, then every DAG's sections once for the assignment checks.
+        section_lookups = [q['sql'] for q in ctx.captured_queries if 'users_user_sections' in q['sql']]
+        self.assertEqual(len(section_lookups), 2, section_lookups)
+
     def test_ag_subsection_filter_is_applied_before_pagination(self):
         for idx in range(26):
             self._create_mail(
@@ -288,6 +407,82 @@ class MailRecordListFilteringTests(APITestCase):
         self.assertEqual(len(self._rows(page_two)), 1)
         self.assertTrue(all(row['subsection'] == self.sub_alpha_1.id for row in self._rows(page_two)))
 
+    def test_cursor_pagination_walks_forward_and_back_without_count(self):
+        created = [
+            self._create_mail(
+                letter_no=f'CURSOR-{idx}',
+                subject=f'Cursor {idx}',
+                assignee=self.alpha_aao,
+                section=self.section_alpha,
+                subsection=self.sub_alpha_1,
+            )
+            for idx in range(5)
+        ]
+        # Identical timestamps must still page deterministically via the id tie-break.
+        MailRecord.objects.filter(id__in=[m.id for m in created[:3]]).update(created_at=created[0].created_at)
+        expected = list(
+            MailRecord.objects.order_by('-created_at', '-id').values_list('id', flat=True)
+        )
+
+        self.client.force_authenticate(self.ag)
+        first = self.client.get(reverse('mailrecord-list'), {'pagination': 'cursor', 'page_size': 2})
+        self.assertEqual(first.status_code, status.HTTP_200_OK)
+        self.assertNotIn('count', first.data)
+        self.assertIsNone(first.data['previous'])
+
+        seen = [row['id'] for row in first.data['results']]
+        response = first
+        while response.data['next']:
+            response = self.client.get(response.data['next'])
+            seen.extend(row['id'] for row in response.data['results'])
+        self.assertEqual(seen, expected)
+
+        back = self.client.get(response.data['previous'])
+        self.assertEqual([row['id'] for row in back.data['results']], expected[2:4])
+
+        with_total = self.client.get(
+            reverse('mailrecord-list'),
+            {'pagination': 'cursor', 'with_total': 'approx'},
+        )
+        self.assertEqual(with_total.data['approximate_count'], 5)
+
+    def test_list_query_count_is_independent_of_page_size(self):
+        def add_mails(count):
+            for _ in range(count):
+                mail = self._create_mail(
+                    letter_no='QC',
+                    subject='Query count',
+                    assignee=self.alpha_aao,
+                    section=self.section_alpha,
+                    subsection=self.sub_alpha_1,
+                )
+                for stage in ('created', 'closed'):
+                    RecordAttachment.objects.create(
+                        mail_record=mail,
+                        file=f'{mail.id}-{stage}.pdf',
+                        original_filename=f'{stage}.pdf',
+                        file_size=1024,
+                        uploaded_by=self.ag,
+                        upload_stage=stage,
+                    )
+
+        def list_queries():
+            with CaptureQueriesContext(connection) as ctx:
+                response = self.client.get(reverse('mailrecord-list'), {'page_size': 100})
+            self.assertEqual(response.status_code, status.HTTP_200_OK)
+            return len(ctx.captured_queries), response
+
+        self.client.force_authenticate(self.ag)
+        add_mails(2)
+        small_count, _ = list_queries()
+        add_mails(10)
+        large_count, response = list_queries()
+
+        self.assertEqual(small_count, large_count)
+        row = self._rows(response)[0]
+        self.assertEqual(set(row['attachment_metadata']['by_stage']), {'created', 'closed'})
+        self.assertEqual(row['attachment_metadata']['uploaded_by'], self.ag.full_name)
+
     def test_dag_section_filter_keeps_null_section_records_scoped_by_subsection(self):
         explicit_mail = self._create_mail(
             letter_no='FILTER/EXPLICIT',
@@ -918,3 +1113,596 @@ class MailRecordPdfFlowTests(APITestCase):
         view_closed = self.client.get(f'/api/records/{self.mail.id}/pdf/view/?stage=closed')
         self.assertEqual(view_closed.status_code, status.HTTP_200_OK)
         self.assertIn('/_protected_pdfs/', view_closed['X-Accel-Redirect'])
+
+
+@skipIf(mock_aws is None, 'moto is not installed')
+class PdfObjectStorageTests(APITestCase):
+    """Direct uploads and PDF delivery against moto's in-process S3."""
+
+    bucket = 'mailtracker-test-pdfs'
+
+    def setUp(self):
+        pdf_options = {
+            **settings.STORAGES['pdfs']['OPTIONS'],
+            'bucket_name': self.bucket,
+            'endpoint_url': None,
+            'region_name': 'us-east-1',
+        }
+        self.mock = mock_aws()
+        self.mock.start()
+        self.override = override_settings(MAX_PDF_SIZE_MB=1)
+        self.override.enable()
+        # A separate storage instance, so the shared storages['pdfs'] is left untouched.
+        self.storage = S3Storage(**pdf_options)
+        client = self.storage.connection.meta.client
+        client.create_bucket(Bucket=self.bucket)
+        self.storage_patches = [
+            patch('records.uploads.get_pdf_storage', return_value=self.storage),
+            patch('records.tasks.get_pdf_storage', return_value=self.storage),
+            patch.object(RecordAttachment._meta.get_field('file'), 'storage', self.storage),
+            patch('records.delivery.get_pdf_read_storage', return_value=self.storage),
+        ]
+        for storage_patch in self.storage_patches:
+            storage_patch.start()
+
+        self.section = Section.objects.create(name='Direct PDF')
+        self.subsection = Subsection.objects.create(section=self.section, name='Direct PDF-1')
+        self.ag = User.objects.create_user(
+            username='direct_pdf_ag',
+            password='pass12345',
+            email='direct-pdf-ag@example.com',
+            full_name='Direct PDF AG',
+            role='AG',
+        )
+        aao = User.objects.create_user(
+            username='direct_pdf_aao',
+            password='pass12345',
+            email='direct-pdf-aao@example.com',
+            full_name='Direct PDF AAO',
+            role='AAO',
+            subsection=self.subsection,
+        )
+        self.mail = MailRecord.objects.create(
+            letter_no='PDF/002',
+            date_received=timezone.now().date(),
+            mail_reference_subject='Direct upload mail',
+            from_office='HQ',
+            action_required='Process',
+            assigned_to=aao,
+            current_handler=aao,
+            monitoring_officer=aao.get_dag(),
+            section=self.section,
+            subsection=self.subsection,
+            due_date=timezone.now().date() + timedelta(days=2),
+            status='Assigned',
+            created_by=self.ag,
+        )
+        self.client.force_authenticate(self.ag)
+
+    def tearDown(self):
+        for storage_patch in self.storage_patches:
+            storage_patch.stop()
+        self.override.disable()
+        self.mock.stop()
+
+    def _upload(self, content, filename='letter.pdf', sha256=None, size=None):
+        response = self.client.post(
+            f'/api/records/{self.mail.id}/pdf/upload-url/',
+            {
+                'filename': filename,
+                'upload_stage': 'created',
+                'sha256': sha256 or hashlib.sha256(content).hexdigest(),
+                'size': size or len(content),
+            },
+            format='json',
+        )
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(response.data['method'], 'PUT')
+        self.assertEqual(response.data['max_size'], 1024 * 1024)
+        stored = requests.put(response.data['url'], data=content, headers=response.data['headers'])
+        self.assertLess(stored.status_code, 300)
+        return response.data
+
+    def _finalize(self, upload_token):
+        return self.client.post(
+            f'/api/records/{self.mail.id}/pdf/finalize/',
+            {'upload_token': upload_token},
+            format='json',
+        )
+
+    def test_finalize_verifies_object_and_creates_attachment(self):
+        first = self._upload(b'%PDF-1.7 first')
+        response = self._finalize(first['upload_token'])
+        self.assertEqual(response.status_code, status.HTTP_201_CREATED)
+        self.assertEqual(response.data['original_filename'], 'letter.pdf')
+        self.assertEqual(response.data['file_size'], len(b'%PDF-1.7 first'))
+
+        attachment = RecordAttachment.objects.get(id=response.data['id'])
+        upload_name = signing.loads(first['upload_token'], salt='records.pdf-upload')['name']
+        self.assertTrue(self.storage.exists(attachment.file.name))
+        self.assertNotEqual(attachment.file.name, upload_name)
+        self.assertFalse(self.storage.exists(upload_name))
+        self.assertEqual(self._finalize(first['upload_token']).status_code, status.HTTP_400_BAD_REQUEST)
+
+        second = self._upload(b'%PDF-1.7 replacement')
+        self.assertEqual(self._finalize(second['upload_token']).status_code, status.HTTP_201_CREATED)
+        attachment.refresh_from_db()
+        self.assertFalse(attachment.is_current)
+        self.assertEqual(self.mail.attachments.filter(is_current=True).count(), 1)
+
+    def test_finalize_rejects_and_deletes_non_pdf_or_oversized_objects(self):
+        wrong_checksum = hashlib.sha256(b'something else').hexdigest()
+        too_large = self.client.post(
+            f'/api/records/{self.mail.id}/pdf/upload-url/',
+            {'filename': 'big.pdf', 'upload_stage': 'created', 'sha256': wrong_checksum, 'size': 1024 * 1024 + 1},
+            format='json',
+        )
+        self.assertEqual(too_large.status_code, status.HTTP_400_BAD_REQUEST)
+
+        # moto does not enforce the signed size or checksum, so finalize has to catch all of these.
+        for content, sha256, size in (
+            (b'GIF89a not a pdf', None, None),
+            (b'%PDF' + b'x' * (1024 * 1024), None, 100),
+            (b'%PDF-1.7 longer than declared', None, 10),
+            (b'%PDF-1.7 mislabelled', wrong_checksum, None),
+        ):
+            upload = self._upload(content, sha256=sha256, size=size)
+            name = signing.loads(upload['upload_token'], salt='records.pdf-upload')['name']
+            response = self._finalize(upload['upload_token'])
+            self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+            self.assertFalse(self.storage.exists(name))
+
+        missing = self.client.post(
+            f'/api/records/{self.mail.id}/pdf/upload-url/',
+            {'filename': 'never-sent.pdf', 'upload_stage': 'created', 'sha256': wrong_checksum, 'size': 10},
+            format='json',
+        )
+        self.assertEqual(self._finalize(missing.data['upload_token']).status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertEqual(self._finalize('tampered').status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertFalse(RecordAttachment.objects.exists())
+
+    def test_declared_hash_of_a_stored_file_does_not_share_its_blob(self):
+        stored = self._stored_attachment(b'%PDF-1.7 someone else')
+        blob = PdfBlob.objects.get(content_hash=stored.content_hash)
+
+        upload = self._upload(b'%PDF-1.7 mine', sha256=stored.content_hash)
+        self.assertEqual(self._finalize(upload['upload_token']).status_code, status.HTTP_400_BAD_REQUEST)
+        blob.refresh_from_db()
+        self.assertEqual(blob.ref_count, 1)
+
+        # Files without a handler-computed hash are hashed before dedup, too.
+        attachment = attach_pdf(
+            self.mail, 'created', self.ag, SimpleUploadedFile('copy.pdf', b'%PDF-1.7 someone else'),
+            'copy.pdf', len(b'%PDF-1.7 someone else'),
+        )
+        self.assertEqual(attachment.file.name, stored.file.name)
+        blob.refresh_from_db()
+        self.assertEqual(blob.ref_count, 2)
+
+    def test_upload_replaced_after_verification_is_not_attached(self):
+        upload = self._upload(b'%PDF-1.7 checked')
+        token = signing.loads(upload['upload_token'], salt='records.pdf-upload')
+        verified = verify_upload(token['name'], token['sha256'], token['size'])
+        # The presigned URL is still valid: overwrite the checked object.
+        requests.put(upload['url'], data=b'%PDF-1.7 swapped in later', headers=upload['headers'])
+
+        with self.assertRaises(UploadRejected):
+            claim_upload(verified)
+        self.assertFalse(self.storage.exists(verified.name))
+
+    def _stored_attachment(self, content):
+        upload = self._upload(content)
+        response = self._finalize(upload['upload_token'])
+        return RecordAttachment.objects.get(id=response.data['id'])
+
+    def test_view_pdf_redirects_to_presigned_url(self):
+        self._stored_attachment(b'%PDF-1.7 redirect me')
+
+        with override_settings(PDF_DELIVERY_MODE='redirect', PDF_URL_EXPIRY_SECONDS=120):
+            response = self.client.get(f'/api/records/{self.mail.id}/pdf/view/?stage=created')
+
+        self.assertEqual(response.status_code, status.HTTP_302_FOUND)
+        self.assertIn('Signature', response['Location'])
+        self.assertIn('response-content-disposition=inline', response['Location'])
+        self.assertEqual(response['Cache-Control'], 'private, no-store')
+        fetched = requests.get(response['Location'])
+        self.assertEqual(fetched.content, b'%PDF-1.7 redirect me')
+
+    def test_proxy_mode_serves_byte_ranges_and_revalidates_by_etag(self):
+        content = b'%PDF-1.7 0123456789'
+        attachment = self._stored_attachment(content)
+        url = f'/api/records/{self.mail.id}/pdf/view/?stage=created'
+        etag = f'"{attachment.id}"'
+
+        with override_settings(PDF_DELIVERY_MODE='proxy'):
+            full = self.client.get(url)
+            partial = self.client.get(url, HTTP_RANGE='bytes=9-13')
+            suffix = self.client.get(url, HTTP_RANGE='bytes=-4')
+            outside = self.client.get(url, HTTP_RANGE='bytes=500-')
+            stale_if_range = self.client.get(url, HTTP_RANGE='bytes=9-13', HTTP_IF_RANGE='"other"')
+            not_modified = self.client.get(url, HTTP_IF_NONE_MATCH=etag)
+
+        self.assertEqual(full.status_code, status.HTTP_200_OK)
+        self.assertEqual(b''.join(full.streaming_content), content)
+        self.assertEqual(full['ETag'], etag)
+        self.assertEqual(full['Accept-Ranges'], 'bytes')
+
+        self.assertEqual(partial.status_code, status.HTTP_206_PARTIAL_CONTENT)
+        self.assertEqual(b''.join(partial.streaming_content), b'01234')
+        self.assertEqual(partial['Content-Range'], f'bytes 9-13/{len(content)}')
+        self.assertEqual(b''.join(suffix.streaming_content), b'6789')
+
+        self.assertEqual(outside.status_code, status.HTTP_416_REQUESTED_RANGE_NOT_SATISFIABLE)
+        self.assertEqual(outside['Content-Range'], f'bytes */{len(content)}')
+        self.assertEqual(stale_if_range.status_code, status.HTTP_200_OK)
+        self.assertEqual(not_modified.status_code, status.HTTP_304_NOT_MODIFIED)
+
+    def _multipart_upload(self, content, filename='scan.pdf'):
+        return self.client.post(
+            f'/api/records/{self.mail.id}/pdf/upload/',
+            {'file': SimpleUploadedFile(filename, content, content_type='application/pdf'), 'upload_stage': 'created'},
+            format='multipart',
+        )
+
+    def test_multipart_upload_streams_to_disk_and_rejects_mid_stream(self):
+        content = b'%PDF-1.7 streamed'
+        with patch('records.views.attach_pdf', wraps=attach_pdf) as attach_mock:
+            response = self._multipart_upload(content)
+        self.assertEqual(response.status_code, status.HTTP_201_CREATED)
+        uploaded = attach_mock.call_args.kwargs['file']
+        self.assertTrue(hasattr(uploaded, 'temporary_file_path'))
+        self.assertEqual(uploaded.sha256, hashlib.sha256(content).hexdigest())
+        attachment = RecordAttachment.objects.get(id=response.data['id'])
+        with self.storage.open(attachment.file.name) as stored:
+            self.assertEqual(stored.read(), content)
+
+        not_pdf = self._multipart_upload(b'<html>not a pdf</html>')
+        self.assertEqual(not_pdf.status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertEqual(not_pdf.data['error'], 'The uploaded file is not a PDF.')
+
+        too_large = self._multipart_upload(b'%PDF-' + b'x' * (1024 * 1024))
+        self.assertEqual(too_large.status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertEqual(too_large.data['error'], 'File size exceeds 1MB limit.')
+        self.assertEqual(RecordAttachment.objects.count(), 1)
+
+    def test_identical_content_shares_one_blob_until_last_reference(self):
+        content = b'%PDF-1.7 circular'
+        first = RecordAttachment.objects.get(id=self._multipart_upload(content).data['id'])
+
+        upload = self._upload(content, filename='circular-copy.pdf')
+        uploaded_name = signing.loads(upload['upload_token'], salt='records.pdf-upload')['name']
+        response = self._finalize(upload['upload_token'])
+        self.assertEqual(response.status_code, status.HTTP_201_CREATED)
+        second = RecordAttachment.objects.get(id=response.data['id'])
+
+        blob = PdfBlob.objects.get()
+        self.assertEqual(blob.content_hash, hashlib.sha256(content).hexdigest())
+        self.assertEqual(blob.ref_count, 2)
+        self.assertEqual(first.file.name, blob.name)
+        self.assertEqual(second.file.name, blob.name)
+        self.assertFalse(self.storage.exists(uploaded_name))
+
+        # A third upload of the same content is not written to storage again.
+        with patch.object(self.storage, 'save', wraps=self.storage.save) as save_mock:
+            third = RecordAttachment.objects.get(id=self._multipart_upload(content).data['id'])
+        save_mock.assert_not_called()
+        blob.refresh_from_db()
+        self.assertEqual(blob.ref_count, 3)
+
+        first.delete()
+        third.delete_file()
+        self.assertTrue(self.storage.exists(blob.name))
+        blob.refresh_from_db()
+        self.assertEqual(blob.ref_count, 2)
+
+        # Deleting the last attachment (here via its mail record) queues the file's removal.
+        third.delete()
+        self.mail.delete()
+        self.assertFalse(PdfBlob.objects.exists())
+        run_pending_jobs()
+        self.assertFalse(self.storage.exists(blob.name))
+
+
+class LocalCacheStorageTests(SimpleTestCase):
+    def setUp(self):
+        self.origin_dir = tempfile.mkdtemp(prefix='mailtracker-origin-')
+        self.cache_dir = tempfile.mkdtemp(prefix='mailtracker-cache-')
+        self.origin = FileSystemStorage(location=self.origin_dir)
+        self.cache = LocalCacheStorage(origin=self.origin, location=self.cache_dir, max_bytes=250)
+
+    def tearDown(self):
+        shutil.rmtree(self.origin_dir, ignore_errors=True)
+        shutil.rmtree(self.cache_dir, ignore_errors=True)
+
+    def _read(self, name):
+        with self.cache.open(name) as file:
+            return file.read()
+
+    def test_reads_through_and_evicts_least_recently_read(self):
+        for name in ('a.pdf', 'b.pdf', 'c.pdf'):
+            self.cache.save(name, ContentFile(name.encode() * 25))
+
+        self.assertEqual(self._read('a.pdf'), b'a.pdf' * 25)
+        self.assertEqual(self._read('a.pdf'), b'a.pdf' * 25)
+        self.assertEqual(self.cache.stats()['misses'], 1)
+        self.assertEqual(self.cache.stats()['hits'], 1)
+
+        self._read('b.pdf')
+        # Make a.pdf the most recently read copy, then overflow the 250-byte budget.
+        os.utime(self.cache.cache_path('b.pdf'), (1, 1))
+        self._read('c.pdf')
+
+        self.assertTrue(os.path.exists(self.cache.cache_path('a.pdf')))
+        self.assertFalse(os.path.exists(self.cache.cache_path('b.pdf')))
+        self.assertTrue(os.path.exists(self.cache.cache_path('c.pdf')))
+        self.assertEqual(self.cache.stats()['evictions'], 1)
+        # An evicted copy is simply read through again.
+        self.assertEqual(self._read('b.pdf'), b'b.pdf' * 25)
+
+        self.cache.delete('c.pdf')
+        self.assertFalse(os.path.exists(self.cache.cache_path('c.pdf')))
+        self.assertFalse(self.origin.exists('c.pdf'))
+
+
+class MailVisibilityIndexTests(APITestCase):
+    def setUp(self):
+        self.section = Section.objects.create(name='Visibility')
+        self.subsection = Subsection.objects.create(section=self.section, name='Visibility-1')
+        self.clerk = self._mk_user('vis_clerk', 'clerk')
+        self.aao = self._mk_user('vis_aao', 'AAO')
+        self.srao = self._mk_user('vis_srao', 'SrAO')
+
+    def _mk_user(self, username, role):
+        return User.objects.create_user(
+            username=username,
+            password='pass12345',
+            email=f'{username}@example.com',
+            full_name=username.replace('_', ' ').title(),
+            role=role,
+            subsection=self.subsection,
+        )
+
+    @staticmethod
+    def _grants(mail_id):
+        return dict(MailVisibility.objects.filter(mail_record_id=mail_id).values_list('user_id', 'reason'))
+
+    def test_grants_follow_create_reassign_and_rebuild(self):
+        self.client.force_authenticate(self.clerk)
+        create_resp = self.client.post(reverse('mailrecord-list'), {
+            'letter_no': 'VIS/001',
+            'date_received': timezone.now().date().isoformat(),
+            'mail_reference_subject': 'Visibility tracking',
+            'from_office': 'HQ',
+            'assigned_to': [self.aao.id],
+            'due_date': (timezone.now().date() + timedelta(days=3)).isoformat(),
+        }, format='json')
+        self.assertEqual(create_resp.status_code, status.HTTP_201_CREATED)
+        mail_id = create_resp.data['id']
+        self.assertEqual(self._grants(mail_id), {
+            self.clerk.id: 'creator',
+            self.aao.id: 'handler',
+            self.srao.id: 'subsection',
+        })
+
+        self.client.force_authenticate(self.aao)
+        reassign_resp = self.client.post(
+            f'/api/records/{mail_id}/reassign/',
+            {'new_handler': self.srao.id, 'remarks': 'Over to SrAO'},
+            format='json',
+        )
+        self.assertEqual(reassign_resp.status_code, status.HTTP_200_OK)
+        self.assertEqual(self._grants(mail_id), {
+            self.clerk.id: 'creator',
+            self.srao.id: 'handler',
+        })
+
+        list_resp = self.client.get(reverse('mailrecord-list'))
+        self.assertEqual(list_resp.data['count'], 0)
+        self.assertEqual(self.client.get(f'/api/records/{mail_id}/').status_code, status.HTTP_404_NOT_FOUND)
+
+        MailVisibility.objects.filter(user=self.srao).delete()
+        out = StringIO()
+        call_command('rebuild_mail_visibility', stdout=out)
+        self.assertIn('Visibility grants added: 1', out.getvalue())
+        self.assertEqual(self._grants(mail_id)[self.srao.id], 'handler')
+
+    def test_new_users_and_creator_role_changes_update_subsection_grants(self):
+        self.client.force_authenticate(self.clerk)
+        mail_id = self.client.post(reverse('mailrecord-list'), {
+            'letter_no': 'VIS/004',
+            'date_received': timezone.now().date().isoformat(),
+            'mail_reference_subject': 'New users',
+            'from_office': 'HQ',
+            'assigned_to': [self.aao.id],
+            'due_date': (timezone.now().date() + timedelta(days=3)).isoformat(),
+        }, format='json').data['id']
+
+        late_srao = self._mk_user('vis_late_srao', 'SrAO')
+        late_aao = self._mk_user('vis_late_aao', 'AAO')
+        self.assertEqual(self._grants(mail_id).get(late_srao.id), 'subsection')
+        self.assertNotIn(late_aao.id, self._grants(mail_id))
+
+        # AAOs see subsection mail created by auditors.
+        self.clerk.role = 'auditor'
+        self.clerk.save()
+        sync_created_mail_visibility(self.clerk)
+        self.assertEqual(self._grants(mail_id).get(late_aao.id), 'subsection')
+
+    def test_change_feed_reports_new_mail_then_visibility_loss(self):
+        changes_url = reverse('mailrecord-changes')
+        self.client.force_authenticate(self.aao)
+        token = self.client.get(changes_url).data['token']
+
+        self.client.force_authenticate(self.clerk)
+        mail_id = self.client.post(reverse('mailrecord-list'), {
+            'letter_no': 'VIS/002',
+            'date_received': timezone.now().date().isoformat(),
+            'mail_reference_subject': 'Change feed',
+            'from_office': 'HQ',
+            'assigned_to': [self.aao.id],
+            'due_date': (timezone.now().date() + timedelta(days=3)).isoformat(),
+        }, format='json').data['id']
+
+        self.client.force_authenticate(self.aao)
+        feed = self.client.get(changes_url, {'since': token})
+        self.assertEqual(feed.status_code, status.HTTP_200_OK)
+        self.assertEqual([row['id'] for row in feed.data['records']], [mail_id])
+        self.assertIn('CREATE', {event['action'] for event in feed.data['events']})
+        self.assertEqual(feed.data['removed'], [])
+
+        self.client.post(
+            f'/api/records/{mail_id}/reassign/',
+            {'new_handler': self.srao.id, 'remarks': 'Over to SrAO'},
+            format='json',
+        )
+        feed = self.client.get(changes_url, {'since': feed.data['token']})
+        self.assertEqual(feed.data['records'], [])
+        self.assertEqual(feed.data['removed'], [mail_id])
+
+        self.assertEqual(
+            self.client.get(changes_url, {'since': 'not-a-token'}).status_code,
+            status.HTTP_400_BAD_REQUEST,
+        )
+
+    @override_settings(RECORD_EVENTS_BACKEND='memory')
+    def test_live_events_reach_only_subscribers_who_can_see_the_mail(self):
+        other_section = Section.objects.create(name='Elsewhere')
+        other_aao = User.objects.create_user(
+            username='vis_other_aao', password='pass12345', email='vis_other_aao@example.com',
+            full_name='Other AAO', role='AAO',
+            subsection=Subsection.objects.create(section=other_section, name='Elsewhere-1'),
+        )
+        watching = broker.subscribe(self.aao)
+        outsider = broker.subscribe(other_aao)
+        self.addCleanup(broker.unsubscribe, watching)
+        self.addCleanup(broker.unsubscribe, outsider)
+
+        self.client.force_authenticate(self.clerk)
+        with self.captureOnCommitCallbacks(execute=True):
+            mail_id = self.client.post(reverse('mailrecord-list'), {
+                'letter_no': 'VIS/003',
+                'date_received': timezone.now().date().isoformat(),
+                'mail_reference_subject': 'Live events',
+                'from_office': 'HQ',
+                'assigned_to': [self.aao.id],
+                'due_date': (timezone.now().date() + timedelta(days=3)).isoformat(),
+            }, format='json').data['id']
+
+        received = []
+        while not watching.queue.empty():
+            received.append(watching.queue.get_nowait())
+        self.assertEqual([event['type'] for event in received], ['mail.created', 'mail.reassigned'])
+        self.assertEqual({event['data']['mail_record'] for event in received}, {mail_id})
+        self.assertTrue(outsider.queue.empty())
+
+    def _stream(self, query_string, on_body=None):
+        """Run the ASGI stream app to completion; returns (status, headers, body)."""
+        from config.asgi import application
+
+        messages = []
+
+        async def receive():
+            if not messages:
+                return {'type': 'http.request', 'body': b'', 'more_body': False}
+            await asyncio.Event().wait()
+
+        async def send(message):
+            messages.append(message)
+            if on_body and message['type'] == 'http.response.body' and len(messages) == 2:
+                on_body()
+
+        scope = {
+            'type': 'http', 'method': 'GET', 'path': EVENT_STREAM_PATH,
+            'query_string': query_string.encode(), 'headers': [(b'origin', b'http://localhost:5173')],
+        }
+        # The test transaction's connection must survive the stream's connection housekeeping.
+        with patch('records.streams.close_old_connections'):
+            async_to_sync(application)(scope, receive, send)
+        body = b''.join(message.get('body', b'') for message in messages[1:])
+        return messages[0]['status'], dict(messages[0]['headers']), body
+
+    @override_settings(RECORD_EVENTS_BACKEND='memory', RECORD_EVENTS_STREAM_SECONDS=0)
+    def test_event_stream_is_served_over_asgi_with_a_ticket_only(self):
+        self.client.force_authenticate(self.aao)
+        # Not routed on the WSGI app.
+        self.assertEqual(self.client.get(EVENT_STREAM_PATH).status_code, status.HTTP_404_NOT_FOUND)
+        ticket = self.client.post(reverse('record_event_ticket')).data['ticket']
+        self.client.force_authenticate(user=None)
+        self.assertEqual(
+            self.client.post(reverse('record_event_ticket')).status_code,
+            status.HTTP_401_UNAUTHORIZED,
+        )
+
+        self.assertEqual(self._stream('')[0], status.HTTP_401_UNAUTHORIZED)
+        forged = signing.dumps({'user': self.aao.id})
+        self.assertEqual(self._stream(f'ticket={forged}')[0], status.HTTP_401_UNAUTHORIZED)
+
+        status_code, headers, body = self._stream(f'ticket={ticket}')
+        self.assertEqual(status_code, status.HTTP_200_OK)
+        self.assertEqual(headers[b'content-type'], b'text/event-stream')
+        self.assertEqual(headers[b'access-control-allow-origin'], b'http://localhost:5173')
+        self.assertEqual(body, f'retry: {RECONNECT_MS}\n\n'.encode())
+
+    @override_settings(RECORD_EVENTS_BACKEND='memory', RECORD_EVENTS_STREAM_SECONDS=1)
+    def test_event_stream_delivers_published_events(self):
+        self.client.force_authenticate(self.aao)
+        ticket = self.client.post(reverse('record_event_ticket')).data['ticket']
+        event = {
+            'id': 7,
+            'type': 'mail.created',
+            'audience': {'user_ids': frozenset({self.aao.id}), 'section_id': None},
+            'data': {'mail_record': 1},
+        }
+
+        _, _, body = self._stream(f'ticket={ticket}', on_body=lambda: broker.publish(event))
+        self.assertIn(b'id: 7\nevent: mail.created\ndata: {"mail_record":1}\n\n', body)
+        self.assertFalse(broker.has_subscribers())
+
+
+class SlNoCounterTests(APITestCase):
+    def setUp(self):
+        self.ag = User.objects.create_user(
+            username='slno_ag',
+            password='pass12345',
+            email='slno_ag@example.com',
+            full_name='Serial AG',
+            role='AG',
+        )
+
+    def _create_mail(self, **extra):
+        return MailRecord.objects.create(
+            letter_no='SLNO/001',
+            date_received=timezone.now().date(),
+            mail_reference_subject='Serial numbering',
+            from_office='HQ',
+            action_required='Review',
+            assigned_to=self.ag,
+            current_handler=self.ag,
+            due_date=timezone.now().date() + timedelta(days=5),
+            created_by=self.ag,
+            **extra,
+        )
+
+    def test_counter_seeds_from_existing_records_and_rolls_past_999(self):
+        year = timezone.now().year
+        self._create_mail(sl_no=f'{year}/998')
+
+        self.assertEqual(self._create_mail().sl_no, f'{year}/999')
+        self.assertEqual(self._create_mail().sl_no, f'{year}/1000')
+        self.assertEqual(SlNoCounter.objects.get(year=year).last_value, 1000)
+
+    def test_block_reservation_is_contiguous_and_skipped_by_later_creates(self):
+        year = timezone.now().year
+        block = allocate_sl_numbers(3)
+        self.assertEqual(block, [f'{year}/001', f'{year}/002', f'{year}/003'])
+        self.assertEqual(self._create_mail().sl_no, f'{year}/004')
+        self.assertEqual(allocate_sl_numbers(1, year=2001), ['2001/001'])
+
+    def test_explicit_sl_no_advances_an_existing_counter(self):
+        year = timezone.now().year
+        self.assertEqual(self._create_mail().sl_no, f'{year}/001')
+        self._create_mail(sl_no=f'{year}/050')
+        self._create_mail(sl_no=f'{year}/020')
+
+        self.assertEqual(SlNoCounter.objects.get(year=year).last_value, 50)
+        self.assertEqual(self._create_mail().sl_no, f'{year}/051')
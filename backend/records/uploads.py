@@ -0,0 +1,346 @@
+"""
+PDF uploads.
+
+PDFUploadHandler streams multipart uploads for pdf/upload/ to a temporary
+file, rejecting non-PDF or oversized files while they are still arriving.
+
+For direct-to-storage uploads the client PUTs the file straight to the pdfs
+bucket with a presigned URL from create_upload(), whose signature covers the
+declared size and SHA-256, then calls the finalize endpoint. Finalize reads the
+stored object back and checks its size, %PDF header and SHA-256 itself, so
+nothing rests on storage-side checksum support, and copies it, pinned to the
+ETag it checked, to a new server-chosen key before a RecordAttachment points at
+it. The presigned URL stays usable until it expires, so the upload key itself
+is never attached. The signed upload token ties the upload key to the record,
+stage and user it was issued for, so finalize cannot be used to claim
+arbitrary keys.
+
+Stored files are deduplicated by SHA-256 (see PdfBlob): attaching content that
+is already stored only takes another reference to the existing file. Multipart
+uploads are then never written; a direct upload's duplicate object is deleted.
+"""
+import base64
+import hashlib
+import os
+from collections import namedtuple
+
+from botocore.exceptions import ClientError
+from django.conf import settings
+from django.core import signing
+from django.core.files.uploadedfile import TemporaryUploadedFile
+from django.core.files.uploadhandler import FileUploadHandler, StopFutureHandlers, StopUpload
+from django.db import IntegrityError, transaction
+from django.db.models import F
+
+from .models import PdfBlob, RecordAttachment, get_pdf_storage, pdf_upload_path
+
+
+PDF_MAGIC = b'%PDF'
+PDF_HEADER = b'%PDF-'
+UPLOAD_TOKEN_SALT = 'records.pdf-upload'
+# Allowance for multipart boundaries and the other form fields around the file.
+MULTIPART_OVERHEAD = 64 * 1024
+
+
+class UploadRejected(Exception):
+    """The uploaded object is missing or is not an acceptable PDF."""
+
+
+# A direct upload that passed verify_upload(); content_hash was computed from the stored bytes
+# and etag pins the content that was hashed.
+VerifiedUpload = namedtuple('VerifiedUpload', ['name', 'size', 'content_hash', 'etag'])
+
+
+def max_pdf_size_mb():
+    return getattr(settings, 'MAX_PDF_SIZE_MB', 10)
+
+
+def upload_url_expiry():
+    return getattr(settings, 'PDF_UPLOAD_URL_EXPIRY_SECONDS', 600)
+
+
+class PDFUploadHandler(FileUploadHandler):
+    """
+    Upload handler for the PDF endpoint. Spools the file to a temporary file
+    instead of memory, checks the %PDF- header on the first bytes, enforces
+    MAX_PDF_SIZE_MB while streaming and computes the SHA-256 on the way
+    (exposed as uploaded_file.sha256). A rejected upload stops reading the
+    request body and leaves its reason in .error.
+    """
+
+    def __init__(self, request=None):
+        super().__init__(request)
+        self.max_size = max_pdf_size_mb() * 1024 * 1024
+        self.request_too_large = False
+        self.error = None
+
+    def handle_raw_input(self, input_data, META, content_length, boundary, encoding=None):
+        # Refuse bodies that cannot hold an acceptable file before reading any of it.
+        self.request_too_large = content_length > self.max_size + MULTIPART_OVERHEAD
+
+    def new_file(self, *args, **kwargs):
+        super().new_file(*args, **kwargs)
+        if self.request_too_large:
+            self._reject(f'File size exceeds {max_pdf_size_mb()}MB limit.')
+        self.file = TemporaryUploadedFile(
+            self.file_name, self.content_type, 0, self.charset, self.content_type_extra
+        )
+        self.header = b''
+        self.received = 0
+        self.sha256 = hashlib.sha256()
+        raise StopFutureHandlers()
+
+    def receive_data_chunk(self, raw_data, start):
+        if len(self.header) < len(PDF_HEADER):
+            self.header += raw_data[:len(PDF_HEADER) - len(self.header)]
+            if not PDF_HEADER.startswith(self.header):
+                self._reject('The uploaded file is not a PDF.')
+        self.received += len(raw_data)
+        if self.received > self.max_size:
+            self._reject(f'File size exceeds {max_pdf_size_mb()}MB limit.')
+        self.sha256.update(raw_data)
+        self.file.write(raw_data)
+
+    def file_complete(self, file_size):
+        if self.header != PDF_HEADER:
+            # Shorter than the header itself.
+            self.error = 'The uploaded file is not a PDF.'
+            self._discard()
+            return None
+        self.file.seek(0)
+        self.file.size = file_size
+        self.file.sha256 = self.sha256.hexdigest()
+        return self.file
+
+    def upload_interrupted(self):
+        self._discard()
+
+    def _discard(self):
+        # Drop .file entirely: the multipart parser closes any handler.file it finds.
+        file = self.__dict__.pop('file', None)
+        if file is None:
+            return
+        temp_path = file.temporary_file_path()
+        file.close()
+        try:
+            os.remove(temp_path)
+        except FileNotFoundError:
+            pass
+
+    def _reject(self, message):
+        self.error = message
+        self._discard()
+        # connection_reset: do not read the rest of the body.
+        raise StopUpload(connection_reset=True)
+
+
+def object_location(storage, name):
+    """(bucket, key) of a stored name; S3Storage keys include its `location` prefix."""
+    return storage.bucket_name, storage._normalize_name(name)
+
+
+def sha256_checksum(content_hash):
+    """The base64 form of a hex SHA-256, as S3 expects in x-amz-checksum-sha256."""
+    return base64.b64encode(bytes.fromhex(content_hash)).decode('ascii')
+
+
+def create_upload(mail_record, upload_stage, user, original_filename, content_hash, size):
+    """
+    Presigned PUT URL for a new UUID key, plus the token finalize expects.
+    The signature covers Content-Length and x-amz-checksum-sha256, so the client
+    must send exactly the size and SHA-256 it declared.
+    """
+    storage = get_pdf_storage()
+    name = pdf_upload_path(None, original_filename)
+    bucket, key = object_location(storage, name)
+    expires_in = upload_url_expiry()
+    headers = {
+        'Content-Type': 'application/pdf',
+        'x-amz-checksum-sha256': sha256_checksum(content_hash),
+    }
+
+    url = storage.connection.meta.client.generate_presigned_url(
+        'put_object',
+        Params={
+            'Bucket': bucket,
+            'Key': key,
+            'ContentType': headers['Content-Type'],
+            'ContentLength': size,
+            'ChecksumSHA256': headers['x-amz-checksum-sha256'],
+        },
+        ExpiresIn=expires_in,
+    )
+    upload_token = signing.dumps(
+        {
+            'record': mail_record.id,
+            'stage': upload_stage,
+            'user': user.id,
+            'name': name,
+            'filename': original_filename,
+            'sha256': content_hash,
+            'size': size,
+        },
+        salt=UPLOAD_TOKEN_SALT,
+    )
+    return {
+        'url': url,
+        'method': 'PUT',
+        'headers': headers,
+        'upload_token': upload_token,
+        'max_size': max_pdf_size_mb() * 1024 * 1024,
+        'expires_in': expires_in,
+    }
+
+
+def read_upload_token(upload_token):
+    """Payload of a create_upload() token; raises signing.BadSignature when invalid or stale."""
+    # The upload may start just before the form expires, so allow time for it to finish.
+    return signing.loads(upload_token, salt=UPLOAD_TOKEN_SALT, max_age=upload_url_expiry() * 2)
+
+
+def verify_upload(name, content_hash, size):
+    """
+    VerifiedUpload for the uploaded object. The object is read back (pinned to
+    the ETag from its HEAD) and its size, %PDF header and SHA-256 are checked
+    here. Objects that fail are deleted and UploadRejected is raised.
+    """
+    storage = get_pdf_storage()
+    client = storage.connection.meta.client
+    bucket, key = object_location(storage, name)
+
+    try:
+        head = client.head_object(Bucket=bucket, Key=key)
+    except ClientError:
+        raise UploadRejected('The file has not been uploaded yet.')
+    etag = head['ETag']
+
+    max_mb = max_pdf_size_mb()
+    problem = None
+    if head['ContentLength'] == 0:
+        problem = 'The uploaded file is empty.'
+    elif head['ContentLength'] > max_mb * 1024 * 1024:
+        problem = f'File size exceeds {max_mb}MB limit.'
+    elif head['ContentLength'] != size:
+        problem = 'The uploaded file does not match its declared size.'
+    else:
+        try:
+            body = client.get_object(Bucket=bucket, Key=key, IfMatch=etag)['Body']
+        except ClientError:
+            raise UploadRejected('The uploaded file changed while it was being checked. Upload it again.')
+        digest = hashlib.sha256()
+        header = b''
+        for chunk in body.iter_chunks(64 * 1024):
+            if len(header) < len(PDF_MAGIC):
+                header += chunk[:len(PDF_MAGIC) - len(header)]
+            digest.update(chunk)
+        if header != PDF_MAGIC:
+            problem = 'The uploaded file is not a PDF.'
+        elif digest.hexdigest() != content_hash:
+            problem = 'The uploaded file does not match its SHA-256 checksum.'
+
+    if problem:
+        client.delete_object(Bucket=bucket, Key=key)
+        raise UploadRejected(problem)
+    return VerifiedUpload(name, size, content_hash, etag)
+
+
+def claim_upload(upload):
+    """
+    Copy a verified upload to a new key and delete the upload key; returns the new name.
+    The copy only succeeds while the object still has the ETag that was checked.
+    """
+    storage = get_pdf_storage()
+    client = storage.connection.meta.client
+    bucket, upload_key = object_location(storage, upload.name)
+    name = pdf_upload_path(None, upload.name)
+    key = object_location(storage, name)[1]
+    try:
+        copied = client.copy_object(
+            Bucket=bucket,
+            Key=key,
+            CopySource={'Bucket': bucket, 'Key': upload_key},
+            CopySourceIfMatch=upload.etag,
+        )
+    except ClientError:
+        copied = None
+    finally:
+        client.delete_object(Bucket=bucket, Key=upload_key)
+    # Single-part copies keep the source ETag; also covers stores that ignore CopySourceIfMatch.
+    if copied is None or copied['CopyObjectResult']['ETag'] != upload.etag:
+        if copied is not None:
+            client.delete_object(Bucket=bucket, Key=key)
+        raise UploadRejected('The uploaded file changed after it was checked. Upload it again.')
+    return name
+
+
+def _reference_blob(content_hash):
+    """Add a reference to the PdfBlob for content_hash and return its name, or None if there is none."""
+    with transaction.atomic():
+        if not PdfBlob.objects.filter(content_hash=content_hash).update(ref_count=F('ref_count') + 1):
+            return None
+        return PdfBlob.objects.values_list('name', flat=True).get(content_hash=content_hash)
+
+
+def server_content_hash(file):
+    """
+    SHA-256 of `file` as computed on this server: by verify_upload() for a
+    VerifiedUpload, by PDFUploadHandler while receiving, or here. Deduplication
+    only ever keys on this, never on a hash a client declared.
+    """
+    if isinstance(file, VerifiedUpload):
+        return file.content_hash
+    content_hash = getattr(file, 'sha256', None)
+    if content_hash is None:
+        digest = hashlib.sha256()
+        for chunk in file.chunks():
+            digest.update(chunk)
+        file.seek(0)
+        content_hash = file.sha256 = digest.hexdigest()
+    return content_hash
+
+
+def store_pdf(file, size):
+    """
+    Name of the stored file for this content, taking a reference to its PdfBlob.
+
+    `file` is either an uploaded file, written only when the content is new, or
+    a VerifiedUpload, claimed for new content and deleted when the content is
+    already stored.
+    """
+    storage = get_pdf_storage()
+    content_hash = server_content_hash(file)
+    existing = _reference_blob(content_hash)
+    if existing is not None:
+        if isinstance(file, VerifiedUpload):
+            storage.delete(file.name)
+        return existing
+
+    if isinstance(file, VerifiedUpload):
+        name = claim_upload(file)
+    else:
+        name = storage.save(pdf_upload_path(None, file.name), file)
+    try:
+        with transaction.atomic():
+            PdfBlob.objects.create(content_hash=content_hash, name=name, size=size, ref_count=1)
+    except IntegrityError:
+        # An identical upload registered the content first; share its file instead.
+        storage.delete(name)
+        return _reference_blob(content_hash)
+    return name
+
+
+def attach_pdf(mail_record, upload_stage, user, file, original_filename, file_size):
+    """Create the stage's new current attachment, marking the previous one as replaced."""
+    with transaction.atomic():
+        name = store_pdf(file, file_size)
+        mail_record.attachments.filter(upload_stage=upload_stage, is_current=True).update(is_current=False)
+        return RecordAttachment.objects.create(
+            mail_record=mail_record,
+            file=name,
+            original_filename=original_filename,
+            file_size=file_size,
+            uploaded_by=user,
+            upload_stage=upload_stage,
+            is_current=True,
+            content_hash=server_content_hash(file),
+        )
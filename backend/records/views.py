@@ -1,14 +1,36 @@
 from rest_framework import viewsets, status, permissions
 from rest_framework.decorators import action
-from rest_framework.filters import SearchFilter
-from rest_framework.pagination import PageNumberPagination
 from rest_framework.response import Response
-from django.http import FileResponse, HttpResponse
+from django.http import HttpResponse
 from django.utils import timezone
-from django.db.models import Q
+from django.db.models import Prefetch, Q
+from django.core import signing
 from django.db import transaction
 from config.permissions import MailRecordPermission
 from .models import MailRecord, MailAssignment, AssignmentRemark, RecordAttachment
+from .autocomplete import AUTOCOMPLETE_FIELDS, suggest
+from .events import publish_audit_events
+from .changes import (
+    CHANGE_FEED_LIMIT,
+    CHANGE_FEED_OVERLAP,
+    changed_mail_filter,
+    change_token_expired,
+    decode_change_token,
+    encode_change_token,
+    removed_mail_ids,
+)
+from .pagination import MailRecordKeysetPagination, MailRecordPagination
+from .delivery import pdf_response
+from .search import MailRecordSearchFilter
+from .uploads import (
+    PDFUploadHandler,
+    UploadRejected,
+    attach_pdf,
+    create_upload,
+    read_upload_token,
+    verify_upload,
+)
+from .visibility import is_scoped_role, sync_mail_visibility, user_can_see_mail, visible_mail_filter
 from .serializers import (
     MailRecordListSerializer,
     MailRecordDetailSerializer,
@@ -26,28 +48,44 @@ from .serializers import (
     AssignmentReassignSerializer,
     AssignmentRemarkSerializer,
     PDFUploadSerializer,
+    PDFUploadUrlSerializer,
+    PDFFinalizeSerializer,
     PDFMetadataSerializer,
 )
 from audit.models import AuditTrail
+from audit.serializers import AuditTrailSerializer
 from users.models import User
+from users.scope import UserScopeMixin, get_user_scope
 from users.serializers import UserSerializer, UserAssignableSerializer
 from sections.models import Section, Subsection
 
 
-class MailRecordPagination(PageNumberPagination):
-    page_size = 25
-    page_size_query_param = 'page_size'
-    max_page_size = 100
-
-
-class MailRecordViewSet(viewsets.ModelViewSet):
+class MailRecordViewSet(UserScopeMixin, viewsets.ModelViewSet):
     permission_classes = [MailRecordPermission]
     pagination_class = MailRecordPagination
-    filter_backends = [SearchFilter]
-    search_fields = ['sl_no', 'letter_no', 'mail_reference_subject']
+    filter_backends = [MailRecordSearchFilter]
+    # Used only by the icontains fallback on backends without a native search index.
+    search_fields = ['sl_no', 'letter_no', 'mail_reference_subject', 'from_office', 'action_required']
 
     STATUS_SCOPE_ALL = {'', 'all'}
 
+    @property
+    def paginator(self):
+        """
+        Page-number pagination by default (MailListPage); keyset pagination when the
+        client opts in with `?pagination=cursor` or follows a `cursor` link.
+        Searches stay on page numbers: the keyset is (created_at, id) and would
+        discard the relevance ordering.
+        """
+        if not hasattr(self, '_paginator'):
+            params = self.request.query_params
+            searching = bool(params.get(MailRecordSearchFilter.search_param, '').strip())
+            if not searching and (params.get('pagination') == 'cursor' or 'cursor' in params):
+                self._paginator = MailRecordKeysetPagination()
+            else:
+                self._paginator = self.pagination_class()
+        return self._paginator
+
     def _resolve_scope_for_handler(self, handler, fallback_section=None):
         """
         Determine canonical section/subsection for the current handler.
@@ -66,16 +104,7 @@ class MailRecordViewSet(viewsets.ModelViewSet):
         return fallback_section, None
 
     def _assigned_mail_ids_for_user(self, user, request=None):
-        cache_attr = '_assigned_mail_ids_cache'
-        if request and hasattr(request, cache_attr):
-            return getattr(request, cache_attr)
-        result = list(MailAssignment.objects.filter(
-            Q(assigned_to=user) | Q(reassigned_to=user),
-            status='Active'
-        ).values_list('mail_record_id', flat=True).distinct())
-        if request:
-            setattr(request, cache_attr, result)
-        return result
+        return get_user_scope(user).active_assignment_mail_ids
 
     def _apply_status_scope_filter(self, queryset, user, status_filter):
         if status_filter in self.STATUS_SCOPE_ALL:
@@ -106,50 +135,12 @@ class MailRecordViewSet(viewsets.ModelViewSet):
 
         if user.role == 'DAG':
             section_id = mail_record.section_id or (mail_record.subsection.section_id if mail_record.subsection_id else None)
-            if section_id and user.sections.filter(id=section_id).exists():
-                return assignments
-            return []
-
-        if user.role == 'SrAO':
-            if (
-                (user.subsection_id and mail_record.subsection_id == user.subsection_id)
-                or mail_record.current_handler_id == user.id
-                or MailAssignment.objects.filter(
-                    mail_record=mail_record,
-                    status='Active'
-                ).filter(
-                    Q(assigned_to=user) | Q(reassigned_to=user)
-                ).exists()
-            ):
+            if get_user_scope(user).manages_section(section_id):
                 return assignments
             return []
 
-        if user.role == 'AAO':
-            if (
-                (mail_record.created_by.role == 'auditor' and user.subsection_id and mail_record.subsection_id == user.subsection_id)
-                or mail_record.current_handler_id == user.id
-                or MailAssignment.objects.filter(
-                    mail_record=mail_record,
-                    status='Active'
-                ).filter(
-                    Q(assigned_to=user) | Q(reassigned_to=user)
-                ).exists()
-                or mail_record.created_by_id == user.id
-            ):
-                return assignments
-            return []
-
-        if user.role in ['clerk', 'auditor']:
-            if (
-                mail_record.current_handler_id == user.id
-                or MailAssignment.objects.filter(
-                    mail_record=mail_record,
-                    status='Active'
-                ).filter(
-                    Q(assigned_to=user) | Q(reassigned_to=user)
-                ).exists()
-                or mail_record.created_by_id == user.id
-            ):
+        if is_scoped_role(user):
+            if user_can_see_mail(user, mail_record.id):
                 return assignments
             return []
 
@@ -175,7 +166,7 @@ class MailRecordViewSet(viewsets.ModelViewSet):
             return filter_by_mail_scope(candidates.exclude(id=user.id)).distinct()
 
         if user.role == 'DAG':
-            dag_section_ids = set(user.sections.values_list('id', flat=True))
+            dag_section_ids = get_user_scope(user).section_ids
             if mail_record.section_id and mail_record.section_id not in dag_section_ids:
                 return User.objects.none()
 
@@ -196,7 +187,7 @@ class MailRecordViewSet(viewsets.ModelViewSet):
 
         # Auditor: can only escalate to SrAO/AAO in their configured subsections
         if user.role == 'auditor':
-            auditor_sub_ids = list(user.auditor_subsections.values_list('id', flat=True))
+            auditor_sub_ids = get_user_scope(user).auditor_subsection_ids
             if not auditor_sub_ids:
                 return User.objects.none()
             return candidates.exclude(id=user.id).filter(
@@ -231,53 +222,21 @@ class MailRecordViewSet(viewsets.ModelViewSet):
             'assigned_to', 'current_handler', 'monitoring_officer',
             'section', 'subsection', 'subsection__section', 'created_by'
         )
-        if self.action == 'list':
+        if self.action in ('list', 'changes'):
             base_queryset = base_queryset.prefetch_related(
                 'parallel_assignments__assigned_to',
-                'parallel_assignments__reassigned_to'
+                'parallel_assignments__reassigned_to',
+                # One query for the page's current PDFs instead of one per row.
+                Prefetch(
+                    'attachments',
+                    queryset=RecordAttachment.objects.filter(is_current=True)
+                    .select_related('uploaded_by')
+                    .order_by('upload_stage', '-uploaded_at'),
+                    to_attr='prefetched_current_attachments',
+                ),
             )
 
-        queryset = base_queryset
-
-        if user.role == 'AG':
-            queryset = base_queryset
-        elif user.role == 'DAG':
-            dag_section_ids = user.sections.values_list('id', flat=True)
-            queryset = base_queryset.filter(
-                Q(section_id__in=dag_section_ids) |
-                Q(section__isnull=True, subsection__section_id__in=dag_section_ids)
-            )
-        elif user.role == 'SrAO':
-            assigned_ids = self._assigned_mail_ids_for_user(user, self.request)
-            queryset = base_queryset.filter(
-                Q(subsection=user.subsection) |
-                Q(current_handler=user) |
-                Q(id__in=assigned_ids)
-            ).distinct()
-        elif user.role == 'AAO':
-            assigned_ids = self._assigned_mail_ids_for_user(user, self.request)
-            queryset = base_queryset.filter(
-                Q(created_by__role='auditor', subsection=user.subsection) |
-                Q(current_handler=user) |
-                Q(id__in=assigned_ids) |
-                Q(created_by=user)
-            ).distinct()
-        elif user.role == 'clerk':
-            assigned_ids = self._assigned_mail_ids_for_user(user, self.request)
-            queryset = base_queryset.filter(
-                Q(current_handler=user) |
-                Q(id__in=assigned_ids) |
-                Q(created_by=user)
-            ).distinct()
-        elif user.role == 'auditor':
-            assigned_ids = self._assigned_mail_ids_for_user(user, self.request)
-            queryset = base_queryset.filter(
-                Q(current_handler=user) |
-                Q(id__in=assigned_ids) |
-                Q(created_by=user)
-            ).distinct()
-        else:
-            queryset = base_queryset.none()
+        queryset = self._restrict_to_visible(base_queryset, user)
 
         status_filter = self.request.query_params.get('status', '')
         queryset = self._apply_status_scope_filter(queryset, user, status_filter)
@@ -299,7 +258,7 @@ class MailRecordViewSet(viewsets.ModelViewSet):
                 due_date__lt=timezone.now().date()
             ).exclude(status='Closed')
 
-        return queryset.order_by('-created_at')
+        return queryset.order_by('-created_at', '-id')
 
     @action(detail=False, methods=['get'], url_path='assignable-users')
     def assignable_users(self, request):
@@ -315,7 +274,7 @@ class MailRecordViewSet(viewsets.ModelViewSet):
         if user.role == 'AG':
             scoped = qs
         elif user.role == 'DAG':
-            dag_section_ids = list(user.sections.values_list('id', flat=True))
+            dag_section_ids = get_user_scope(user).section_ids
             scoped = qs.filter(
                 Q(subsection__section_id__in=dag_section_ids) |
                 Q(role='DAG', sections__in=dag_section_ids)
@@ -335,6 +294,97 @@ class MailRecordViewSet(viewsets.ModelViewSet):
         serializer = UserAssignableSerializer(scoped.order_by('full_name'), many=True)
         return Response(serializer.data)
 
+    @staticmethod
+    def _restrict_to_visible(queryset, user):
+        """Records the user may see: all for AG, managed sections for DAG, materialized grants otherwise."""
+        if user.role == 'AG':
+            return queryset
+        if user.role == 'DAG':
+            dag_section_ids = get_user_scope(user).section_ids
+            return queryset.filter(
+                Q(section_id__in=dag_section_ids) |
+                Q(section__isnull=True, subsection__section_id__in=dag_section_ids)
+            )
+        if is_scoped_role(user):
+            # SrAO/AAO/clerk/auditor: one indexed join against the materialized grants.
+            return queryset.filter(visible_mail_filter(user))
+        return queryset.none()
+
+    @action(detail=False, methods=['get'], url_path='autocomplete')
+    def autocomplete(self, request):
+        """
+        Suggestions for Create Mail: ?field=from_office|letter_no&q=<prefix>&limit=N.
+        Prefix matches first, then close spellings. Only AG draws on every
+        record; other roles get values from the mail they can see.
+        """
+        field = request.query_params.get('field', 'from_office')
+        if field not in AUTOCOMPLETE_FIELDS:
+            return Response(
+                {'error': f"field must be one of: {', '.join(AUTOCOMPLETE_FIELDS)}"},
+                status=status.HTTP_400_BAD_REQUEST
+            )
+        try:
+            limit = int(request.query_params.get('limit', 0)) or None
+        except ValueError:
+            return Response({'error': 'limit must be an integer'}, status=status.HTTP_400_BAD_REQUEST)
+
+        term = request.query_params.get('q', '')
+        records = None
+        if request.user.role != 'AG':
+            records = self._restrict_to_visible(MailRecord.objects.all(), request.user)
+        return Response({'field': field, 'results': suggest(field, term, limit, records=records)})
+
+    @action(detail=False, methods=['get'], url_path='changes')
+    def changes(self, request):
+        """
+        Incremental sync for MailListPage: ?since=<token> returns the visible records,
+        assignments and audit events changed after the token, the ids that were
+        deleted or left the caller's scope, and the next token.
+        Without `since` only a fresh token is returned. `resync: true` means the
+        token is too old or too much changed: reload the list instead.
+        """
+        now = timezone.now()
+        user = request.user
+        payload = {'token': encode_change_token(now), 'resync': False}
+
+        since_token = request.query_params.get('since')
+        if not since_token:
+            return Response(payload)
+        try:
+            since = decode_change_token(since_token)
+        except ValueError as exc:
+            return Response({'error': str(exc)}, status=status.HTTP_400_BAD_REQUEST)
+        if change_token_expired(since, now):
+            payload['resync'] = True
+            return Response(payload)
+
+        window_start = since - CHANGE_FEED_OVERLAP
+        visible = self.get_queryset()
+        records = list(visible.filter(changed_mail_filter(user, window_start))[:CHANGE_FEED_LIMIT + 1])
+        events = list(
+            AuditTrail.objects.filter(
+                timestamp__gt=window_start,
+                mail_record_id__in=visible.values('id'),
+            ).select_related('performed_by').order_by('timestamp', 'id')[:CHANGE_FEED_LIMIT + 1]
+        )
+        if len(records) > CHANGE_FEED_LIMIT or len(events) > CHANGE_FEED_LIMIT:
+            payload['resync'] = True
+            return Response(payload)
+
+        assignments = [
+            assignment
+            for record in records
+            for assignment in self._filter_assignments_for_user(record, user)
+            if assignment.updated_at > window_start
+        ]
+        payload.update({
+            'records': MailRecordListSerializer(records, many=True, context={'request': request}).data,
+            'assignments': MailAssignmentSerializer(assignments, many=True).data,
+            'events': AuditTrailSerializer(events, many=True).data,
+            'removed': removed_mail_ids(user, visible, window_start),
+        })
+        return Response(payload)
+
     def create(self, request, *args, **kwargs):
         """Create new mail record — all roles can create, scoped to their subsection"""
         serializer = self.get_serializer(data=request.data, context={'request': request})
@@ -424,6 +474,8 @@ class MailRecordViewSet(viewsets.ModelViewSet):
             for assignee in assignees
         ]
         MailAssignment.objects.bulk_create(assignment_objects)
+        # bulk_create bypasses MailAssignment.save(), so refresh grants explicitly.
+        sync_mail_visibility(mail_record)
 
         # Audit trail for creation and assignment (bulk)
         assignee_names = [a.full_name for a in assignees]
@@ -445,6 +497,8 @@ class MailRecordViewSet(viewsets.ModelViewSet):
             ),
         ]
         AuditTrail.objects.bulk_create(audit_entries)
+        # bulk_create bypasses AuditTrail.save(), so push the live events explicitly.
+        publish_audit_events(audit_entries)
 
         response_serializer = MailRecordDetailSerializer(mail_record, context={'request': request})
         return Response(response_serializer.data, status=status.HTTP_201_CREATED)
@@ -505,14 +559,14 @@ class MailRecordViewSet(viewsets.ModelViewSet):
         user = request.user
         if user.role == 'DAG':
             # DAG can only reassign within their managed sections
-            if mail_record.section and not user.sections.filter(id=mail_record.section.id).exists():
+            if mail_record.section_id and not get_user_scope(user).manages_section(mail_record.section_id):
                 return Response(
                     {'error': 'You can only reassign mails within your managed sections.'},
                     status=status.HTTP_403_FORBIDDEN
                 )
             # Check if new handler's subsection is in DAG's managed sections
             if new_handler.subsection:
-                if not user.sections.filter(id=new_handler.subsection.section_id).exists():
+                if not get_user_scope(user).manages_section(new_handler.subsection.section_id):
                     return Response(
                         {'error': 'You can only reassign to users in your managed sections.'},
                         status=status.HTTP_403_FORBIDDEN
@@ -858,7 +912,7 @@ class MailRecordViewSet(viewsets.ModelViewSet):
 
         # DAG can only assign within their managed sections
         if user.role == 'DAG':
-            if mail_record.section and not user.sections.filter(id=mail_record.section.id).exists():
+            if mail_record.section_id and not get_user_scope(user).manages_section(mail_record.section_id):
                 return Response(
                     {'error': 'You can only assign mails within your managed sections.'},
                     status=status.HTTP_403_FORBIDDEN
@@ -874,7 +928,7 @@ class MailRecordViewSet(viewsets.ModelViewSet):
 
         # For DAG, validate all users are in their managed sections
         if user.role == 'DAG':
-            dag_section_ids = set(user.sections.values_list('id', flat=True))
+            dag_section_ids = get_user_scope(user).section_ids
             for u in users:
                 user_section_id = u.subsection.section_id if u.subsection else None
                 if user_section_id not in dag_section_ids:
@@ -908,6 +962,7 @@ class MailRecordViewSet(viewsets.ModelViewSet):
 
         if audit_entries:
             AuditTrail.objects.bulk_create(audit_entries)
+            publish_audit_events(audit_entries)
 
         # Update mail record flags
         mail_record.is_multi_assigned = True
@@ -1102,7 +1157,7 @@ class MailRecordViewSet(viewsets.ModelViewSet):
         # CRITICAL: Same-section only for non-AG users
         if user.role == 'DAG':
             # DAG can only reassign within managed sections
-            dag_section_ids = set(user.sections.values_list('id', flat=True))
+            dag_section_ids = get_user_scope(user).section_ids
             new_assignee_section_id = new_assignee.subsection.section_id if new_assignee.subsection else None
             if new_assignee_section_id not in dag_section_ids:
                 return Response(
@@ -1169,7 +1224,7 @@ class MailRecordViewSet(viewsets.ModelViewSet):
         """
         POST /api/records/{id}/pdf/upload/
         Upload a PDF to a mail record. Accepts multipart/form-data with:
-          - file: PDF file (required, max 10MB, must be .pdf extension)
+          - file: PDF file (required, max MAX_PDF_SIZE_MB (10MB), .pdf extension, %PDF- header)
           - upload_stage: 'created' or 'closed' (required)
 
         Permissions:
@@ -1178,21 +1233,48 @@ class MailRecordViewSet(viewsets.ModelViewSet):
           - SrAO/AAO: allowed only if they are current_handler
 
         Behavior:
+          - The body is parsed by PDFUploadHandler: the file streams to a temp
+            file and non-PDF or oversized uploads are refused mid-stream.
           - If a current PDF already exists for the same upload_stage,
             mark it is_current=False (replacement, not deletion).
-          - Store new file using UUID filename via RecordAttachment model.
+          - Store new file using UUID filename, or share the stored file when
+            the same content (SHA-256) was uploaded before.
           - Return 201 with attachment metadata on success.
         """
+        # Must be installed before anything reads the request body.
+        upload_handler = PDFUploadHandler(request._request)
+        request._request.upload_handlers = [upload_handler]
+
         mail_record = self.get_object()  # triggers has_object_permission
 
         serializer = PDFUploadSerializer(data=request.data)
+        if upload_handler.error:
+            return Response({'error': upload_handler.error}, status=status.HTTP_400_BAD_REQUEST)
         if not serializer.is_valid():
             return Response(serializer.errors, status=status.HTTP_400_BAD_REQUEST)
 
         uploaded_file = serializer.validated_data['file']
         upload_stage = serializer.validated_data['upload_stage']
 
-        # Enforce workflow stage restriction
+        stage_error = self._pdf_stage_error(mail_record, upload_stage)
+        if stage_error:
+            return stage_error
+
+        # Replaces any current attachment for this stage; known content is not stored again
+        attachment = attach_pdf(
+            mail_record,
+            upload_stage,
+            request.user,
+            file=uploaded_file,
+            original_filename=uploaded_file.name,
+            file_size=uploaded_file.size,
+        )
+
+        return Response(attachment.get_metadata_dict(), status=status.HTTP_201_CREATED)
+
+    @staticmethod
+    def _pdf_stage_error(mail_record, upload_stage):
+        """403 response when the record's status does not allow a PDF for upload_stage, else None."""
         if upload_stage == 'created' and mail_record.status not in ['Created', 'Assigned']:
             return Response(
                 {'error': "PDF can only be uploaded at the 'created' stage when the record status is 'Created' or 'Assigned'."},
@@ -1203,28 +1285,92 @@ class MailRecordViewSet(viewsets.ModelViewSet):
                 {'error': "PDF can only be uploaded at the 'closed' stage when the record has been closed."},
                 status=status.HTTP_403_FORBIDDEN
             )
+        return None
 
-        with transaction.atomic():
-            # Mark any existing current attachment for this stage as replaced
-            existing = mail_record.attachments.filter(
-                upload_stage=upload_stage,
-                is_current=True
-            ).first()
-            if existing:
-                existing.is_current = False
-                existing.save(update_fields=['is_current'])
+    @action(detail=True, methods=['post'], url_path='pdf/upload-url', url_name='pdf-upload-url')
+    def pdf_upload_url(self, request, pk=None):
+        """
+        POST /api/records/{id}/pdf/upload-url/
+        Start a direct-to-storage upload.
+        Body: {"filename": "letter.pdf", "upload_stage": "created",
+               "sha256": "<hex digest of the file>", "size": <bytes>}
+
+        Returns a presigned PUT url (valid for PDF_UPLOAD_URL_EXPIRY_SECONDS) with
+        the headers to send, plus an upload_token. The signature covers the
+        declared size and SHA-256. The client PUTs the file body to url with
+        those headers, then calls pdf/finalize/. Same permissions and stage
+        rules as pdf/upload/.
+        """
+        mail_record = self.get_object()  # triggers has_object_permission
 
-            # Create new attachment record — file saved by FileField
-            attachment = RecordAttachment.objects.create(
-                mail_record=mail_record,
-                file=uploaded_file,
-                original_filename=uploaded_file.name,
-                file_size=uploaded_file.size,
-                uploaded_by=request.user,
-                upload_stage=upload_stage,
-                is_current=True,
+        serializer = PDFUploadUrlSerializer(data=request.data)
+        if not serializer.is_valid():
+            return Response(serializer.errors, status=status.HTTP_400_BAD_REQUEST)
+
+        upload_stage = serializer.validated_data['upload_stage']
+        stage_error = self._pdf_stage_error(mail_record, upload_stage)
+        if stage_error:
+            return stage_error
+
+        upload = create_upload(
+            mail_record,
+            upload_stage,
+            request.user,
+            serializer.validated_data['filename'],
+            serializer.validated_data['sha256'],
+            serializer.validated_data['size'],
+        )
+        return Response(upload, status=status.HTTP_200_OK)
+
+    @action(detail=True, methods=['post'], url_path='pdf/finalize', url_name='finalize-pdf-upload')
+    def finalize_pdf_upload(self, request, pk=None):
+        """
+        POST /api/records/{id}/pdf/finalize/
+        Body: {"upload_token": "..."} from pdf/upload-url/.
+
+        Reads the stored object back and checks it (declared size, %PDF
+        header, SHA-256), moves it to a
+        server-chosen key and creates the RecordAttachment, replacing the
+        stage's current PDF like pdf/upload/. The upload key is always deleted;
+        content that is already stored is not copied. Returns 201 with
+        attachment metadata.
+        """
+        mail_record = self.get_object()  # triggers has_object_permission
+
+        serializer = PDFFinalizeSerializer(data=request.data)
+        if not serializer.is_valid():
+            return Response(serializer.errors, status=status.HTTP_400_BAD_REQUEST)
+
+        try:
+            upload = read_upload_token(serializer.validated_data['upload_token'])
+        except signing.BadSignature:
+            return Response(
+                {'error': 'Upload token is invalid or has expired. Request a new upload URL.'},
+                status=status.HTTP_400_BAD_REQUEST
             )
+        if upload['record'] != mail_record.id or upload['user'] != request.user.id:
+            return Response(
+                {'error': 'Upload token was not issued for this record and user.'},
+                status=status.HTTP_400_BAD_REQUEST
+            )
+
+        stage_error = self._pdf_stage_error(mail_record, upload['stage'])
+        if stage_error:
+            return stage_error
 
+        # The upload key is deleted once finalized, so a replayed token finds nothing to attach.
+        try:
+            verified = verify_upload(upload['name'], upload['sha256'], upload['size'])
+            attachment = attach_pdf(
+                mail_record,
+                upload['stage'],
+                request.user,
+                file=verified,
+                original_filename=upload['filename'],
+                file_size=verified.size,
+            )
+        except UploadRejected as exc:
+            return Response({'error': str(exc)}, status=status.HTTP_400_BAD_REQUEST)
         return Response(attachment.get_metadata_dict(), status=status.HTTP_201_CREATED)
 
     @action(detail=True, methods=['get'], url_path='pdf', url_name='pdf-metadata')
@@ -1269,8 +1415,10 @@ class MailRecordViewSet(viewsets.ModelViewSet):
         Returns the selected PDF inline.
         Query param 'stage' selects which stage PDF to serve (default: 'created').
 
-        In local split-server development, Django serves the file directly.
-        Behind nginx, proxying the response still works correctly.
+        With PDF_DELIVERY_MODE='proxy' (default) Django streams the file,
+        honouring Range and If-None-Match (ETag is the attachment id). With
+        'redirect' the response is a 302 to a short-lived presigned storage URL.
+        See records/delivery.py.
         """
         mail_record = self.get_object()  # triggers has_object_permission
 
@@ -1298,14 +1446,10 @@ class MailRecordViewSet(viewsets.ModelViewSet):
                 status=status.HTTP_500_INTERNAL_SERVER_ERROR
             )
 
-        safe_filename = attachment.original_filename.replace('"', '').replace('\\', '')
-        attachment.file.open('rb')
-        response = FileResponse(attachment.file, content_type='application/pdf')
-        response['Content-Disposition'] = f'inline; filename="{safe_filename}"'
-        return response
+        return pdf_response(request, attachment)
 
 
-class MailAssignmentViewSet(viewsets.ModelViewSet):
+class MailAssignmentViewSet(UserScopeMixin, viewsets.ModelViewSet):
     """ViewSet for parallel assignment operations"""
     serializer_class = MailAssignmentSerializer
     permission_classes = [permissions.IsAuthenticated]
@@ -1316,7 +1460,7 @@ class MailAssignmentViewSet(viewsets.ModelViewSet):
             return MailAssignment.objects.all()
         elif user.role == 'DAG':
             # DAG can see assignments from their managed sections
-            dag_section_ids = list(user.sections.values_list('id', flat=True))
+            dag_section_ids = get_user_scope(user).section_ids
             return MailAssignment.objects.filter(
                 Q(mail_record__section_id__in=dag_section_ids) |
                 Q(assigned_to=user) |
@@ -0,0 +1,208 @@
+"""
+Materialized per-user mail visibility.
+
+SrAO/AAO/clerk/auditor visibility used to be an OR of several clauses plus a
+MailAssignment subquery and a DISTINCT on every list request. The rules are now
+evaluated on write and stored in MailVisibility as one row per (mail, user), so
+reads become a single indexed join. AG sees everything and DAG visibility is a
+plain section filter, so neither role is materialized.
+"""
+from django.db import transaction
+from django.db.models import Q
+
+
+REASON_CREATOR = 'creator'
+REASON_HANDLER = 'handler'
+REASON_ASSIGNEE = 'assignee'
+REASON_SUBSECTION = 'subsection'
+
+# When several rules grant access, the first one in this order is recorded.
+REASON_PRIORITY = [REASON_HANDLER, REASON_ASSIGNEE, REASON_CREATOR, REASON_SUBSECTION]
+
+SCOPED_ROLES = ('SrAO', 'AAO', 'clerk', 'auditor')
+CREATOR_VISIBLE_ROLES = ('AAO', 'clerk', 'auditor')
+
+# Fields whose change can alter who may see a mail / an assignment.
+MAIL_VISIBILITY_FIELDS = {'created_by', 'current_handler', 'subsection'}
+ASSIGNMENT_VISIBILITY_FIELDS = {'status', 'assigned_to', 'reassigned_to', 'mail_record'}
+
+
+def is_scoped_role(user):
+    return getattr(user, 'role', None) in SCOPED_ROLES
+
+
+def touches_visibility(update_fields, relevant_fields):
+    """True when a save() with these update_fields may change visibility."""
+    if update_fields is None:
+        return True
+    return bool(relevant_fields.intersection(update_fields))
+
+
+def _merge(grants, user_id, reason):
+    current = grants.get(user_id)
+    if current is None or REASON_PRIORITY.index(reason) < REASON_PRIORITY.index(current):
+        grants[user_id] = reason
+
+
+def compute_mail_grants(mail_record):
+    """Return {user_id: reason} for every scoped user who can see this mail."""
+    from users.models import User
+    from .models import MailAssignment
+
+    assignee_ids = set()
+    for assigned_to_id, reassigned_to_id in MailAssignment.objects.filter(
+        mail_record_id=mail_record.id,
+        status='Active',
+    ).values_list('assigned_to_id', 'reassigned_to_id'):
+        assignee_ids.add(assigned_to_id)
+        if reassigned_to_id:
+            assignee_ids.add(reassigned_to_id)
+
+    candidate_ids = set(assignee_ids)
+    candidate_ids.add(mail_record.created_by_id)
+    if mail_record.current_handler_id:
+        candidate_ids.add(mail_record.current_handler_id)
+
+    user_filter = Q(id__in=candidate_ids)
+    if mail_record.subsection_id:
+        user_filter |= Q(subsection_id=mail_record.subsection_id, role__in=['SrAO', 'AAO'])
+
+    users = {
+        user_id: (role, subsection_id)
+        for user_id, role, subsection_id in User.objects.filter(user_filter).values_list(
+            'id', 'role', 'subsection_id'
+        )
+    }
+    creator_role = users.get(mail_record.created_by_id, (None, None))[0]
+
+    grants = {}
+    for user_id, (role, subsection_id) in users.items():
+        if role not in SCOPED_ROLES:
+            continue
+        if user_id == mail_record.current_handler_id:
+            _merge(grants, user_id, REASON_HANDLER)
+        if user_id in assignee_ids:
+            _merge(grants, user_id, REASON_ASSIGNEE)
+        if user_id == mail_record.created_by_id and role in CREATOR_VISIBLE_ROLES:
+            _merge(grants, user_id, REASON_CREATOR)
+        if mail_record.subsection_id and subsection_id == mail_record.subsection_id:
+            if role == 'SrAO' or (role == 'AAO' and creator_role == 'auditor'):
+                _merge(grants, user_id, REASON_SUBSECTION)
+    return grants
+
+
+def compute_user_grants(user):
+    """Return {mail_id: reason} for every mail the scoped user can see."""
+    from .models import MailAssignment, MailRecord
+
+    grants = {}
+    if not is_scoped_role(user):
+        return grants
+
+    for mail_id in MailRecord.objects.filter(current_handler_id=user.id).values_list('id', flat=True):
+        _merge(grants, mail_id, REASON_HANDLER)
+
+    for mail_id in MailAssignment.objects.filter(
+        Q(assigned_to_id=user.id) | Q(reassigned_to_id=user.id),
+        status='Active',
+    ).values_list('mail_record_id', flat=True):
+        _merge(grants, mail_id, REASON_ASSIGNEE)
+
+    if user.role in CREATOR_VISIBLE_ROLES:
+        for mail_id in MailRecord.objects.filter(created_by_id=user.id).values_list('id', flat=True):
+            _merge(grants, mail_id, REASON_CREATOR)
+
+    if user.subsection_id and user.role in ('SrAO', 'AAO'):
+        subsection_mails = MailRecord.objects.filter(subsection_id=user.subsection_id)
+        if user.role == 'AAO':
+            subsection_mails = subsection_mails.filter(created_by__role='auditor')
+        for mail_id in subsection_mails.values_list('id', flat=True):
+            _merge(grants, mail_id, REASON_SUBSECTION)
+
+    return grants
+
+
+def _apply(queryset, desired, existing, build_row, key_field, build_removal):
+    from .models import MailRemoval
+
+    stale_keys = [key for key, reason in existing.items() if desired.get(key) != reason]
+    if stale_keys:
+        queryset.filter(**{f'{key_field}__in': stale_keys}).delete()
+
+    # Grants that disappear entirely (not just a reason change) feed the change feed's `removed` list.
+    lost = [build_removal(key) for key in stale_keys if key not in desired]
+    if lost:
+        MailRemoval.objects.bulk_create(lost, batch_size=1000)
+
+    missing = [
+        build_row(key, reason)
+        for key, reason in desired.items()
+        if existing.get(key) != reason
+    ]
+    if missing:
+        queryset.model.objects.bulk_create(missing, batch_size=1000, ignore_conflicts=True)
+    return len(stale_keys), len(missing)
+
+
+def sync_mail_visibility(mail_record):
+    """Bring the visibility rows of one mail in line with its current state."""
+    from .models import MailRemoval, MailVisibility
+
+    if not mail_record.pk:
+        return 0, 0
+
+    desired = compute_mail_grants(mail_record)
+    rows = MailVisibility.objects.filter(mail_record_id=mail_record.id)
+    existing = dict(rows.values_list('user_id', 'reason'))
+    with transaction.atomic():
+        return _apply(
+            rows,
+            desired,
+            existing,
+            lambda user_id, reason: MailVisibility(
+                mail_record_id=mail_record.id, user_id=user_id, reason=reason
+            ),
+            'user_id',
+            lambda user_id: MailRemoval(mail_record_id=mail_record.id, user_id=user_id),
+        )
+
+
+def sync_user_visibility(user):
+    """Rebuild one user's visibility rows (role/subsection edits, backfills)."""
+    from .models import MailRemoval, MailVisibility
+
+    desired = compute_user_grants(user)
+    rows = MailVisibility.objects.filter(user_id=user.id)
+    existing = dict(rows.values_list('mail_record_id', 'reason'))
+    with transaction.atomic():
+        return _apply(
+            rows,
+            desired,
+            existing,
+            lambda mail_id, reason: MailVisibility(
+                mail_record_id=mail_id, user_id=user.id, reason=reason
+            ),
+            'mail_record_id',
+            lambda mail_id: MailRemoval(mail_record_id=mail_id, user_id=user.id),
+        )
+
+
+def sync_created_mail_visibility(user):
+    """Re-sync the mails a user created after their role changes (AAO subsection grants follow the creator's role)."""
+    from .models import MailRecord
+
+    for mail_record in MailRecord.objects.filter(created_by_id=user.id, subsection__isnull=False).only(
+        'id', 'created_by_id', 'current_handler_id', 'subsection_id'
+    ):
+        sync_mail_visibility(mail_record)
+
+
+def user_can_see_mail(user, mail_record_id):
+    from .models import MailVisibility
+
+    return MailVisibility.objects.filter(mail_record_id=mail_record_id, user_id=user.id).exists()
+
+
+def visible_mail_filter(user):
+    """Q clause restricting MailRecord rows to the scoped user's materialized grants."""
+    return Q(visibility_grants__user_id=user.id)
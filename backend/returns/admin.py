@@ -1,4 +1,5 @@
 import csv
+from calendar import month_name
 from io import TextIOWrapper
 
 from django import forms
@@ -6,9 +7,14 @@ from django.contrib import admin, messages
 from django.shortcuts import redirect, render
 from django.urls import path
 
-from sections.models import Section
-
-from .models import ReturnApplicability, ReturnDefinition, ReturnPeriodEntry, ReturnStatusLog
+from .importer import import_rows, summarize
+from .models import (
+    ReturnApplicability,
+    ReturnComplianceRollup,
+    ReturnDefinition,
+    ReturnPeriodEntry,
+    ReturnStatusLog,
+)
 
 
 class ImportReturnsForm(forms.Form):
@@ -76,6 +82,13 @@ class ReturnDefinitionAdmin(admin.ModelAdmin):
                             request,
                             f"Updated {results['applicabilities_updated']} section mapping(s).",
                         )
+                    unchanged = results['definitions_unchanged'] + results['applicabilities_unchanged']
+                    if unchanged:
+                        messages.info(
+                            request,
+                            f"{results['definitions_unchanged']} return definition(s) and "
+                            f"{results['applicabilities_unchanged']} section mapping(s) were already up to date.",
+                        )
                     for error in results['errors']:
                         messages.error(request, error)
                 except Exception as exc:
@@ -93,14 +106,6 @@ class ReturnDefinitionAdmin(admin.ModelAdmin):
         return render(request, 'admin/returns/returndefinition/import_returns.html', context)
 
     def _import_from_csv(self, file):
-        results = {
-            'definitions_created': 0,
-            'definitions_updated': 0,
-            'applicabilities_created': 0,
-            'applicabilities_updated': 0,
-            'errors': [],
-        }
-
         text_file = TextIOWrapper(file, encoding='utf-8-sig')
         reader = csv.DictReader(text_file)
         required_columns = ['report_code', 'report_name', 'frequency', 'section_name', 'due_day']
@@ -112,107 +117,45 @@ class ReturnDefinitionAdmin(admin.ModelAdmin):
         if missing:
             raise ValueError(f"Missing required columns: {', '.join(missing)}")
 
-        all_sections = list(Section.objects.all().order_by('name'))
-        all_sections_map = {section.name.strip().lower(): section for section in all_sections}
-        if not all_sections:
-            raise ValueError('No sections exist. Import sections before importing returns.')
-
+        rows = []
         for row_num, row in enumerate(reader, start=2):
             normalized = {
                 str(key or '').strip().lower(): '' if value is None else str(value).strip()
                 for key, value in (row or {}).items()
             }
-            code = normalized.get('report_code', '').upper()
-            name = normalized.get('report_name', '')
-            frequency = normalized.get('frequency', '').lower()
-            section_name = normalized.get('section_name', '')
-            due_day_raw = normalized.get('due_day', '')
-            applicable_months_raw = normalized.get('applicable_months', '')
-            active_raw = normalized.get('active', 'true').lower()
-            description = normalized.get('description', '')
-
-            if not all([code, name, frequency, section_name, due_day_raw]):
-                results['errors'].append(
-                    f'Row {row_num}: report_code, report_name, frequency, section_name, and due_day are required.'
-                )
-                continue
-
-            if frequency not in {'monthly', 'quarterly', 'annual'}:
-                results['errors'].append(
-                    f'Row {row_num} ({code}): frequency must be monthly, quarterly, or annual.'
-                )
-                continue
-
-            try:
-                due_day = int(due_day_raw)
-            except ValueError:
-                results['errors'].append(f'Row {row_num} ({code}): due_day must be a number.')
-                continue
-
-            try:
-                if applicable_months_raw:
-                    applicable_months = [int(token.strip()) for token in applicable_months_raw.split(',') if token.strip()]
-                else:
-                    applicable_months = []
-            except ValueError:
-                results['errors'].append(f'Row {row_num} ({code}): applicable_months must contain valid month numbers.')
-                continue
-
-            active = active_raw in {'1', 'true', 'yes', 'y'}
-
-            definition, created = ReturnDefinition.objects.update_or_create(
-                code=code,
-                defaults={
-                    'name': name,
-                    'description': description,
-                    'frequency': frequency,
-                    'active': active,
-                },
-            )
-            if created:
-                results['definitions_created'] += 1
-            else:
-                results['definitions_updated'] += 1
-
-            if section_name.upper() == 'ALL':
-                target_sections = all_sections
-            else:
-                section = all_sections_map.get(section_name.strip().lower())
-                if not section:
-                    results['errors'].append(
-                        f'Row {row_num} ({code}): section "{section_name}" does not exist.'
-                    )
-                    continue
-                target_sections = [section]
-
-            for section in target_sections:
-                try:
-                    _, applicability_created = ReturnApplicability.objects.update_or_create(
-                        return_definition=definition,
-                        section=section,
-                        defaults={
-                            'due_day': due_day,
-                            'applicable_months': applicable_months,
-                            'active': active,
-                        },
-                    )
-                except Exception as exc:
-                    results['errors'].append(
-                        f'Row {row_num} ({code}): could not save mapping for section "{section.name}": {exc}'
-                    )
-                    continue
-                if applicability_created:
-                    results['applicabilities_created'] += 1
-                else:
-                    results['applicabilities_updated'] += 1
+            normalized['row_num'] = row_num
+            rows.append(normalized)
+
+        plan = import_rows(rows)
+        counts = summarize(plan)
+        return {
+            'definitions_created': counts['create_definitions'],
+            'definitions_updated': counts['update_definitions'],
+            'definitions_unchanged': counts['unchanged_definitions'],
+            'applicabilities_created': counts['create_applicabilities'],
+            'applicabilities_updated': counts['update_applicabilities'],
+            'applicabilities_unchanged': counts['unchanged_applicabilities'],
+            'errors': plan['errors'],
+        }
+
+
+class AppliesInMonthFilter(admin.SimpleListFilter):
+    title = 'applies in month'
+    parameter_name = 'applies_in_month'
 
-        return results
+    def lookups(self, request, model_admin):
+        return [(str(month), month_name[month]) for month in range(1, 13)]
+
+    def queryset(self, request, queryset):
+        if self.value() not in {str(month) for month in range(1, 13)}:
+            return queryset
+        return queryset.filter(ReturnApplicability.in_months([int(self.value())]))
 
 
 @admin.register(ReturnApplicability)
 class ReturnApplicabilityAdmin(admin.ModelAdmin):
     list_display = ['return_definition', 'section', 'due_day', 'applicable_months', 'active']
-    list_filter = ['active', 'return_definition__frequency', 'section']
+    list_filter = ['active', 'return_definition__frequency', AppliesInMonthFilter, 'section']
     search_fields = ['return_definition__code', 'return_definition__name', 'section__name']
 
 
@@ -264,3 +207,24 @@ class ReturnStatusLogAdmin(admin.ModelAdmin):
 
     def has_add_permission(self, request):
         return False
+
+
+@admin.register(ReturnComplianceRollup)
+class ReturnComplianceRollupAdmin(admin.ModelAdmin):
+    list_display = ['section', 'year', 'month', 'total', 'submitted', 'pending', 'delayed', 'overdue', 'overdue_as_of']
+    list_filter = ['year', 'month', 'section']
+    readonly_fields = [
+        'section',
+        'year',
+        'month',
+        'total',
+        'submitted',
+        'pending',
+        'delayed',
+        'sum_delay_days',
+        'overdue',
+        'overdue_as_of',
+    ]
+
+    def has_add_permission(self, request):
+        return False
@@ -0,0 +1,212 @@
+"""
+Set-based import of the Calendar of Returns master (ReturnDefinition and
+ReturnApplicability rows) used by the admin CSV upload.
+
+plan_import() validates every row and diffs it against the existing
+definitions/applicabilities, loaded once; apply_import() writes the diff with
+two bulk upserts in one transaction. Later rows win when a report code or a
+(report code, section) pair appears more than once, as with the old per-row
+update_or_create.
+"""
+from django.core.exceptions import ValidationError
+from django.db import transaction
+from django.utils import timezone
+
+from sections.models import Section
+
+from .models import ReturnApplicability, ReturnDefinition, ReturnPeriodGeneration, months_to_mask
+
+
+DEFINITION_FIELDS = ['name', 'description', 'frequency', 'active']
+APPLICABILITY_FIELDS = ['due_day', 'applicable_months', 'active']
+FREQUENCIES = {choice for choice, _ in ReturnDefinition.FREQUENCY_CHOICES}
+
+
+def empty_plan():
+    return {
+        'create_definitions': [],
+        'update_definitions': [],
+        'unchanged_definitions': [],
+        'create_applicabilities': [],
+        'update_applicabilities': [],
+        'unchanged_applicabilities': [],
+        'errors': [],
+    }
+
+
+def _validate_row(row, sections, sections_by_name):
+    """(definition values, applicability values, target sections) for one row; raises ValueError."""
+    code = row.get('report_code', '').upper()
+    name = row.get('report_name', '')
+    frequency = row.get('frequency', '').lower()
+    section_name = row.get('section_name', '')
+    due_day_raw = row.get('due_day', '')
+
+    if not all([code, name, frequency, section_name, due_day_raw]):
+        raise ValueError('report_code, report_name, frequency, section_name, and due_day are required.')
+    if frequency not in FREQUENCIES:
+        raise ValueError('frequency must be monthly, quarterly, or annual.')
+
+    try:
+        due_day = int(due_day_raw)
+    except ValueError:
+        raise ValueError('due_day must be a number.')
+    if due_day < 1 or due_day > 31:
+        raise ValueError('due_day must be between 1 and 31.')
+
+    try:
+        applicable_months = ReturnApplicability._normalize_months(row.get('applicable_months', ''))
+    except (ValueError, ValidationError):
+        raise ValueError('applicable_months must contain valid month numbers.')
+    if frequency != ReturnDefinition.FREQUENCY_MONTHLY and not applicable_months:
+        raise ValueError('quarterly and annual returns must define applicable_months.')
+
+    if section_name.upper() == 'ALL':
+        target_sections = sections
+    else:
+        section = sections_by_name.get(section_name.lower())
+        if section is None:
+            raise ValueError(f'section "{section_name}" does not exist.')
+        target_sections = [section]
+
+    active = row.get('active', 'true').lower() in {'1', 'true', 'yes', 'y'}
+    definition_values = {
+        'code': code,
+        'name': name,
+        'description': row.get('description', ''),
+        'frequency': frequency,
+        'active': active,
+    }
+    applicability_values = {
+        'due_day': due_day,
+        'applicable_months': applicable_months,
+        'active': active,
+    }
+    return definition_values, applicability_values, target_sections
+
+
+def plan_import(rows):
+    """
+    Validate rows (normalized dicts with lower-case keys plus 'row_num') and
+    diff them against the database without writing. Invalid rows are reported
+    in plan['errors'] and skipped.
+    """
+    plan = empty_plan()
+    sections = list(Section.objects.order_by('name'))
+    if not sections:
+        raise ValueError('No sections exist. Import sections before importing returns.')
+    sections_by_name = {section.name.strip().lower(): section for section in sections}
+
+    definition_values = {}
+    applicability_values = {}
+    for row in rows:
+        try:
+            definition, applicability, target_sections = _validate_row(row, sections, sections_by_name)
+        except ValueError as exc:
+            code = row.get('report_code', '').upper()
+            label = f"Row {row['row_num']} ({code})" if code else f"Row {row['row_num']}"
+            plan['errors'].append(f'{label}: {exc}')
+            continue
+        definition_values[definition['code']] = definition
+        for section in target_sections:
+            applicability_values[(definition['code'], section.id)] = applicability
+
+    existing_definitions = {
+        definition.code: definition
+        for definition in ReturnDefinition.objects.filter(code__in=definition_values)
+    }
+    existing_applicabilities = {
+        (applicability.return_definition.code, applicability.section_id): applicability
+        for applicability in ReturnApplicability.objects.select_related('return_definition').filter(
+            return_definition__code__in=definition_values,
+        )
+    }
+
+    definitions = {}
+    for code, values in definition_values.items():
+        definition = existing_definitions.get(code)
+        if definition is None:
+            definition = ReturnDefinition(**values)
+            plan['create_definitions'].append(definition)
+        elif any(getattr(definition, field) != values[field] for field in DEFINITION_FIELDS):
+            for field in DEFINITION_FIELDS:
+                setattr(definition, field, values[field])
+            plan['update_definitions'].append(definition)
+        else:
+            plan['unchanged_definitions'].append(definition)
+        definitions[code] = definition
+
+    for (code, section_id), values in applicability_values.items():
+        applicability = existing_applicabilities.get((code, section_id))
+        if applicability is None:
+            applicability = ReturnApplicability(return_definition=definitions[code], section_id=section_id, **values)
+            plan['create_applicabilities'].append(applicability)
+        elif any(getattr(applicability, field) != values[field] for field in APPLICABILITY_FIELDS):
+            for field in APPLICABILITY_FIELDS:
+                setattr(applicability, field, values[field])
+            plan['update_applicabilities'].append(applicability)
+        else:
+            plan['unchanged_applicabilities'].append(applicability)
+        applicability.month_mask = months_to_mask(applicability.applicable_months)
+
+    return plan
+
+
+def apply_import(plan):
+    """
+    Write the plan with one upsert per model. Bulk writes skip the model
+    signals, so the ReturnPeriodGeneration markers of every affected section are
+    cleared here directly.
+    """
+    definitions = plan['create_definitions'] + plan['update_definitions']
+    applicabilities = plan['create_applicabilities'] + plan['update_applicabilities']
+    if not definitions and not applicabilities:
+        return plan
+
+    now = timezone.now()
+    for obj in definitions + applicabilities:
+        obj.updated_at = now
+
+    with transaction.atomic():
+        ReturnDefinition.objects.bulk_create(
+            definitions,
+            update_conflicts=True,
+            unique_fields=['code'],
+            update_fields=[*DEFINITION_FIELDS, 'updated_at'],
+            batch_size=500,
+        )
+        # Re-read the ids: not every backend returns them from an upsert.
+        # ReturnApplicability.bulk_create below takes return_definition_id from these.
+        definition_ids = dict(
+            ReturnDefinition.objects.filter(
+                code__in=[definition.code for definition in definitions],
+            ).values_list('code', 'id')
+        )
+        for definition in definitions:
+            definition.id = definition_ids[definition.code]
+
+        ReturnApplicability.objects.bulk_create(
+            applicabilities,
+            update_conflicts=True,
+            unique_fields=['return_definition', 'section'],
+            update_fields=[*APPLICABILITY_FIELDS, 'month_mask', 'updated_at'],
+            batch_size=500,
+        )
+
+        affected_section_ids = {applicability.section_id for applicability in applicabilities}
+        affected_section_ids.update(
+            ReturnApplicability.objects.filter(
+                return_definition__in=plan['update_definitions'],
+            ).values_list('section_id', flat=True)
+        )
+        ReturnPeriodGeneration.objects.filter(section_id__in=affected_section_ids).delete()
+    return plan
+
+
+def import_rows(rows):
+    return apply_import(plan_import(rows))
+
+
+def summarize(plan):
+    """Counts per change type, for admin messages."""
+    return {key: len(value) for key, value in plan.items()}
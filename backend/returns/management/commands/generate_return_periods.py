@@ -0,0 +1,34 @@
+from django.core.management.base import BaseCommand, CommandError
+from django.utils import timezone
+
+from returns.services import coerce_period, ensure_period_entries_for_periods, month_label, months_from
+
+
+class Command(BaseCommand):
+    help = "Pre-generate return period entries (current and next month by default). Run daily from cron."
+
+    def add_arguments(self, parser):
+        parser.add_argument("--year", type=int, help="First year to generate (default: current year).")
+        parser.add_argument("--month", type=int, help="First month to generate (default: current month).")
+        parser.add_argument(
+            "--months",
+            type=int,
+            default=2,
+            help="Number of consecutive months to generate, starting at --year/--month.",
+        )
+
+    def handle(self, *args, **options):
+        today = timezone.localdate()
+        try:
+            year, month = coerce_period(options["year"] or today.year, options["month"] or today.month)
+        except ValueError as exc:
+            raise CommandError(str(exc))
+        if options["months"] < 1:
+            raise CommandError("--months must be at least 1.")
+
+        periods = months_from(year, month, options["months"])
+        created = ensure_period_entries_for_periods(periods)
+        self.stdout.write(self.style.SUCCESS(
+            f"Created {created} return entr{'y' if created == 1 else 'ies'} for "
+            f"{month_label(*periods[0])} to {month_label(*periods[-1])}"
+        ))
@@ -0,0 +1,33 @@
+from django.core.management.base import BaseCommand, CommandError
+from django.db import transaction
+
+from returns.models import ReturnComplianceRollup, ReturnPeriodEntry
+
+
+class Command(BaseCommand):
+    help = "Backfill or rebuild the per-section monthly return compliance rollups from the period entries."
+
+    def add_arguments(self, parser):
+        parser.add_argument("--year", type=int, help="Only rebuild this year.")
+        parser.add_argument("--month", type=int, help="Only rebuild this month (requires --year).")
+
+    def handle(self, *args, **options):
+        if options["month"] and not options["year"]:
+            raise CommandError("--month requires --year.")
+
+        filters = {}
+        if options["year"]:
+            filters["year"] = options["year"]
+        if options["month"]:
+            filters["month"] = options["month"]
+
+        with transaction.atomic():
+            ReturnComplianceRollup.objects.filter(**filters).delete()
+            keys = None
+            if filters:
+                keys = set(
+                    ReturnPeriodEntry.objects.filter(**filters).values_list("section_id", "year", "month").distinct()
+                )
+            rebuilt = ReturnComplianceRollup.refresh(keys)
+
+        self.stdout.write(self.style.SUCCESS(f"Rebuilt {rebuilt} rollup row(s)"))
@@ -0,0 +1,27 @@
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('returns', '0001_initial'),
+        ('sections', '0003_alter_section_id_alter_section_name_and_more'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ReturnPeriodGeneration',
+            fields=[
+                ('id', models.AutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('year', models.PositiveIntegerField()),
+                ('month', models.PositiveSmallIntegerField()),
+                ('generated_at', models.DateTimeField(auto_now=True)),
+                ('section', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='return_period_generations', to='sections.section')),
+            ],
+            options={
+                'indexes': [models.Index(fields=['year', 'month'], name='returns_ret_year_ec7067_idx')],
+                'constraints': [models.UniqueConstraint(fields=('section', 'year', 'month'), name='unique_return_period_generation')],
+            },
+        ),
+    ]
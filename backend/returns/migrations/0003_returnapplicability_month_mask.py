@@ -0,0 +1,32 @@
+from django.db import migrations, models
+
+
+def fill_month_masks(apps, schema_editor):
+    ReturnApplicability = apps.get_model('returns', 'ReturnApplicability')
+
+    rows = list(ReturnApplicability.objects.only('id', 'applicable_months'))
+    for row in rows:
+        row.month_mask = 0
+        for month in row.applicable_months or []:
+            row.month_mask |= 1 << (int(month) - 1)
+    ReturnApplicability.objects.bulk_update(rows, ['month_mask'], batch_size=500)
+
+
+def noop_reverse(apps, schema_editor):
+    pass
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('returns', '0002_return_period_generation'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='returnapplicability',
+            name='month_mask',
+            field=models.PositiveSmallIntegerField(default=0, editable=False),
+        ),
+        migrations.RunPython(fill_month_masks, noop_reverse),
+    ]
@@ -0,0 +1,62 @@
+import django.db.models.deletion
+from django.db import migrations, models
+from django.db.models import Count, Q, Sum
+from django.db.models.functions import Coalesce
+from django.utils import timezone
+
+
+def backfill_rollups(apps, schema_editor):
+    ReturnPeriodEntry = apps.get_model('returns', 'ReturnPeriodEntry')
+    ReturnComplianceRollup = apps.get_model('returns', 'ReturnComplianceRollup')
+
+    today = timezone.localdate()
+    pending = Q(status='pending')
+    delayed = Q(delay_days__gt=0)
+    rows = ReturnPeriodEntry.objects.order_by().values('section_id', 'year', 'month').annotate(
+        total=Count('id'),
+        submitted=Count('id', filter=Q(status='submitted')),
+        pending=Count('id', filter=pending),
+        delayed=Count('id', filter=delayed),
+        sum_delay_days=Coalesce(Sum('delay_days', filter=delayed), 0),
+        overdue=Count('id', filter=pending & Q(due_date__lt=today)),
+    )
+    ReturnComplianceRollup.objects.bulk_create(
+        [ReturnComplianceRollup(overdue_as_of=today, **row) for row in rows],
+        batch_size=500,
+    )
+
+
+def noop_reverse(apps, schema_editor):
+    pass
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('returns', '0003_returnapplicability_month_mask'),
+        ('sections', '0003_alter_section_id_alter_section_name_and_more'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ReturnComplianceRollup',
+            fields=[
+                ('id', models.AutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('year', models.PositiveIntegerField()),
+                ('month', models.PositiveSmallIntegerField()),
+                ('total', models.PositiveIntegerField(default=0)),
+                ('submitted', models.PositiveIntegerField(default=0)),
+                ('pending', models.PositiveIntegerField(default=0)),
+                ('delayed', models.PositiveIntegerField(default=0)),
+                ('sum_delay_days', models.PositiveIntegerField(default=0)),
+                ('overdue', models.PositiveIntegerField(default=0)),
+                ('overdue_as_of', models.DateField()),
+                ('section', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='return_compliance_rollups', to='sections.section')),
+            ],
+            options={
+                'indexes': [models.Index(fields=['year', 'month'], name='returns_ret_year_de4ff6_idx')],
+                'constraints': [models.UniqueConstraint(fields=('section', 'year', 'month'), name='unique_return_compliance_rollup')],
+            },
+        ),
+        migrations.RunPython(backfill_rollups, noop_reverse),
+    ]
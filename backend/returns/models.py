@@ -3,7 +3,12 @@ from datetime import date
 
 from django.conf import settings
 from django.core.exceptions import ValidationError
-from django.db import models
+from django.db import models, transaction
+from django.db.models import Case, Count, F, Q, Sum, Value, When
+from django.db.models.functions import Coalesce
+from django.db.models.lookups import GreaterThan
+from django.db.models.signals import post_delete, post_save
+from django.dispatch import receiver
 from django.utils import timezone
 
 from sections.models import Section
@@ -40,6 +45,14 @@ class ReturnDefinition(models.Model):
         return f'{self.code} - {self.name}'
 
 
+def months_to_mask(months):
+    """Bit (month - 1) set for every month in months."""
+    mask = 0
+    for month in months:
+        mask |= 1 << (int(month) - 1)
+    return mask
+
+
 class ReturnApplicability(models.Model):
     return_definition = models.ForeignKey(
         ReturnDefinition,
@@ -59,6 +72,8 @@ class ReturnApplicability(models.Model):
         blank=True,
         help_text='Month numbers (1-12). Leave blank for monthly returns.',
     )
+    # applicable_months as a 12-bit mask (bit 0 = January) so month matching runs in SQL.
+    month_mask = models.PositiveSmallIntegerField(default=0, editable=False)
     active = models.BooleanField(default=True)
     created_at = models.DateTimeField(auto_now_add=True)
     updated_at = models.DateTimeField(auto_now=True)
@@ -91,9 +106,20 @@ class ReturnApplicability(models.Model):
 
     def save(self, *args, **kwargs):
         self.applicable_months = self._normalize_months(self.applicable_months)
+        self.month_mask = months_to_mask(self.applicable_months)
+        update_fields = kwargs.get('update_fields')
+        if update_fields is not None and 'applicable_months' in update_fields:
+            kwargs['update_fields'] = {*update_fields, 'month_mask'}
         self.full_clean()
         super().save(*args, **kwargs)
 
+    @staticmethod
+    def in_months(months):
+        """Q for rows that apply in any of the given months: monthly returns, or a matching mask bit."""
+        return Q(return_definition__frequency=ReturnDefinition.FREQUENCY_MONTHLY) | Q(
+            GreaterThan(F('month_mask').bitand(months_to_mask(months)), 0)
+        )
+
     @staticmethod
     def _normalize_months(raw_months):
         if raw_months in (None, ''):
@@ -114,7 +140,9 @@ class ReturnApplicability(models.Model):
         return self._normalize_months(self.applicable_months)
 
     def applies_to_month(self, month):
-        return month in self.get_active_months()
+        if self.return_definition.frequency == ReturnDefinition.FREQUENCY_MONTHLY:
+            return True
+        return bool(self.month_mask & months_to_mask([month]))
 
     def get_due_date(self, year, month):
         last_day = monthrange(year, month)[1]
@@ -197,19 +225,69 @@ class ReturnPeriodEntry(models.Model):
         self.submitted_at = submitted_at
         self.submitted_by = user
         self.delay_days = delay_days
-        self.save(update_fields=['status', 'submitted_at', 'submitted_by', 'delay_days', 'updated_at'])
-
-        ReturnStatusLog.objects.create(
-            entry=self,
-            action=ReturnStatusLog.ACTION_SUBMITTED,
-            performed_by=user,
-            metadata={
-                'submitted_at': submitted_at.isoformat(),
-                'delay_days': delay_days,
-            },
-        )
+        with transaction.atomic():
+            self.save(update_fields=['status', 'submitted_at', 'submitted_by', 'delay_days', 'updated_at'])
+
+            ReturnStatusLog.objects.create(
+                entry=self,
+                action=ReturnStatusLog.ACTION_SUBMITTED,
+                performed_by=user,
+                metadata={
+                    'submitted_at': submitted_at.isoformat(),
+                    'delay_days': delay_days,
+                },
+            )
+            ReturnComplianceRollup.record_submissions([self])
         return self
 
+    @classmethod
+    def mark_submitted_bulk(cls, entries, user):
+        """
+        Submit pending entries in one UPDATE (delay_days computed per row) plus one
+        bulk insert of status logs. Callers lock the rows first; entries that are
+        not pending are skipped. Returns the entries that were submitted.
+        """
+        entries = [entry for entry in entries if entry.status == cls.STATUS_PENDING]
+        if not entries:
+            return []
+
+        submitted_at = timezone.now()
+        for entry in entries:
+            entry.status = cls.STATUS_SUBMITTED
+            entry.submitted_at = submitted_at
+            entry.submitted_by = user
+            entry.delay_days = max((submitted_at.date() - entry.due_date).days, 0)
+            entry.updated_at = submitted_at
+
+        with transaction.atomic():
+            cls.objects.filter(id__in=[entry.id for entry in entries]).update(
+                status=cls.STATUS_SUBMITTED,
+                submitted_at=submitted_at,
+                submitted_by=user,
+                delay_days=Case(
+                    *[When(id=entry.id, then=Value(entry.delay_days)) for entry in entries],
+                    default=F('delay_days'),
+                    output_field=models.PositiveIntegerField(),
+                ),
+                updated_at=submitted_at,
+            )
+            ReturnStatusLog.objects.bulk_create(
+                [
+                    ReturnStatusLog(
+                        entry=entry,
+                        action=ReturnStatusLog.ACTION_SUBMITTED,
+                        performed_by=user,
+                        metadata={
+                            'submitted_at': submitted_at.isoformat(),
+                            'delay_days': entry.delay_days,
+                        },
+                    )
+                    for entry in entries
+                ]
+            )
+            ReturnComplianceRollup.record_submissions(entries)
+        return entries
+
 
 class ReturnStatusLog(models.Model):
     ACTION_SUBMITTED = 'submitted'
@@ -242,3 +320,197 @@ class ReturnStatusLog(models.Model):
     def __str__(self):
         return f'{self.entry} - {self.action}'
 
+
+class ReturnComplianceRollup(models.Model):
+    """
+    Per (section, year, month) counts of ReturnPeriodEntry, kept current by period
+    generation and submission so dashboards never count raw entries.
+    overdue is the number of pending entries due before overdue_as_of; readers
+    refresh it once the day moves on (see refresh_overdue).
+    Rebuild with `python manage.py rebuild_return_rollups`.
+    """
+    section = models.ForeignKey(
+        Section,
+        on_delete=models.CASCADE,
+        related_name='return_compliance_rollups',
+    )
+    year = models.PositiveIntegerField()
+    month = models.PositiveSmallIntegerField()
+    total = models.PositiveIntegerField(default=0)
+    submitted = models.PositiveIntegerField(default=0)
+    pending = models.PositiveIntegerField(default=0)
+    delayed = models.PositiveIntegerField(default=0)
+    sum_delay_days = models.PositiveIntegerField(default=0)
+    overdue = models.PositiveIntegerField(default=0)
+    overdue_as_of = models.DateField()
+
+    COUNT_FIELDS = ['total', 'submitted', 'pending', 'delayed', 'sum_delay_days', 'overdue', 'overdue_as_of']
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(
+                fields=['section', 'year', 'month'],
+                name='unique_return_compliance_rollup',
+            )
+        ]
+        indexes = [
+            models.Index(fields=['year', 'month']),
+        ]
+
+    def __str__(self):
+        return f'{self.section_id} - {self.month}/{self.year}'
+
+    @staticmethod
+    def _counts(entries, today):
+        pending = Q(status=ReturnPeriodEntry.STATUS_PENDING)
+        delayed = Q(delay_days__gt=0)
+        return entries.order_by().values('section_id', 'year', 'month').annotate(
+            total=Count('id'),
+            submitted=Count('id', filter=Q(status=ReturnPeriodEntry.STATUS_SUBMITTED)),
+            pending=Count('id', filter=pending),
+            delayed=Count('id', filter=delayed),
+            sum_delay_days=Coalesce(Sum('delay_days', filter=delayed), 0),
+            overdue=Count('id', filter=pending & Q(due_date__lt=today)),
+        )
+
+    @classmethod
+    def refresh(cls, keys=None, today=None):
+        """Recount the given (section_id, year, month) keys (all when None) from the entries."""
+        today = today or timezone.localdate()
+        entries = ReturnPeriodEntry.objects.all()
+        if keys is not None:
+            keys = set(keys)
+            if not keys:
+                return 0
+            entries = entries.filter(
+                section_id__in={section_id for section_id, _, _ in keys},
+                year__in={year for _, year, _ in keys},
+                month__in={month for _, _, month in keys},
+            )
+
+        rollups = []
+        for row in cls._counts(entries, today):
+            key = (row.pop('section_id'), row['year'], row['month'])
+            if keys is None or key in keys:
+                rollups.append(cls(section_id=key[0], overdue_as_of=today, **row))
+
+        with transaction.atomic():
+            if keys is not None:
+                empty_keys = keys - {(rollup.section_id, rollup.year, rollup.month) for rollup in rollups}
+                for section_id, year, month in empty_keys:
+                    cls.objects.filter(section_id=section_id, year=year, month=month).delete()
+            cls.objects.bulk_create(
+                rollups,
+                update_conflicts=True,
+                unique_fields=['section', 'year', 'month'],
+                update_fields=cls.COUNT_FIELDS,
+            )
+        return len(rollups)
+
+    @classmethod
+    def record_submissions(cls, entries):
+        """Move just-submitted entries from pending to submitted in their rollups, one UPDATE per period."""
+        by_key = {}
+        for entry in entries:
+            by_key.setdefault((entry.section_id, entry.year, entry.month), []).append(entry)
+
+        for key, group in by_key.items():
+            delay_values = [entry.delay_days for entry in group if entry.delay_days > 0]
+            due_date_counts = {}
+            for entry in group:
+                due_date_counts[entry.due_date] = due_date_counts.get(entry.due_date, 0) + 1
+            # An entry only counted as overdue if it was due before overdue_as_of.
+            no_longer_overdue = sum(
+                (
+                    Case(When(overdue_as_of__gt=due_date, then=Value(count)), default=Value(0))
+                    for due_date, count in due_date_counts.items()
+                ),
+                Value(0),
+            )
+            updated = cls.objects.filter(section_id=key[0], year=key[1], month=key[2]).update(
+                submitted=F('submitted') + len(group),
+                pending=F('pending') - len(group),
+                delayed=F('delayed') + len(delay_values),
+                sum_delay_days=F('sum_delay_days') + sum(delay_values),
+                overdue=F('overdue') - no_longer_overdue,
+            )
+            if not updated:
+                cls.refresh([key])
+
+    @classmethod
+    def refresh_overdue(cls, rollups, today=None):
+        """Bring overdue up to today for rows computed on an earlier day, in one grouped query."""
+        today = today or timezone.localdate()
+        stale = {
+            (rollup.section_id, rollup.year, rollup.month): rollup
+            for rollup in rollups
+            if rollup.overdue_as_of < today and rollup.pending > rollup.overdue
+        }
+        if not stale:
+            return rollups
+
+        overdue_counts = {
+            (row['section_id'], row['year'], row['month']): row['overdue']
+            for row in ReturnPeriodEntry.objects.filter(
+                section_id__in={section_id for section_id, _, _ in stale},
+                year__in={year for _, year, _ in stale},
+                month__in={month for _, _, month in stale},
+                status=ReturnPeriodEntry.STATUS_PENDING,
+                due_date__lt=today,
+            ).order_by().values('section_id', 'year', 'month').annotate(overdue=Count('id'))
+        }
+        for key, rollup in stale.items():
+            rollup.overdue = overdue_counts.get(key, 0)
+            rollup.overdue_as_of = today
+        cls.objects.bulk_update(stale.values(), ['overdue', 'overdue_as_of'])
+        return rollups
+
+
+class ReturnPeriodGeneration(models.Model):
+    """
+    Marks that ReturnPeriodEntry rows for (section, year, month) have been generated,
+    so read endpoints can skip generation with one lookup. Markers are dropped
+    whenever the section's applicability rules change.
+    """
+    section = models.ForeignKey(
+        Section,
+        on_delete=models.CASCADE,
+        related_name='return_period_generations',
+    )
+    year = models.PositiveIntegerField()
+    month = models.PositiveSmallIntegerField()
+    generated_at = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(
+                fields=['section', 'year', 'month'],
+                name='unique_return_period_generation',
+            )
+        ]
+        indexes = [
+            models.Index(fields=['year', 'month']),
+        ]
+
+    def __str__(self):
+        return f'{self.section_id} - {self.month}/{self.year}'
+
+
+@receiver(post_save, sender=ReturnApplicability)
+@receiver(post_delete, sender=ReturnApplicability)
+def reset_generation_on_applicability_change(sender, instance, **kwargs):
+    ReturnPeriodGeneration.objects.filter(section_id=instance.section_id).delete()
+
+
+@receiver(post_delete, sender=ReturnPeriodEntry)
+def refresh_rollup_on_entry_delete(sender, instance, **kwargs):
+    ReturnComplianceRollup.refresh([(instance.section_id, instance.year, instance.month)])
+
+
+@receiver(post_save, sender=ReturnDefinition)
+def reset_generation_on_definition_change(sender, instance, created, **kwargs):
+    if created:
+        return
+    ReturnPeriodGeneration.objects.filter(
+        section__return_applicabilities__return_definition=instance,
+    ).delete()
@@ -42,3 +42,10 @@ class ReturnPeriodEntrySerializer(serializers.ModelSerializer):
             submit_section_ids = get_user_submission_section_ids(request.user)
         return obj.status == ReturnPeriodEntry.STATUS_PENDING and obj.section_id in submit_section_ids
 
+
+class BulkSubmitSerializer(serializers.Serializer):
+    entry_ids = serializers.ListField(
+        child=serializers.IntegerField(min_value=1),
+        min_length=1,
+        max_length=500,
+    )
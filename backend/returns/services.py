@@ -2,11 +2,12 @@ from datetime import date
 
 from django.core.exceptions import PermissionDenied
 from django.db import transaction
+from django.db.models import Q, Sum
 from django.utils import timezone
 
 from sections.models import Section
 
-from .models import ReturnApplicability, ReturnPeriodEntry
+from .models import ReturnApplicability, ReturnComplianceRollup, ReturnPeriodEntry, ReturnPeriodGeneration
 
 
 def get_user_visible_sections(user):
@@ -96,60 +97,151 @@ def month_sequence(end_year, end_month, count):
     return values
 
 
+def section_status_counts(year, month, section_ids, today=None):
+    """
+    {section_id: {total_count, pending_count, submitted_count, overdue_count}} for one
+    period, read from ReturnComplianceRollup. Sections without entries are absent.
+    """
+    rollups = ReturnComplianceRollup.refresh_overdue(
+        list(ReturnComplianceRollup.objects.filter(section_id__in=section_ids, year=year, month=month)),
+        today,
+    )
+    return {
+        rollup.section_id: {
+            'total_count': rollup.total,
+            'pending_count': rollup.pending,
+            'submitted_count': rollup.submitted,
+            'overdue_count': rollup.overdue,
+        }
+        for rollup in rollups
+        if rollup.total
+    }
+
+
+def period_delay_counts(periods, section_ids):
+    """{(year, month): {total_count, submitted_count, pending_count, delayed_count, delay_days_total}} from the rollups."""
+    rows = (
+        ReturnComplianceRollup.objects.filter(period_filter(periods), section_id__in=section_ids)
+        .order_by()
+        .values('year', 'month')
+        .annotate(
+            total_count=Sum('total'),
+            submitted_count=Sum('submitted'),
+            pending_count=Sum('pending'),
+            delayed_count=Sum('delayed'),
+            delay_days_total=Sum('sum_delay_days'),
+        )
+    )
+    return {(row.pop('year'), row.pop('month')): row for row in rows}
+
+
+def sum_status_counts(counts_by_section):
+    summary = {'total_count': 0, 'pending_count': 0, 'submitted_count': 0, 'overdue_count': 0}
+    for counts in counts_by_section.values():
+        for key, value in counts.items():
+            summary[key] += value
+    return summary
+
+
+def months_from(start_year, start_month, count):
+    end_index = start_year * 12 + start_month - 1 + max(1, count) - 1
+    return month_sequence(end_index // 12, end_index % 12 + 1, count)
+
+
+def period_filter(periods):
+    """Q matching rows (entries, markers, rollups) in any of the given (year, month) periods."""
+    condition = Q(pk__in=[])
+    for year, month in periods:
+        condition |= Q(year=year, month=month)
+    return condition
+
+
 def ensure_period_entries(year, month, section_ids=None):
+    return ensure_period_entries_for_periods([(year, month)], section_ids)
+
+
+def ensure_period_entries_for_periods(periods, section_ids=None):
+    """
+    Create the missing entries for every (year, month) in periods with one
+    applicability load, one existing-key query and one bulk insert.
+    The affected ReturnComplianceRollup rows are recounted in the same transaction.
+    Section/periods already marked in ReturnPeriodGeneration are skipped, so
+    once generate_return_periods has run, reads cost a single marker lookup.
+    section_ids=None means every section.
+    """
+    periods = sorted(set(periods))
+    if section_ids is None:
+        section_ids = list(Section.objects.values_list('id', flat=True))
+    if not periods or not section_ids:
+        return 0
+
+    generated = set(
+        ReturnPeriodGeneration.objects.filter(
+            period_filter(periods),
+            section_id__in=section_ids,
+        ).values_list('section_id', 'year', 'month')
+    )
+    pending = {
+        (section_id, year, month)
+        for section_id in section_ids
+        for year, month in periods
+        if (section_id, year, month) not in generated
+    }
+    if not pending:
+        return 0
+
     applicabilities = ReturnApplicability.objects.select_related(
         'return_definition',
         'section',
     ).filter(
         active=True,
         return_definition__active=True,
-    )
-
-    if section_ids:
-        applicabilities = applicabilities.filter(section_id__in=section_ids)
+        section_id__in={section_id for section_id, _, _ in pending},
+    ).filter(ReturnApplicability.in_months({month for _, month in periods}))
 
     applicable_rows = [
-        applicability
+        (year, month, applicability)
         for applicability in applicabilities
-        if applicability.applies_to_month(month)
+        for year, month in periods
+        if (applicability.section_id, year, month) in pending and applicability.applies_to_month(month)
     ]
-    if not applicable_rows:
-        return 0
-
-    existing_keys = set(
-        ReturnPeriodEntry.objects.filter(
-            year=year,
-            month=month,
-            section_id__in=[row.section_id for row in applicable_rows],
-            return_definition_id__in=[row.return_definition_id for row in applicable_rows],
-        ).values_list('return_definition_id', 'section_id')
-    )
 
     missing_entries = []
-    for applicability in applicable_rows:
-        key = (applicability.return_definition_id, applicability.section_id)
-        if key in existing_keys:
-            continue
-        missing_entries.append(
-            ReturnPeriodEntry(
-                return_definition=applicability.return_definition,
-                applicability=applicability,
-                section=applicability.section,
-                year=year,
-                month=month,
-                report_code_snapshot=applicability.return_definition.code,
-                report_name_snapshot=applicability.return_definition.name,
-                frequency_snapshot=applicability.return_definition.frequency,
-                due_day_snapshot=applicability.due_day,
-                due_date=applicability.get_due_date(year, month),
-            )
+    if applicable_rows:
+        existing_keys = set(
+            ReturnPeriodEntry.objects.filter(
+                period_filter(periods),
+                section_id__in={row.section_id for _, _, row in applicable_rows},
+                return_definition_id__in={row.return_definition_id for _, _, row in applicable_rows},
+            ).values_list('year', 'month', 'return_definition_id', 'section_id')
         )
 
-    if not missing_entries:
-        return 0
+        for year, month, applicability in applicable_rows:
+            key = (year, month, applicability.return_definition_id, applicability.section_id)
+            if key in existing_keys:
+                continue
+            missing_entries.append(
+                ReturnPeriodEntry(
+                    return_definition=applicability.return_definition,
+                    applicability=applicability,
+                    section=applicability.section,
+                    year=year,
+                    month=month,
+                    report_code_snapshot=applicability.return_definition.code,
+                    report_name_snapshot=applicability.return_definition.name,
+                    frequency_snapshot=applicability.return_definition.frequency,
+                    due_day_snapshot=applicability.due_day,
+                    due_date=applicability.get_due_date(year, month),
+                )
+            )
 
+    markers = [
+        ReturnPeriodGeneration(section_id=section_id, year=year, month=month)
+        for section_id, year, month in pending
+    ]
     with transaction.atomic():
         ReturnPeriodEntry.objects.bulk_create(missing_entries, ignore_conflicts=True)
+        ReturnPeriodGeneration.objects.bulk_create(markers, ignore_conflicts=True)
+        ReturnComplianceRollup.refresh(pending)
 
     return len(missing_entries)
-
@@ -0,0 +1,13 @@
+from datetime import timedelta
+
+from django.utils import timezone
+
+from jobs.queue import task
+
+from .services import ensure_period_entries_for_periods, months_from
+
+
+@task('returns.generate_periods', every=timedelta(hours=6))
+def generate_periods(months=2):
+    today = timezone.localdate()
+    ensure_period_entries_for_periods(months_from(today.year, today.month, months))
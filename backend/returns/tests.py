@@ -1,8 +1,24 @@
+from datetime import date
+from io import BytesIO, StringIO
+
+from django.contrib import admin
+from django.core.management import call_command
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
 from django.urls import reverse
+from django.utils import timezone
 from rest_framework import status
 from rest_framework.test import APITestCase
 
-from returns.models import ReturnApplicability, ReturnDefinition, ReturnPeriodEntry
+from returns.admin import ReturnDefinitionAdmin
+from returns.models import (
+    ReturnApplicability,
+    ReturnComplianceRollup,
+    ReturnDefinition,
+    ReturnPeriodEntry,
+    ReturnPeriodGeneration,
+)
+from returns.services import ensure_period_entries
 from sections.models import Section, Subsection
 from users.models import User
 
@@ -136,3 +152,247 @@ class ReturnsAPITests(APITestCase):
             ['IR'],
         )
         self.assertTrue(all(entry['section_name'] == 'IR' for entry in response.data['entries']))
+
+    def test_ag_overview_query_count_does_not_grow_with_sections(self):
+        ag = User.objects.create_user(
+            username='ag1',
+            password='Password123',
+            email='ag1@office.gov',
+            full_name='AG One',
+            role='AG',
+        )
+        monthly = ReturnDefinition.objects.get(code='ITA')
+        self.client.force_authenticate(ag)
+        params = {'year': 2026, 'month': 3}
+
+        def list_queries():
+            self.client.get(reverse('return-entry-list'), params)
+            with CaptureQueriesContext(connection) as queries:
+                response = self.client.get(reverse('return-entry-list'), params)
+            self.assertEqual(response.status_code, status.HTTP_200_OK)
+            return len(queries), response.data
+
+        baseline, _ = list_queries()
+        for index in range(5):
+            section = Section.objects.create(name=f'Extra {index}')
+            ReturnApplicability.objects.create(
+                return_definition=monthly,
+                section=section,
+                due_day=5,
+                applicable_months=[],
+                active=True,
+            )
+        query_count, data = list_queries()
+
+        self.assertEqual(query_count, baseline)
+        self.assertEqual(len(data['section_overview']), 7)
+        self.assertEqual(data['summary']['total_count'], 8)
+        amg = next(item for item in data['section_overview'] if item['section_name'] == 'AMG-I')
+        self.assertEqual(amg['total_count'], 2)
+        self.assertEqual(amg['pending_count'] + amg['submitted_count'], 2)
+
+    def test_delay_summary_aggregates_window_in_constant_queries(self):
+        self.client.force_authenticate(self.dag)
+        url = reverse('return-entry-delay-summary')
+
+        with CaptureQueriesContext(connection) as short_window:
+            self.client.get(url, {'year': 2026, 'month': 3, 'months': 2})
+        with CaptureQueriesContext(connection) as long_window:
+            response = self.client.get(url, {'year': 2026, 'month': 3, 'months': 12})
+        self.assertEqual(len(long_window), len(short_window))
+
+        ReturnPeriodEntry.objects.filter(year=2026, month=3, report_code_snapshot='ITA').update(
+            status=ReturnPeriodEntry.STATUS_SUBMITTED,
+            delay_days=3,
+        )
+        ReturnPeriodEntry.objects.filter(year=2026, month=2, section=self.section).update(
+            status=ReturnPeriodEntry.STATUS_SUBMITTED,
+            delay_days=0,
+        )
+        # Direct queryset updates bypass the rollups.
+        call_command('rebuild_return_rollups', year=2026, stdout=StringIO())
+        response = self.client.get(url, {'year': 2026, 'month': 3, 'months': 3})
+
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        points = {(point['year'], point['month']): point for point in response.data['points']}
+        self.assertEqual(list(points), [(2026, 1), (2026, 2), (2026, 3)])
+        self.assertEqual(points[(2026, 1)]['total_count'], 2)
+        self.assertEqual(points[(2026, 2)]['submitted_count'], 1)
+        self.assertEqual(points[(2026, 3)]['total_count'], 3)
+        self.assertEqual(points[(2026, 3)]['pending_count'], 1)
+        self.assertEqual(points[(2026, 3)]['delayed_count'], 2)
+        self.assertEqual(points[(2026, 3)]['average_delay_days'], 3)
+        self.assertEqual(
+            response.data['summary'],
+            {'total_entries': 7, 'total_submitted': 3, 'total_delayed': 2, 'average_delay_days': 3},
+        )
+
+    def test_generate_command_marks_periods_so_reads_skip_generation(self):
+        call_command('generate_return_periods', year=2026, month=3, stdout=StringIO())
+
+        self.assertEqual(ReturnPeriodEntry.objects.filter(year=2026, month=3).count(), 3)
+        self.assertEqual(ReturnPeriodEntry.objects.filter(year=2026, month=4).count(), 3)
+        self.assertEqual(
+            ReturnPeriodGeneration.objects.filter(year=2026, month__in=[3, 4]).count(),
+            4,
+        )
+
+        self.client.force_authenticate(self.dag)
+        with CaptureQueriesContext(connection) as queries:
+            response = self.client.get(reverse('return-entry-list'), {'year': 2026, 'month': 3})
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertFalse(any('INSERT' in query['sql'] for query in queries))
+        self.assertFalse(any('"returns_returnapplicability"' in query['sql'] for query in queries))
+
+        new_definition = ReturnDefinition.objects.create(code='NEW', name='New Report', frequency='monthly')
+        ReturnApplicability.objects.create(
+            return_definition=new_definition,
+            section=self.other_section,
+            due_day=12,
+            applicable_months=[],
+        )
+        self.assertFalse(ReturnPeriodGeneration.objects.filter(section=self.other_section).exists())
+
+        response = self.client.get(reverse('return-entry-list'), {'year': 2026, 'month': 3})
+        codes = {entry['report_code_snapshot'] for entry in response.data['entries']}
+        self.assertIn('NEW', codes)
+
+    def test_month_mask_tracks_applicable_months_and_filters_in_sql(self):
+        quarterly = ReturnApplicability.objects.get(return_definition__code='IRQ')
+        self.assertEqual(quarterly.month_mask, 0b100100100100)
+
+        quarterly.applicable_months = '1, 4'
+        quarterly.save(update_fields=['applicable_months'])
+        quarterly.refresh_from_db()
+        self.assertEqual(quarterly.applicable_months, [1, 4])
+        self.assertEqual(quarterly.month_mask, 0b1001)
+
+        def codes_in(months):
+            return set(
+                ReturnApplicability.objects.filter(
+                    ReturnApplicability.in_months(months),
+                    section=self.section,
+                ).values_list('return_definition__code', flat=True)
+            )
+
+        self.assertEqual(codes_in([3]), {'ITA'})
+        self.assertEqual(codes_in([4]), {'ITA', 'IRQ', 'ANN'})
+        self.assertEqual(codes_in([2, 3]), {'ITA'})
+        self.assertEqual(codes_in([1, 12]), {'ITA', 'IRQ'})
+
+    def test_bulk_submit_reports_per_entry_outcomes(self):
+        call_command('generate_return_periods', year=2026, month=3, months=1, stdout=StringIO())
+        own_entries = list(ReturnPeriodEntry.objects.filter(section=self.section, year=2026, month=3))
+        other_entry = ReturnPeriodEntry.objects.get(section=self.other_section, year=2026, month=3)
+        own_entries[1].mark_submitted(self.aao)
+
+        self.client.force_authenticate(self.aao)
+        with CaptureQueriesContext(connection) as queries:
+            response = self.client.post(
+                reverse('return-entry-bulk-submit'),
+                {'entry_ids': [own_entries[0].id, own_entries[1].id, other_entry.id, 999999]},
+                format='json',
+            )
+
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(response.data['submitted_count'], 1)
+        self.assertEqual(response.data['failed_count'], 3)
+        self.assertEqual(
+            [result['outcome'] for result in response.data['results']],
+            ['submitted', 'already_submitted', 'forbidden', 'not_found'],
+        )
+        self.assertEqual(sum('UPDATE "returns_returnperiodentry"' in query['sql'] for query in queries), 1)
+
+        submitted = ReturnPeriodEntry.objects.get(id=own_entries[0].id)
+        self.assertEqual(submitted.status, ReturnPeriodEntry.STATUS_SUBMITTED)
+        self.assertEqual(submitted.submitted_by, self.aao)
+        self.assertEqual(
+            submitted.delay_days,
+            max((submitted.submitted_at.date() - submitted.due_date).days, 0),
+        )
+        self.assertEqual(submitted.status_logs.get().metadata['delay_days'], submitted.delay_days)
+        self.assertEqual(ReturnPeriodEntry.objects.get(id=other_entry.id).status, ReturnPeriodEntry.STATUS_PENDING)
+
+        self.client.force_authenticate(self.srao)
+        forbidden = self.client.post(
+            reverse('return-entry-bulk-submit'),
+            {'entry_ids': [other_entry.id]},
+            format='json',
+        )
+        self.assertEqual(forbidden.status_code, status.HTTP_403_FORBIDDEN)
+
+    def test_compliance_rollups_follow_generation_and_submission(self):
+        call_command('generate_return_periods', year=2026, month=3, months=1, stdout=StringIO())
+        rollup = ReturnComplianceRollup.objects.get(section=self.section, year=2026, month=3)
+        self.assertEqual((rollup.total, rollup.pending, rollup.submitted), (2, 2, 0))
+
+        first, second = ReturnPeriodEntry.objects.filter(section=self.section, year=2026, month=3)
+        first.mark_submitted(self.aao)
+        self.client.force_authenticate(self.aao)
+        self.client.post(reverse('return-entry-bulk-submit'), {'entry_ids': [second.id]}, format='json')
+
+        rollup.refresh_from_db()
+        first.refresh_from_db()
+        second.refresh_from_db()
+        self.assertEqual((rollup.total, rollup.pending, rollup.submitted), (2, 0, 2))
+        self.assertEqual(rollup.overdue, 0)
+        self.assertEqual(rollup.delayed, sum(1 for entry in (first, second) if entry.delay_days))
+        self.assertEqual(rollup.sum_delay_days, first.delay_days + second.delay_days)
+
+        # A rollup computed on an earlier day is brought up to date when read.
+        other = ReturnComplianceRollup.objects.get(section=self.other_section, year=2026, month=3)
+        ReturnComplianceRollup.objects.filter(id=other.id).update(overdue=0, overdue_as_of=date(2026, 1, 1))
+        self.client.force_authenticate(self.dag)
+        response = self.client.get(reverse('return-entry-list'), {'year': 2026, 'month': 3})
+        overview = {item['section_name']: item for item in response.data['section_overview']}
+        today = timezone.localdate()
+        expected_overdue = 1 if date(2026, 3, 10) < today else 0
+        self.assertEqual(overview['IR']['overdue_count'], expected_overdue)
+        self.assertEqual(response.data['summary']['submitted_count'], 2)
+
+        ReturnComplianceRollup.objects.all().delete()
+        call_command('rebuild_return_rollups', year=2026, stdout=StringIO())
+        rebuilt = ReturnComplianceRollup.objects.get(section=self.section, year=2026, month=3)
+        self.assertEqual((rebuilt.total, rebuilt.pending, rebuilt.submitted), (2, 0, 2))
+        self.assertEqual(rebuilt.sum_delay_days, rollup.sum_delay_days)
+
+        first.delete()
+        rebuilt.refresh_from_db()
+        self.assertEqual((rebuilt.total, rebuilt.pending, rebuilt.submitted), (1, 0, 1))
+        second.delete()
+        self.assertFalse(ReturnComplianceRollup.objects.filter(id=rebuilt.id).exists())
+
+    def test_csv_import_upserts_in_bulk_and_reports_diff(self):
+        ensure_period_entries(2026, 3, [self.section.id, self.other_section.id])
+        csv_content = (
+            'report_code,report_name,frequency,section_name,due_day,applicable_months,active\n'
+            'ITA,ITA Report,monthly,ALL,7,,true\n'
+            'IRQ,Quarterly IR Report,quarterly,AMG-I,12,"3,6,9,12",true\n'
+            'NEW,New Return,annual,IR,5,4,true\n'
+            'BAD,Bad Return,quarterly,IR,5,,true\n'
+            'GHOST,Ghost Return,monthly,Missing,5,,true\n'
+        )
+        admin_view = ReturnDefinitionAdmin(ReturnDefinition, admin.site)
+
+        with CaptureQueriesContext(connection) as queries:
+            results = admin_view._import_from_csv(BytesIO(csv_content.encode()))
+
+        self.assertLessEqual(len(queries), 10)
+        self.assertEqual(results['definitions_created'], 1)
+        self.assertEqual(results['definitions_updated'], 0)
+        self.assertEqual(results['definitions_unchanged'], 2)
+        self.assertEqual(results['applicabilities_created'], 1)
+        # ITA moves IR's due day from 10 to 7; IRQ moves from 15 to 12.
+        self.assertEqual(results['applicabilities_updated'], 2)
+        self.assertEqual(results['applicabilities_unchanged'], 1)
+        self.assertEqual(len(results['errors']), 2)
+        self.assertIn('Row 5 (BAD)', results['errors'][0])
+        self.assertIn('Row 6 (GHOST)', results['errors'][1])
+
+        irq = ReturnApplicability.objects.get(return_definition__code='IRQ', section=self.section)
+        self.assertEqual(irq.due_day, 12)
+        new = ReturnApplicability.objects.get(return_definition__code='NEW')
+        self.assertEqual((new.section, new.applicable_months, new.month_mask), (self.other_section, [4], 1 << 3))
+        self.assertFalse(ReturnDefinition.objects.filter(code__in=['BAD', 'GHOST']).exists())
+        # Changed mappings drop the generation markers so periods are regenerated.
+        self.assertFalse(ReturnPeriodGeneration.objects.exists())
@@ -1,20 +1,23 @@
 from django.core.exceptions import PermissionDenied, ValidationError as DjangoValidationError
-from django.db.models import Avg, Sum
-from django.utils import timezone
+from django.db import transaction
 from rest_framework.exceptions import ValidationError
 from rest_framework import permissions, status, viewsets
 from rest_framework.decorators import action
 from rest_framework.response import Response
 
 from .models import ReturnPeriodEntry
-from .serializers import ReturnPeriodEntrySerializer
+from .serializers import BulkSubmitSerializer, ReturnPeriodEntrySerializer
 from .services import (
     coerce_period,
     ensure_period_entries,
+    ensure_period_entries_for_periods,
     get_user_submission_section_ids,
     month_label,
     month_sequence,
+    period_delay_counts,
     resolve_section_filter,
+    section_status_counts,
+    sum_status_counts,
 )
 
 
@@ -37,11 +40,7 @@ class ReturnEntryViewSet(viewsets.ViewSet):
         except PermissionDenied as exc:
             raise ValidationError(str(exc))
 
-    def _base_queryset(self, request, year, month, selected_section=None):
-        visible_sections, _ = self._resolve_sections(request)
-        visible_section_ids = [section.id for section in visible_sections]
-        ensure_period_entries(year, month, visible_section_ids)
-
+    def _base_queryset(self, year, month, visible_section_ids, selected_section=None):
         queryset = ReturnPeriodEntry.objects.select_related(
             'section',
             'return_definition',
@@ -63,7 +62,7 @@ class ReturnEntryViewSet(viewsets.ViewSet):
         visible_section_ids = [section.id for section in visible_sections]
         ensure_period_entries(year, month, visible_section_ids)
 
-        scoped_queryset = self._base_queryset(request, year, month, selected_section=selected_section)
+        scoped_queryset = self._base_queryset(year, month, visible_section_ids, selected_section=selected_section)
         pending_queryset = scoped_queryset.filter(status=ReturnPeriodEntry.STATUS_PENDING).order_by(
             'due_date',
             'report_name_snapshot',
@@ -78,30 +77,20 @@ class ReturnEntryViewSet(viewsets.ViewSet):
             },
         )
 
+        scoped_sections = [selected_section] if selected_section else visible_sections
+        counts_by_section = section_status_counts(year, month, [section.id for section in scoped_sections])
+
         section_overview = []
         if request.user.role in {'AG', 'DAG'}:
-            overview_sections = [selected_section] if selected_section else visible_sections
-            section_queryset = ReturnPeriodEntry.objects.filter(
-                section_id__in=[section.id for section in overview_sections],
-                year=year,
-                month=month,
-            )
-            for section in overview_sections:
-                section_rows = section_queryset.filter(section=section)
-                total_count = section_rows.count()
-                if total_count == 0:
+            for section in scoped_sections:
+                counts = counts_by_section.get(section.id)
+                if not counts:
                     continue
                 section_overview.append(
                     {
                         'section': section.id,
                         'section_name': section.name,
-                        'total_count': total_count,
-                        'pending_count': section_rows.filter(status=ReturnPeriodEntry.STATUS_PENDING).count(),
-                        'submitted_count': section_rows.filter(status=ReturnPeriodEntry.STATUS_SUBMITTED).count(),
-                        'overdue_count': section_rows.filter(
-                            status=ReturnPeriodEntry.STATUS_PENDING,
-                            due_date__lt=timezone.localdate(),
-                        ).count(),
+                        **counts,
                     }
                 )
 
@@ -111,15 +100,7 @@ class ReturnEntryViewSet(viewsets.ViewSet):
                 'month': month,
                 'month_label': month_label(year, month),
                 'entries': serializer.data,
-                'summary': {
-                    'total_count': scoped_queryset.count(),
-                    'pending_count': pending_queryset.count(),
-                    'submitted_count': scoped_queryset.filter(status=ReturnPeriodEntry.STATUS_SUBMITTED).count(),
-                    'overdue_count': scoped_queryset.filter(
-                        status=ReturnPeriodEntry.STATUS_PENDING,
-                        due_date__lt=timezone.localdate(),
-                    ).count(),
-                },
+                'summary': sum_status_counts(counts_by_section),
                 'available_sections': [{'id': section.id, 'name': section.name} for section in visible_sections],
                 'selected_section': (
                     {'id': selected_section.id, 'name': selected_section.name}
@@ -139,7 +120,7 @@ class ReturnEntryViewSet(viewsets.ViewSet):
         visible_section_ids = [section.id for section in visible_sections]
         ensure_period_entries(year, month, visible_section_ids)
 
-        queryset = self._base_queryset(request, year, month, selected_section=selected_section).order_by(
+        queryset = self._base_queryset(year, month, visible_section_ids, selected_section=selected_section).order_by(
             'due_date',
             'report_name_snapshot',
         )
@@ -151,6 +132,8 @@ class ReturnEntryViewSet(viewsets.ViewSet):
                 'submit_section_ids': get_user_submission_section_ids(request.user),
             },
         )
+        scoped_section_ids = [selected_section.id] if selected_section else visible_section_ids
+        summary = sum_status_counts(section_status_counts(year, month, scoped_section_ids))
 
         return Response(
             {
@@ -159,9 +142,9 @@ class ReturnEntryViewSet(viewsets.ViewSet):
                 'month_label': month_label(year, month),
                 'entries': serializer.data,
                 'summary': {
-                    'total_count': queryset.count(),
-                    'pending_count': queryset.filter(status=ReturnPeriodEntry.STATUS_PENDING).count(),
-                    'submitted_count': queryset.filter(status=ReturnPeriodEntry.STATUS_SUBMITTED).count(),
+                    'total_count': summary['total_count'],
+                    'pending_count': summary['pending_count'],
+                    'submitted_count': summary['submitted_count'],
                 },
                 'available_sections': [{'id': section.id, 'name': section.name} for section in visible_sections],
                 'selected_section': (
@@ -186,43 +169,38 @@ class ReturnEntryViewSet(viewsets.ViewSet):
         visible_section_ids = [section.id for section in visible_sections]
         target_section_ids = [selected_section.id] if selected_section else visible_section_ids
 
+        periods = month_sequence(year, month, months_requested)
+        ensure_period_entries_for_periods(periods, target_section_ids)
+        counts_by_period = period_delay_counts(periods, target_section_ids)
+
         points = []
         total_entries = 0
         total_submitted = 0
         total_delayed = 0
         total_delay_days = 0
-        total_delayed_entries = 0
-
-        for period_year, period_month in month_sequence(year, month, months_requested):
-            ensure_period_entries(period_year, period_month, target_section_ids)
-            queryset = ReturnPeriodEntry.objects.filter(
-                section_id__in=target_section_ids,
-                year=period_year,
-                month=period_month,
-            )
 
-            average_delay = queryset.filter(delay_days__gt=0).aggregate(value=Avg('delay_days'))['value'] or 0
-            delayed_count = queryset.filter(delay_days__gt=0).count()
-            delay_days_total = queryset.filter(delay_days__gt=0).aggregate(value=Sum('delay_days'))['value'] or 0
+        for period_year, period_month in periods:
+            counts = counts_by_period.get((period_year, period_month), {})
+            delayed_count = counts.get('delayed_count', 0)
+            delay_days_total = counts.get('delay_days_total') or 0
 
             points.append(
                 {
                     'year': period_year,
                     'month': period_month,
                     'label': month_label(period_year, period_month),
-                    'total_count': queryset.count(),
-                    'submitted_count': queryset.filter(status=ReturnPeriodEntry.STATUS_SUBMITTED).count(),
-                    'pending_count': queryset.filter(status=ReturnPeriodEntry.STATUS_PENDING).count(),
+                    'total_count': counts.get('total_count', 0),
+                    'submitted_count': counts.get('submitted_count', 0),
+                    'pending_count': counts.get('pending_count', 0),
                     'delayed_count': delayed_count,
-                    'average_delay_days': round(average_delay, 2),
+                    'average_delay_days': round(delay_days_total / delayed_count, 2) if delayed_count else 0,
                 }
             )
 
-            total_entries += queryset.count()
-            total_submitted += queryset.filter(status=ReturnPeriodEntry.STATUS_SUBMITTED).count()
+            total_entries += counts.get('total_count', 0)
+            total_submitted += counts.get('submitted_count', 0)
             total_delayed += delayed_count
             total_delay_days += delay_days_total
-            total_delayed_entries += delayed_count
 
         return Response(
             {
@@ -242,7 +220,7 @@ class ReturnEntryViewSet(viewsets.ViewSet):
                     'total_entries': total_entries,
                     'total_submitted': total_submitted,
                     'total_delayed': total_delayed,
-                    'average_delay_days': round(total_delay_days / total_delayed_entries, 2) if total_delayed_entries else 0,
+                    'average_delay_days': round(total_delay_days / total_delayed, 2) if total_delayed else 0,
                 },
             },
             status=status.HTTP_200_OK,
@@ -276,3 +254,61 @@ class ReturnEntryViewSet(viewsets.ViewSet):
             context={'request': request, 'submit_section_ids': submit_section_ids},
         )
         return Response(serializer.data, status=status.HTTP_200_OK)
+
+    @action(detail=False, methods=['post'], url_path='bulk-submit')
+    def bulk_submit(self, request):
+        serializer = BulkSubmitSerializer(data=request.data)
+        serializer.is_valid(raise_exception=True)
+        entry_ids = list(dict.fromkeys(serializer.validated_data['entry_ids']))
+
+        submit_section_ids = get_user_submission_section_ids(request.user)
+        if not submit_section_ids:
+            return Response(
+                {'error': 'Only AAO and auditor users in the target section can mark a return as submitted.'},
+                status=status.HTTP_403_FORBIDDEN,
+            )
+
+        with transaction.atomic():
+            entries = {
+                entry.id: entry
+                for entry in ReturnPeriodEntry.objects.select_for_update(of=('self',))
+                .select_related('section', 'return_definition')
+                .filter(id__in=entry_ids)
+            }
+            submittable = [
+                entry for entry in entries.values()
+                if entry.section_id in submit_section_ids and entry.status == ReturnPeriodEntry.STATUS_PENDING
+            ]
+            submitted_ids = {entry.id for entry in ReturnPeriodEntry.mark_submitted_bulk(submittable, request.user)}
+
+        entry_context = {'request': request, 'submit_section_ids': submit_section_ids}
+        results = []
+        for entry_id in entry_ids:
+            entry = entries.get(entry_id)
+            if entry is None:
+                results.append({'id': entry_id, 'outcome': 'not_found', 'error': 'Return entry not found.'})
+            elif entry.section_id not in submit_section_ids:
+                results.append(
+                    {'id': entry_id, 'outcome': 'forbidden', 'error': 'You do not have access to this return entry.'}
+                )
+            elif entry_id not in submitted_ids:
+                results.append(
+                    {'id': entry_id, 'outcome': 'already_submitted', 'error': 'This return has already been submitted.'}
+                )
+            else:
+                results.append(
+                    {
+                        'id': entry_id,
+                        'outcome': 'submitted',
+                        'entry': ReturnPeriodEntrySerializer(entry, context=entry_context).data,
+                    }
+                )
+
+        return Response(
+            {
+                'submitted_count': len(submitted_ids),
+                'failed_count': len(entry_ids) - len(submitted_ids),
+                'results': results,
+            },
+            status=status.HTTP_200_OK,
+        )
@@ -5,6 +5,7 @@ from django.contrib import admin, messages
 from django.shortcuts import render, redirect
 from django.urls import path
 from django import forms
+from .importer import import_rows
 from .models import Section, Subsection
 
 
@@ -14,6 +15,11 @@ class ImportSectionsForm(forms.Form):
         label='Select file',
         help_text='CSV or JSON file with section and subsection data'
     )
+    dry_run = forms.BooleanField(
+        required=False,
+        label='Dry run',
+        help_text='Only report what would be created; nothing is saved.'
+    )
 
     def clean_file(self):
         file = self.cleaned_data['file']
@@ -53,13 +59,17 @@ class SectionAdmin(admin.ModelAdmin):
                 file = form.cleaned_data['file']
                 ext = file.name.split('.')[-1].lower()
 
+                dry_run = form.cleaned_data['dry_run']
+
                 try:
                     if ext == 'csv':
-                        results = self._import_from_csv(file)
+                        results = self._import_from_csv(file, dry_run=dry_run)
                     else:
-                        results = self._import_from_json(file)
+                        results = self._import_from_json(file, dry_run=dry_run)
 
                     # Show results
+                    if dry_run:
+                        messages.info(request, 'Dry run: nothing was saved. The import would make these changes:')
                     if results['created_sections']:
                         messages.success(
                             request,
@@ -94,7 +104,7 @@ class SectionAdmin(admin.ModelAdmin):
         }
         return render(request, 'admin/sections/section/import_sections.html', context)
 
-    def _import_from_csv(self, file):
+    def _import_from_csv(self, file, dry_run=False):
         """Import sections and subsections from CSV file
 
         CSV Format:
@@ -105,8 +115,6 @@ class SectionAdmin(admin.ModelAdmin):
         Admin,,,Admin-2,Second admin subsection
         Finance,Finance department,false,Finance-A,Finance subsection A
         """
-        results = {'created_sections': [], 'created_subsections': 0, 'errors': [], 'skipped': []}
-
         # Read CSV file
         text_file = TextIOWrapper(file, encoding='utf-8')
         reader = csv.DictReader(text_file)
@@ -120,65 +128,25 @@ class SectionAdmin(admin.ModelAdmin):
         if missing:
             raise ValueError(f'Missing required columns: {", ".join(missing)}')
 
-        section_cache = {}  # Cache to avoid duplicate section creation
-
+        rows = []
+        errors = []
         for row_num, row in enumerate(reader, start=2):
-            section_name = row.get('section_name', '').strip()
-            description = row.get('description', '').strip()
-            directly_under_ag_str = row.get('directly_under_ag', 'false').strip().lower()
-            subsection_name = row.get('subsection_name', '').strip()
-            subsection_description = row.get('subsection_description', '').strip()
-
+            section_name = (row.get('section_name') or '').strip()
             if not section_name:
-                results['errors'].append(f'Row {row_num}: section_name is required')
+                errors.append(f'Row {row_num}: section_name is required')
                 continue
-
-            # Parse boolean
-            directly_under_ag = directly_under_ag_str in ['true', '1', 'yes', 't']
-
-            # Create or get section
-            section = None
-            if section_name in section_cache:
-                section = section_cache[section_name]
-            elif Section.objects.filter(name=section_name).exists():
-                section = Section.objects.get(name=section_name)
-                section_cache[section_name] = section
-                if section_name not in results['skipped']:
-                    results['skipped'].append(section_name)
-            else:
-                try:
-                    section = Section.objects.create(
-                        name=section_name,
-                        description=description or '',
-                        directly_under_ag=directly_under_ag
-                    )
-                    section_cache[section_name] = section
-                    results['created_sections'].append(section_name)
-                except Exception as e:
-                    results['errors'].append(f'Row {row_num}: Failed to create section "{section_name}": {str(e)}')
-                    continue
-
-            # Create subsection if specified
-            if subsection_name and section:
-                if Subsection.objects.filter(section=section, name=subsection_name).exists():
-                    # Skip existing subsection
-                    pass
-                else:
-                    try:
-                        Subsection.objects.create(
-                            section=section,
-                            name=subsection_name,
-                            description=subsection_description or ''
-                        )
-                        results['created_subsections'] += 1
-                    except Exception as e:
-                        results['errors'].append(
-                            f'Row {row_num}: Failed to create subsection "{subsection_name}" for section "{section_name}": {str(e)}'
-                        )
-
-        return results
-
-    def _import_from_json(self, file):
+            rows.append({
+                'section_name': section_name,
+                'description': (row.get('description') or '').strip(),
+                'directly_under_ag': (row.get('directly_under_ag') or 'false').strip(),
+                'subsection_name': (row.get('subsection_name') or '').strip(),
+                'subsection_description': (row.get('subsection_description') or '').strip(),
+                'label': f'Row {row_num}',
+            })
+
+        return self._apply_import(rows, errors, dry_run)
+
+    def _import_from_json(self, file, dry_run=False):
         """Import sections and subsections from JSON file
 
         JSON Format:
@@ -202,8 +170,6 @@ class SectionAdmin(admin.ModelAdmin):
             }
         ]
         """
-        results = {'created_sections': [], 'created_subsections': 0, 'errors': [], 'skipped': []}
-
         # Read JSON file
         content = file.read().decode('utf-8')
         data = json.loads(content)
@@ -211,62 +177,50 @@ class SectionAdmin(admin.ModelAdmin):
         if not isinstance(data, list):
             raise ValueError('JSON must be an array of section objects')
 
+        rows = []
+        errors = []
         for idx, section_data in enumerate(data, start=1):
             section_name = section_data.get('name', '').strip()
-            description = section_data.get('description', '').strip()
-            directly_under_ag = section_data.get('directly_under_ag', False)
             subsections_data = section_data.get('subsections', [])
 
             if not section_name:
-                results['errors'].append(f'Item {idx}: "name" is required')
+                errors.append(f'Item {idx}: "name" is required')
                 continue
 
-            # Create or get section
-            section = None
-            if Section.objects.filter(name=section_name).exists():
-                section = Section.objects.get(name=section_name)
-                results['skipped'].append(section_name)
-            else:
-                try:
-                    section = Section.objects.create(
-                        name=section_name,
-                        description=description or '',
-                        directly_under_ag=directly_under_ag
-                    )
-                    results['created_sections'].append(section_name)
-                except Exception as e:
-                    results['errors'].append(f'Item {idx}: Failed to create section "{section_name}": {str(e)}')
-                    continue
-
-            # Create subsections
-            if section and isinstance(subsections_data, list):
-                for sub_idx, subsection_data in enumerate(subsections_data, start=1):
-                    subsection_name = subsection_data.get('name', '').strip()
-                    subsection_description = subsection_data.get('description', '').strip()
-
-                    if not subsection_name:
-                        results['errors'].append(
-                            f'Item {idx}, Subsection {sub_idx}: "name" is required'
-                        )
-                        continue
-
-                    if Subsection.objects.filter(section=section, name=subsection_name).exists():
-                        # Skip existing subsection
-                        continue
-
-                    try:
-                        Subsection.objects.create(
-                            section=section,
-                            name=subsection_name,
-                            description=subsection_description or ''
-                        )
-                        results['created_subsections'] += 1
-                    except Exception as e:
-                        results['errors'].append(
-                            f'Item {idx}, Subsection {sub_idx}: Failed to create "{subsection_name}": {str(e)}'
-                        )
+            section_row = {
+                'section_name': section_name,
+                'description': section_data.get('description', '').strip(),
+                'directly_under_ag': section_data.get('directly_under_ag', False),
+                'label': f'Item {idx}',
+            }
+            rows.append(section_row)
 
-        return results
+            if not isinstance(subsections_data, list):
+                continue
+            for sub_idx, subsection_data in enumerate(subsections_data, start=1):
+                subsection_name = subsection_data.get('name', '').strip()
+                if not subsection_name:
+                    errors.append(f'Item {idx}, Subsection {sub_idx}: "name" is required')
+                    continue
+                rows.append({
+                    **section_row,
+                    'subsection_name': subsection_name,
+                    'subsection_description': subsection_data.get('description', '').strip(),
+                    'label': f'Item {idx}, Subsection {sub_idx}',
+                })
+
+        return self._apply_import(rows, errors, dry_run)
+
+    def _apply_import(self, rows, errors, dry_run):
+        """Write rows with one set-based import; existing sections are never changed from the admin."""
+        plan = import_rows(rows, update_existing=False, dry_run=dry_run)
+        return {
+            'created_sections': [section.name for section in plan['create_sections']],
+            'created_subsections': len(plan['create_subsections']),
+            'errors': errors + plan['errors'],
+            'skipped': [section.name for section in plan['unchanged_sections']],
+            'plan': plan,
+        }
 
 
 @admin.register(Subsection)
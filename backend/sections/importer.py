@@ -0,0 +1,131 @@
+"""
+Set-based section/subsection import shared by the admin upload and the
+import_sections_file command.
+
+Rows are normalized dicts (section_name, description, directly_under_ag,
+subsection_name, subsection_description, label). plan_import() loads the
+existing sections and subsections once and works out the diff in memory;
+apply_import() writes it with bulk_create/bulk_update in one transaction.
+"""
+from django.db import transaction
+from django.db.models.signals import post_save
+
+from .models import Section, Subsection
+
+
+NAME_MAX_LENGTH = Section._meta.get_field('name').max_length
+
+
+def to_bool(value):
+    if isinstance(value, bool):
+        return value
+    return str(value).strip().lower() in {'1', 'true', 'yes', 'y', 'on', 't'}
+
+
+def empty_plan():
+    return {
+        'create_sections': [],
+        'update_sections': [],
+        'unchanged_sections': [],
+        'create_subsections': [],
+        'update_subsections': [],
+        'unchanged_subsections': [],
+        'errors': [],
+    }
+
+
+def plan_import(rows, update_existing=False):
+    """
+    Diff rows against the database without writing. The first row naming a
+    section supplies its description/directly_under_ag. Existing rows only
+    change when update_existing is set.
+    """
+    plan = empty_plan()
+    sections = {section.name: section for section in Section.objects.all()}
+    subsections = {
+        (subsection.section.name, subsection.name): subsection
+        for subsection in Subsection.objects.select_related('section')
+    }
+    seen_sections = set()
+    seen_subsections = set()
+
+    for row in rows:
+        label = row.get('label', '')
+        section_name = row['section_name']
+        subsection_name = row.get('subsection_name', '')
+        if len(section_name) > NAME_MAX_LENGTH or len(subsection_name) > NAME_MAX_LENGTH:
+            plan['errors'].append(f'{label}: names must be at most {NAME_MAX_LENGTH} characters.')
+            continue
+
+        if section_name not in seen_sections:
+            seen_sections.add(section_name)
+            description = row.get('description', '')
+            directly_under_ag = to_bool(row.get('directly_under_ag', False))
+            section = sections.get(section_name)
+            if section is None:
+                section = Section(name=section_name, description=description, directly_under_ag=directly_under_ag)
+                sections[section_name] = section
+                plan['create_sections'].append(section)
+            elif update_existing and (
+                (section.description or '') != description or section.directly_under_ag != directly_under_ag
+            ):
+                section.description = description
+                section.directly_under_ag = directly_under_ag
+                plan['update_sections'].append(section)
+            else:
+                plan['unchanged_sections'].append(section)
+
+        if not subsection_name or (section_name, subsection_name) in seen_subsections:
+            continue
+        seen_subsections.add((section_name, subsection_name))
+        subsection_description = row.get('subsection_description', '')
+        subsection = subsections.get((section_name, subsection_name))
+        if subsection is None:
+            plan['create_subsections'].append(
+                Subsection(section=sections[section_name], name=subsection_name, description=subsection_description)
+            )
+        elif update_existing and (subsection.description or '') != subsection_description:
+            subsection.description = subsection_description
+            plan['update_subsections'].append(subsection)
+        else:
+            plan['unchanged_subsections'].append(subsection)
+
+    return plan
+
+
+def apply_import(plan):
+    with transaction.atomic():
+        Section.objects.bulk_create(plan['create_sections'], batch_size=500)
+        # Re-read the new ids: not every backend returns them from a bulk insert.
+        # Subsection.bulk_create below takes section_id from these parents.
+        new_ids = dict(
+            Section.objects.filter(
+                name__in=[section.name for section in plan['create_sections']]
+            ).values_list('name', 'id')
+        )
+        for section in plan['create_sections']:
+            section.id = new_ids[section.name]
+
+        Section.objects.bulk_update(plan['update_sections'], ['description', 'directly_under_ag'], batch_size=500)
+        Subsection.objects.bulk_create(plan['create_subsections'], batch_size=500)
+        Subsection.objects.bulk_update(plan['update_subsections'], ['description'], batch_size=500)
+
+        # Bulk writes skip signals; re-announce changed rows so listeners
+        # (e.g. the user scope_version bump) still see them.
+        for section in plan['update_sections']:
+            post_save.send(sender=Section, instance=section, created=False, update_fields=None, raw=False, using='default')
+        for subsection in plan['update_subsections']:
+            post_save.send(sender=Subsection, instance=subsection, created=False, update_fields=None, raw=False, using='default')
+    return plan
+
+
+def import_rows(rows, update_existing=False, dry_run=False):
+    plan = plan_import(rows, update_existing=update_existing)
+    if not dry_run:
+        apply_import(plan)
+    return plan
+
+
+def summarize(plan):
+    """Counts per change type, for messages and command output."""
+    return {key: len(value) for key, value in plan.items()}
@@ -3,9 +3,8 @@ import csv
 import json
 
 from django.core.management.base import BaseCommand, CommandError
-from django.db import transaction
 
-from sections.models import Section, Subsection
+from sections.importer import import_rows, summarize
 
 
 class Command(BaseCommand):
@@ -18,10 +17,16 @@ class Command(BaseCommand):
             action="store_true",
             help="Update matching sections/subsections instead of skipping them.",
         )
+        parser.add_argument(
+            "--dry-run",
+            action="store_true",
+            help="Report the planned changes without writing them.",
+        )
 
     def handle(self, *args, **options):
         file_path = Path(options["file_path"]).expanduser().resolve()
         update_existing = options["update_existing"]
+        dry_run = options["dry_run"]
 
         if not file_path.exists():
             raise CommandError(f"File not found: {file_path}")
@@ -34,26 +39,42 @@ class Command(BaseCommand):
 
         try:
             if suffix == ".csv":
-                results = self._import_csv(file_path, update_existing)
+                rows, errors = self._read_csv(file_path)
             else:
-                results = self._import_json(file_path, update_existing)
+                rows, errors = self._read_json(file_path)
+            plan = import_rows(rows, update_existing=update_existing, dry_run=dry_run)
+        except CommandError:
+            raise
         except Exception as exc:
             raise CommandError(f"Section import failed: {exc}") from exc
 
-        self.stdout.write(self.style.SUCCESS(f"Created sections: {results['created_sections']}"))
-        self.stdout.write(self.style.SUCCESS(f"Updated sections: {results['updated_sections']}"))
-        self.stdout.write(self.style.SUCCESS(f"Created subsections: {results['created_subsections']}"))
-        self.stdout.write(self.style.SUCCESS(f"Updated subsections: {results['updated_subsections']}"))
-        self.stdout.write(self.style.WARNING(f"Skipped entries: {results['skipped']}"))
-
-        errors = results["errors"]
+        counts = summarize(plan)
+        if dry_run:
+            self.stdout.write(self.style.WARNING("Dry run: planned changes below were not written."))
+        self.stdout.write(self.style.SUCCESS(f"Created sections: {counts['create_sections']}"))
+        for section in plan["create_sections"]:
+            self.stdout.write(f"  + {section.name}")
+        self.stdout.write(self.style.SUCCESS(f"Updated sections: {counts['update_sections']}"))
+        for section in plan["update_sections"]:
+            self.stdout.write(f"  ~ {section.name}")
+        self.stdout.write(self.style.SUCCESS(f"Created subsections: {counts['create_subsections']}"))
+        for subsection in plan["create_subsections"]:
+            self.stdout.write(f"  + {subsection.section.name} / {subsection.name}")
+        self.stdout.write(self.style.SUCCESS(f"Updated subsections: {counts['update_subsections']}"))
+        for subsection in plan["update_subsections"]:
+            self.stdout.write(f"  ~ {subsection.section.name} / {subsection.name}")
+        self.stdout.write(self.style.WARNING(
+            f"Skipped entries: {counts['unchanged_sections'] + counts['unchanged_subsections']}"
+        ))
+
+        errors = errors + plan["errors"]
         if errors:
             self.stdout.write(self.style.ERROR(f"Errors: {len(errors)}"))
             for error in errors:
                 self.stdout.write(self.style.ERROR(f"  - {error}"))
             raise CommandError("Section import completed with errors.")
 
-    def _import_csv(self, file_path, update_existing):
+    def _read_csv(self, file_path):
         with file_path.open("r", encoding="utf-8-sig", newline="") as handle:
             reader = csv.DictReader(handle)
             if not reader.fieldnames:
@@ -64,117 +85,44 @@ class Command(BaseCommand):
                 raise CommandError("Missing required column: section_name")
 
             rows = []
-            for row in reader:
+            errors = []
+            for index, row in enumerate(reader, start=1):
                 normalized = {}
                 for key, value in (row or {}).items():
                     normalized[str(key or "").strip().lower()] = "" if value is None else str(value).strip()
+                if not normalized.get("section_name"):
+                    errors.append(f"Row {index}: section_name is required.")
+                    continue
+                normalized["label"] = f"Row {index}"
                 rows.append(normalized)
-        return self._import_rows(rows, update_existing)
+        return rows, errors
 
-    def _import_json(self, file_path, update_existing):
+    def _read_json(self, file_path):
         with file_path.open("r", encoding="utf-8") as handle:
             data = json.load(handle)
         if not isinstance(data, list):
             raise CommandError("JSON must be an array of sections.")
 
         rows = []
-        for item in data:
+        errors = []
+        for index, item in enumerate(data, start=1):
             section_name = str(item.get("name", "")).strip()
-            description = str(item.get("description", "")).strip()
-            directly_under_ag = bool(item.get("directly_under_ag", False))
-            rows.append(
-                {
-                    "section_name": section_name,
-                    "description": description,
-                    "directly_under_ag": directly_under_ag,
-                    "subsection_name": "",
-                    "subsection_description": "",
-                }
-            )
+            if not section_name:
+                errors.append(f"Row {index}: section_name is required.")
+                continue
+            section_row = {
+                "section_name": section_name,
+                "description": str(item.get("description", "")).strip(),
+                "directly_under_ag": item.get("directly_under_ag", False),
+                "label": f"Row {index}",
+            }
+            rows.append(section_row)
             for subsection in item.get("subsections", []) or []:
                 rows.append(
                     {
-                        "section_name": section_name,
-                        "description": description,
-                        "directly_under_ag": directly_under_ag,
+                        **section_row,
                         "subsection_name": str(subsection.get("name", "")).strip(),
                         "subsection_description": str(subsection.get("description", "")).strip(),
                     }
                 )
-        return self._import_rows(rows, update_existing)
-
-    def _import_rows(self, rows, update_existing):
-        results = {
-            "created_sections": 0,
-            "updated_sections": 0,
-            "created_subsections": 0,
-            "updated_subsections": 0,
-            "skipped": 0,
-            "errors": [],
-        }
-
-        with transaction.atomic():
-            for index, row in enumerate(rows, start=1):
-                section_name = str(row.get("section_name", "")).strip()
-                description = str(row.get("description", "")).strip()
-                directly_under_ag_value = row.get("directly_under_ag", False)
-                subsection_name = str(row.get("subsection_name", "")).strip()
-                subsection_description = str(row.get("subsection_description", "")).strip()
-
-                if not section_name:
-                    results["errors"].append(f"Row {index}: section_name is required.")
-                    continue
-
-                directly_under_ag = self._to_bool(directly_under_ag_value)
-
-                section, section_created = Section.objects.get_or_create(
-                    name=section_name,
-                    defaults={
-                        "description": description,
-                        "directly_under_ag": directly_under_ag,
-                    },
-                )
-                if section_created:
-                    results["created_sections"] += 1
-                elif update_existing:
-                    changed = False
-                    if section.description != description:
-                        section.description = description
-                        changed = True
-                    if section.directly_under_ag != directly_under_ag:
-                        section.directly_under_ag = directly_under_ag
-                        changed = True
-                    if changed:
-                        section.save(update_fields=["description", "directly_under_ag"])
-                        results["updated_sections"] += 1
-                    else:
-                        results["skipped"] += 1
-                else:
-                    results["skipped"] += 1
-
-                if not subsection_name:
-                    continue
-
-                subsection, subsection_created = Subsection.objects.get_or_create(
-                    section=section,
-                    name=subsection_name,
-                    defaults={"description": subsection_description},
-                )
-                if subsection_created:
-                    results["created_subsections"] += 1
-                elif update_existing:
-                    if subsection.description != subsection_description:
-                        subsection.description = subsection_description
-                        subsection.save(update_fields=["description"])
-                        results["updated_subsections"] += 1
-                    else:
-                        results["skipped"] += 1
-                else:
-                    results["skipped"] += 1
-
-        return results
-
-    def _to_bool(self, value):
-        if isinstance(value, bool):
-            return value
-        return str(value).strip().lower() in {"1", "true", "yes", "y", "on", "t"}
+        return rows, errors
@@ -0,0 +1,59 @@
+import json
+import tempfile
+from io import StringIO
+from pathlib import Path
+
+from django.core.management import call_command
+from django.test import TestCase
+
+from .models import Section, Subsection
+
+
+class ImportSectionsFileTests(TestCase):
+    def _write(self, directory, name, content):
+        path = Path(directory) / name
+        path.write_text(content, encoding='utf-8')
+        return str(path)
+
+    def test_dry_run_writes_nothing_and_import_upserts_in_bulk(self):
+        existing = Section.objects.create(name='Admin', description='Old', directly_under_ag=False)
+        Subsection.objects.create(section=existing, name='Admin-1', description='Old sub')
+        rows = [
+            {
+                'name': 'Admin',
+                'description': 'Administrative section',
+                'directly_under_ag': True,
+                'subsections': [
+                    {'name': 'Admin-1', 'description': 'First admin subsection'},
+                    {'name': 'Admin-2', 'description': 'Second admin subsection'},
+                ],
+            },
+            {
+                'name': 'Finance',
+                'subsections': [{'name': 'Finance-A'}, {'name': ''}],
+            },
+        ]
+
+        with tempfile.TemporaryDirectory() as directory:
+            path = self._write(directory, 'sections.json', json.dumps(rows))
+
+            out = StringIO()
+            call_command('import_sections_file', path, '--update-existing', '--dry-run', stdout=out)
+            self.assertIn('Dry run', out.getvalue())
+            self.assertEqual(Section.objects.count(), 1)
+            self.assertEqual(Subsection.objects.count(), 1)
+
+            with self.assertNumQueries(11):
+                call_command('import_sections_file', path, '--update-existing', stdout=StringIO(), stderr=StringIO())
+
+        existing.refresh_from_db()
+        self.assertEqual(existing.description, 'Administrative section')
+        self.assertTrue(existing.directly_under_ag)
+        self.assertEqual(
+            set(Subsection.objects.values_list('section__name', 'name', 'description')),
+            {
+                ('Admin', 'Admin-1', 'First admin subsection'),
+                ('Admin', 'Admin-2', 'Second admin subsection'),
+                ('Finance', 'Finance-A', ''),
+            },
+        )
@@ -8,10 +8,12 @@ from django.db import transaction
 from django.shortcuts import render, redirect
 from django.urls import path
 from django import forms
+from jobs.queue import enqueue
 from .import_jobs import start_user_import_job
 from .models import User, SignupRequest, UserImportJob
 from sections.models import Section, Subsection
-from records.models import MailRecord, MailAssignment, AssignmentRemark, RecordAttachment
+from records.models import MailRecord, MailAssignment, AssignmentRemark, PdfBlob, RecordAttachment
+from records.visibility import is_scoped_role, sync_created_mail_visibility, sync_user_visibility
 from audit.models import AuditTrail
 from returns.models import ReturnApplicability, ReturnDefinition, ReturnPeriodEntry, ReturnStatusLog
 
@@ -54,6 +56,14 @@ class UserAdmin(BaseUserAdmin):
         return '-'
     get_sections_display.short_description = 'Sections'
 
+    def save_model(self, request, obj, form, change):
+        super().save_model(request, obj, form, change)
+        if change and form.changed_data and {'role', 'subsection'} & set(form.changed_data):
+            # Role/subsection drive SrAO/AAO subsection visibility grants.
+            sync_user_visibility(obj)
+            if 'role' in form.changed_data:
+                sync_created_mail_visibility(obj)
+
     def get_urls(self):
         urls = super().get_urls()
         custom_urls = [
@@ -71,14 +81,14 @@ class UserAdmin(BaseUserAdmin):
                 ext = file.name.split('.')[-1].lower()
 
                 try:
-                    content = file.read().decode('utf-8-sig' if ext == 'csv' else 'utf-8')
+                    # Saved to storage as uploaded; the worker streams rows from it.
                     job = UserImportJob.objects.create(
                         original_filename=file.name,
                         file_format=ext,
-                        payload=content,
+                        source=file,
                         created_by=request.user,
                     )
-                    transaction.on_commit(lambda: start_user_import_job(job.id))
+                    start_user_import_job(job.id)
                     messages.success(
                         request,
                         f'Import started in background as job #{job.id}. Refresh this page to see progress.'
@@ -128,24 +138,26 @@ class UserAdmin(BaseUserAdmin):
                 'users': User.objects.filter(is_superuser=False).count(),
             }
 
-            attachment_blobs = []
-            for attachment in RecordAttachment.objects.only('file'):
-                if attachment.file and attachment.file.name:
-                    attachment_blobs.append((attachment.file.storage, attachment.file.name))
-
-            cleanup_failures = []
+            # Every attachment goes, so every PdfBlob loses its last reference. Files
+            # stored before deduplication belong to a single attachment.
+            attachment_blobs = {
+                name for name in RecordAttachment.objects.filter(content_hash='').values_list('file', flat=True)
+                if name
+            }
+            attachment_blobs.update(PdfBlob.objects.values_list('name', flat=True))
+            import_files = [name for name in UserImportJob.objects.values_list('source', flat=True) if name]
 
-            def cleanup_attachment_blobs():
-                for storage, file_name in attachment_blobs:
-                    try:
-                        storage.delete(file_name)
-                    except Exception:
-                        cleanup_failures.append(file_name)
+            def delete_import_files():
+                storage = UserImportJob._meta.get_field('source').storage
+                for name in import_files:
+                    storage.delete(name)
 
             with transaction.atomic():
                 AssignmentRemark.objects.all().delete()
                 MailAssignment.objects.all().delete()
                 AuditTrail.objects.all().delete()
+                # Blobs first, so releasing each attachment's reference has nothing left to queue.
+                PdfBlob.objects.all().delete()
                 RecordAttachment.objects.all().delete()
                 MailRecord.objects.all().delete()
                 ReturnStatusLog.objects.all().delete()
@@ -157,7 +169,9 @@ class UserAdmin(BaseUserAdmin):
                 User.objects.filter(is_superuser=False).delete()
                 Subsection.objects.all().delete()
                 Section.objects.all().delete()
-                transaction.on_commit(cleanup_attachment_blobs)
+                if attachment_blobs:
+                    enqueue('records.delete_blobs', {'names': sorted(attachment_blobs)})
+                transaction.on_commit(delete_import_files)
 
             messages.success(
                 request,
@@ -179,10 +193,10 @@ class UserAdmin(BaseUserAdmin):
                     f"{summary['users']} non-superuser users."
                 )
             )
-            if cleanup_failures:
-                messages.warning(
+            if attachment_blobs:
+                messages.info(
                     request,
-                    f'Database reset completed, but {len(cleanup_failures)} attachment file(s) could not be removed from storage.'
+                    f'{len(attachment_blobs)} attachment file(s) will be removed from storage by the background workers.'
                 )
             return redirect('admin:users_user_changelist')
 
@@ -194,8 +208,12 @@ class UserAdmin(BaseUserAdmin):
 
     def _import_from_csv(self, file):
         """Import users from CSV file"""
-        # Read CSV file
-        text_file = TextIOWrapper(file, encoding='utf-8')
+        reader = self._csv_reader(TextIOWrapper(file, encoding='utf-8'))
+        rows = list(reader)
+        return self._import_rows(rows, row_start=2)
+
+    def _csv_reader(self, text_file):
+        """DictReader over a text stream, after checking the required columns."""
         reader = csv.DictReader(text_file)
 
         # Validate required columns
@@ -207,19 +225,20 @@ class UserAdmin(BaseUserAdmin):
         missing = [col for col in required_columns if col not in normalized_fieldnames]
         if missing:
             raise ValueError(f'Missing required columns: {", ".join(missing)}. Optional: sections (for DAG), subsection (for SrAO/AAO)')
-
-        rows = list(reader)
-        return self._import_rows(rows, row_start=2)
+        return reader
 
     def _import_from_json(self, file):
         """Import users from JSON file"""
         # Read JSON file
         content = file.read().decode('utf-8')
+        return self._import_rows(self._json_rows(content), row_start=1)
+
+    def _json_rows(self, content):
         data = json.loads(content)
 
         if not isinstance(data, list):
             raise ValueError('JSON must be an array of user objects')
-        return self._import_rows(data, row_start=1)
+        return data
 
     def _normalize_role(self, role_value):
         role_raw = str(role_value or '').strip()
@@ -284,6 +303,13 @@ class UserAdmin(BaseUserAdmin):
             return full_name
         return (username or '').strip()
 
+    def _normalize_row(self, row):
+        normalized_row = {}
+        for key, value in (row or {}).items():
+            normalized_key = str(key or '').strip().lstrip('\ufeff').lower()
+            normalized_row[normalized_key] = '' if value is None else str(value).strip()
+        return normalized_row
+
     def _import_rows(self, rows, row_start=1):
         results = {'created': [], 'errors': [], 'skipped': []}
         if not rows:
@@ -296,8 +322,18 @@ class UserAdmin(BaseUserAdmin):
         for subsection in subsection_items:
             subsection_by_name.setdefault(subsection.name, []).append(subsection)
 
-        existing_usernames = set(User.objects.values_list('username', flat=True))
-        existing_emails = set(User.objects.values_list('email', flat=True))
+        normalized_rows = [self._normalize_row(row) for row in rows]
+        # Only the usernames/emails in this batch are checked, so chunked imports stay small.
+        existing_usernames = set(
+            User.objects.filter(
+                username__in={row.get('username', '') for row in normalized_rows}
+            ).values_list('username', flat=True)
+        )
+        existing_emails = set(
+            User.objects.filter(
+                email__in={row.get('email', '') for row in normalized_rows}
+            ).values_list('email', flat=True)
+        )
         pending_usernames = set()
         pending_emails = set()
         pending_users = []
@@ -305,14 +341,9 @@ class UserAdmin(BaseUserAdmin):
         auditor_subsection_map = {}
         pending_user_map = {}
 
-        for idx, row in enumerate(rows):
+        for idx, normalized_row in enumerate(normalized_rows):
             row_num = row_start + idx
 
-            normalized_row = {}
-            for key, value in (row or {}).items():
-                normalized_key = str(key or '').strip().lstrip('\ufeff').lower()
-                normalized_row[normalized_key] = '' if value is None else str(value).strip()
-
             username = normalized_row.get('username', '').strip()
             email = normalized_row.get('email', '').strip()
             password = normalized_row.get('password', '').strip()
@@ -439,6 +470,10 @@ class UserAdmin(BaseUserAdmin):
                     u.username: u
                     for u in User.objects.filter(username__in=pending_usernames)
                 }
+                # bulk_create skips post_save, which grants new users their visibility.
+                for user in created_users.values():
+                    if is_scoped_role(user):
+                        sync_user_visibility(user)
         except Exception as bulk_exc:
             results['errors'].append(
                 f'Bulk create failed. Falling back to row-wise import: {bulk_exc}'
@@ -448,7 +483,9 @@ class UserAdmin(BaseUserAdmin):
                 if not user_obj:
                     continue
                 try:
-                    user_obj.save()
+                    # Savepoint per row: a failed INSERT must not poison the caller's transaction.
+                    with transaction.atomic():
+                        user_obj.save()
                     created_users[username] = user_obj
                 except Exception as row_exc:
                     results['errors'].append(
@@ -587,6 +624,8 @@ class UserImportJobAdmin(admin.ModelAdmin):
         'original_filename',
         'file_format',
         'status',
+        'processed_rows',
+        'total_rows',
         'created_count',
         'skipped_count',
         'error_count',
@@ -599,18 +638,28 @@ class UserImportJobAdmin(admin.ModelAdmin):
     readonly_fields = [
         'original_filename',
         'file_format',
-        'payload',
+        'source',
         'status',
         'created_by',
         'created_at',
         'started_at',
         'finished_at',
+        'total_rows',
+        'processed_rows',
         'created_count',
         'skipped_count',
         'error_count',
         'summary',
         'failure_message',
     ]
+    actions = ['resume_jobs']
 
     def has_add_permission(self, request):
         return False
+
+    @admin.action(description='Resume selected failed imports')
+    def resume_jobs(self, request, queryset):
+        job_ids = list(queryset.filter(status='failed').values_list('id', flat=True))
+        for job_id in job_ids:
+            start_user_import_job(job_id)
+        self.message_user(request, f'Resuming {len(job_ids)} import job(s).', messages.SUCCESS)
@@ -0,0 +1,101 @@
+"""
+JWT authentication with a process-local user cache.
+
+Each request still does one primary-key probe for (scope_version, is_active,
+password). Only when scope_version has moved (a change to one of
+User.SCOPE_FIELDS, section/subsection membership or section edits) is the full
+user reloaded. So role and section changes apply on the very next request,
+while the unchanged case skips the user, subsection, sections and
+auditor_subsections loads. Other profile edits (e.g. full_name) show up once
+the cached entry's short TTL runs out.
+"""
+import copy
+import threading
+import time
+from collections import OrderedDict
+
+from django.contrib.auth import get_user_model
+from django.utils.translation import gettext_lazy as _
+from rest_framework_simplejwt.authentication import JWTAuthentication
+from rest_framework_simplejwt.exceptions import AuthenticationFailed, InvalidToken
+from rest_framework_simplejwt.settings import api_settings
+from rest_framework_simplejwt.utils import get_md5_hash_password
+
+from .scope import load_scope_sets
+
+
+USER_CACHE_TTL_SECONDS = 60
+USER_CACHE_MAX_ENTRIES = 2048
+
+
+class UserCache:
+    """LRU of {user_id: (scope_version, user, scope_sets, stored_at)} with a short TTL."""
+
+    def __init__(self, ttl=USER_CACHE_TTL_SECONDS, max_entries=USER_CACHE_MAX_ENTRIES):
+        self.ttl = ttl
+        self.max_entries = max_entries
+        self._lock = threading.Lock()
+        self._entries = OrderedDict()
+
+    def get(self, user_id, scope_version):
+        with self._lock:
+            entry = self._entries.get(user_id)
+            if entry is None:
+                return None
+            version, user, scope_sets, stored_at = entry
+            if version != scope_version or time.monotonic() - stored_at > self.ttl:
+                del self._entries[user_id]
+                return None
+            self._entries.move_to_end(user_id)
+            return user, scope_sets
+
+    def put(self, user_id, scope_version, user, scope_sets):
+        with self._lock:
+            self._entries[user_id] = (scope_version, user, scope_sets, time.monotonic())
+            self._entries.move_to_end(user_id)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+
+user_cache = UserCache()
+
+
+class CachedJWTAuthentication(JWTAuthentication):
+    def get_user(self, validated_token):
+        try:
+            user_id = validated_token[api_settings.USER_ID_CLAIM]
+        except KeyError as e:
+            raise InvalidToken(_("Token contained no recognizable user identification")) from e
+
+        User = get_user_model()
+        probe = User.objects.filter(**{api_settings.USER_ID_FIELD: user_id}).values_list(
+            'id', 'scope_version', 'is_active', 'password'
+        ).first()
+        if probe is None:
+            raise AuthenticationFailed(_("User not found"), code="user_not_found")
+        pk, scope_version, is_active, password = probe
+
+        if api_settings.CHECK_USER_IS_ACTIVE and not is_active:
+            raise AuthenticationFailed(_("User is inactive"), code="user_inactive")
+        if api_settings.CHECK_REVOKE_TOKEN:
+            if validated_token.get(api_settings.REVOKE_TOKEN_CLAIM) != get_md5_hash_password(password):
+                raise AuthenticationFailed(
+                    _("The user's password has been changed."), code="password_changed"
+                )
+
+        cached = user_cache.get(pk, scope_version)
+        if cached is None:
+            user = User.objects.select_related('subsection__section').get(pk=pk)
+            scope_sets = load_scope_sets(user)
+            user_cache.put(pk, user.scope_version, user, scope_sets)
+        else:
+            user, scope_sets = cached
+
+        # Hand each request its own instance; the cached one is never mutated.
+        user = copy.copy(user)
+        user.__dict__['_scope_sets'] = scope_sets
+        return user
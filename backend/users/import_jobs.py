@@ -1,14 +1,21 @@
-from io import BytesIO
-import threading
+from io import TextIOWrapper
+from itertools import islice
+
+try:
+    import ijson
+except ImportError:  # without it a JSON import is parsed whole instead of streamed
+    ijson = None
 
 from django.contrib import admin
-from django.db import close_old_connections
+from django.db import close_old_connections, transaction
 from django.utils import timezone
 
+from jobs.queue import LeaseLost, enqueue, extend_lease
 from users.models import User, UserImportJob
 
 
 SUMMARY_PREVIEW_LIMIT = 20
+IMPORT_CHUNK_SIZE = 500
 
 
 def _build_preview(items, limit=SUMMARY_PREVIEW_LIMIT):
@@ -17,7 +24,35 @@ def _build_preview(items, limit=SUMMARY_PREVIEW_LIMIT):
     return items[:limit]
 
 
-def process_user_import_job(job_id):
+def _extend_preview(summary, key, items, limit=SUMMARY_PREVIEW_LIMIT):
+    preview = summary.get(key, [])
+    summary[key] = preview + _build_preview(items, limit - len(preview))
+
+
+def _json_rows(importer, source):
+    if ijson is None:
+        yield from importer._json_rows(source.read().decode('utf-8'))
+        return
+    events = ijson.parse(source, use_float=True)
+    _, event, _ = next(events, (None, None, None))
+    if event != 'start_array':
+        raise ValueError('JSON must be an array of user objects')
+    yield from ijson.items(events, 'item')
+
+
+def _job_rows(importer, job, source):
+    """(row iterator, number of the first data row), streamed from the job's open source file."""
+    if job.file_format == 'csv':
+        return importer._csv_reader(TextIOWrapper(source, encoding='utf-8-sig', newline='')), 2
+    return _json_rows(importer, source), 1
+
+
+def process_user_import_job(job_id, chunk_size=IMPORT_CHUNK_SIZE):
+    """
+    Import the job's rows in chunks of chunk_size, committing each chunk together
+    with the job's counters and a renewal of the worker's job lease. A failed job
+    resumes after its last committed chunk.
+    """
     close_old_connections()
 
     job = UserImportJob.objects.get(id=job_id)
@@ -33,56 +68,56 @@ def process_user_import_job(job_id):
         from users.admin import UserAdmin
 
         importer = UserAdmin(User, admin.site)
-        payload_bytes = job.payload.encode('utf-8')
-        if job.file_format == 'csv':
-            results = importer._import_from_csv(BytesIO(payload_bytes))
-        else:
-            results = importer._import_from_json(BytesIO(payload_bytes))
-
-        created = results.get('created', [])
-        skipped = results.get('skipped', [])
-        errors = results.get('errors', [])
+        with job.source.open('rb') as source:
+            rows, row_start = _job_rows(importer, job, source)
+            # Rows before processed_rows were committed by an earlier run.
+            rows = islice(rows, job.processed_rows, None)
+            while True:
+                chunk = list(islice(rows, chunk_size))
+                if not chunk:
+                    break
+                with transaction.atomic():
+                    if not extend_lease():
+                        raise LeaseLost(f'User import job {job.id} was claimed by another worker.')
+                    results = importer._import_rows(chunk, row_start=row_start + job.processed_rows)
+
+                    created = results.get('created', [])
+                    skipped = results.get('skipped', [])
+                    errors = results.get('errors', [])
+                    job.processed_rows += len(chunk)
+                    job.created_count += len(created)
+                    job.skipped_count += len(skipped)
+                    job.error_count += len(errors)
+                    _extend_preview(job.summary, 'created_preview', created)
+                    _extend_preview(job.summary, 'skipped_preview', skipped)
+                    _extend_preview(job.summary, 'error_preview', errors)
+                    job.save(
+                        update_fields=[
+                            'processed_rows',
+                            'created_count',
+                            'skipped_count',
+                            'error_count',
+                            'summary',
+                        ]
+                    )
 
         job.status = 'completed'
-        job.created_count = len(created)
-        job.skipped_count = len(skipped)
-        job.error_count = len(errors)
-        job.summary = {
-            'created_preview': _build_preview(created),
-            'skipped_preview': _build_preview(skipped),
-            'error_preview': _build_preview(errors),
-        }
+        # Counted while streaming; there is no separate pass over the file.
+        job.total_rows = job.processed_rows
+    except LeaseLost:
+        # Another worker resumed this import; its status is no longer ours to write.
+        close_old_connections()
+        raise
     except Exception as exc:
         job.status = 'failed'
         job.failure_message = str(exc)
-        job.error_count = 1
-        job.summary = {
-            'error_preview': [str(exc)],
-        }
-    finally:
-        job.finished_at = timezone.now()
-        job.save(
-            update_fields=[
-                'status',
-                'created_count',
-                'skipped_count',
-                'error_count',
-                'summary',
-                'failure_message',
-                'finished_at',
-            ]
-        )
-        close_old_connections()
 
+    job.finished_at = timezone.now()
+    job.save(update_fields=['status', 'failure_message', 'finished_at', 'total_rows'])
+    close_old_connections()
     return job
 
 
 def start_user_import_job(job_id):
-    worker = threading.Thread(
-        target=process_user_import_job,
-        args=(job_id,),
-        daemon=True,
-        name=f'user-import-job-{job_id}',
-    )
-    worker.start()
-    return worker
+    """Queue the import for the run_workers process (see users.tasks)."""
+    return enqueue('users.import_users', {'job_id': job_id}, key=str(job_id))
@@ -7,6 +7,7 @@ from django.contrib.auth.hashers import make_password
 from django.core.management.base import BaseCommand, CommandError
 from django.db import transaction
 
+from records.visibility import sync_created_mail_visibility, sync_user_visibility
 from users.admin import UserAdmin
 from users.models import User
 from sections.models import Section, Subsection
@@ -218,6 +219,7 @@ class Command(BaseCommand):
 
             with transaction.atomic():
                 if existing:
+                    previous_role = existing.role
                     existing.email = email
                     existing.password = make_password(password)
                     existing.full_name = full_name
@@ -237,6 +239,9 @@ class Command(BaseCommand):
                         existing.sections.clear()
                         existing.auditor_subsections.clear()
 
+                    sync_user_visibility(existing)
+                    if previous_role != role:
+                        sync_created_mail_visibility(existing)
                     results["updated"].append(username)
                 else:
                     user = User.objects.create(
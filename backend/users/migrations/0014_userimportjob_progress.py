@@ -0,0 +1,21 @@
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('users', '0013_user_scope_version'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='userimportjob',
+            name='total_rows',
+            field=models.PositiveIntegerField(default=0),
+        ),
+        migrations.AddField(
+            model_name='userimportjob',
+            name='processed_rows',
+            field=models.PositiveIntegerField(default=0, help_text='Rows committed so far; a failed job resumes after this row.'),
+        ),
+    ]
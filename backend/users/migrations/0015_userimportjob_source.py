@@ -0,0 +1,44 @@
+import users.models
+from django.core.files.base import ContentFile
+from django.db import migrations, models
+
+
+def move_payloads_to_files(apps, schema_editor):
+    UserImportJob = apps.get_model('users', 'UserImportJob')
+    for job in UserImportJob.objects.iterator():
+        job.source.save(
+            job.original_filename,
+            ContentFile(job.payload.encode('utf-8')),
+            save=False,
+        )
+        job.save(update_fields=['source'])
+
+
+def noop_reverse(apps, schema_editor):
+    pass
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('users', '0014_userimportjob_progress'),
+    ]
+
+    operations = [
+        migrations.RenameIndex(
+            model_name='userimportjob',
+            new_name='users_useri_status_c9d002_idx',
+            old_name='users_useri_status_0c3fce_idx',
+        ),
+        migrations.AddField(
+            model_name='userimportjob',
+            name='source',
+            field=models.FileField(default='', help_text='Original uploaded CSV/JSON file.', max_length=255, storage=users.models.get_import_storage, upload_to=users.models.import_upload_path),
+            preserve_default=False,
+        ),
+        migrations.RunPython(move_payloads_to_files, noop_reverse),
+        migrations.RemoveField(
+            model_name='userimportjob',
+            name='payload',
+        ),
+    ]
@@ -1,5 +1,10 @@
+import uuid
+
+from django.core.files.storage import storages
 from django.db import models
 from django.db import transaction
+from django.db.models.signals import m2m_changed, post_delete, post_save
+from django.dispatch import receiver
 from django.contrib.auth.models import AbstractUser
 from django.utils import timezone
 from sections.models import Section, Subsection
@@ -53,6 +58,8 @@ class User(AbstractUser):
     )
 
     full_name = models.CharField(max_length=100)
+    # Bumped on every change that can alter what the user may see (see SCOPE_FIELDS); keys the auth cache.
+    scope_version = models.PositiveIntegerField(default=0, editable=False)
     is_primary_ag = models.BooleanField(
         default=False,
         help_text="Use this AG as default monitoring fallback when multiple AG users exist."
@@ -72,12 +79,59 @@ class User(AbstractUser):
         display_role = self.actual_role or self.role
         return f"{self.full_name} ({display_role})"
 
+    # Concrete fields whose change can alter what the user may see or whether their token is
+    # still good; sections/auditor_subsections are bumped by the m2m_changed handler below.
+    SCOPE_FIELDS = ('role', 'subsection', 'is_active', 'password')
+
+    @classmethod
+    def from_db(cls, db, field_names, values):
+        instance = super().from_db(db, field_names, values)
+        instance._loaded_scope = instance._scope_values()
+        return instance
+
+    def _scope_values(self):
+        return {
+            name: self.__dict__.get(self._meta.get_field(name).attname, models.DEFERRED)
+            for name in self.SCOPE_FIELDS
+        }
+
     def save(self, *args, **kwargs):
         if not self.actual_role:
             self.actual_role = self.role
         if self.role != 'AG':
             self.is_primary_ag = False
+        scope = self._scope_values()
+        if self._state.adding:
+            super().save(*args, **kwargs)
+            self._loaded_scope = scope
+            return
+        update_fields = kwargs.get('update_fields')
+        if update_fields is None:
+            # Scope fields that still hold their loaded values are left out of the UPDATE,
+            # so a stale instance cannot write an old role back without bumping.
+            loaded = getattr(self, '_loaded_scope', None)
+            unchanged = {name for name in self.SCOPE_FIELDS if loaded and loaded[name] == scope[name]}
+            deferred = self.get_deferred_fields()
+            update_fields = [
+                field.name for field in self._meta.concrete_fields
+                if not field.primary_key and field.name not in unchanged and field.attname not in deferred
+            ]
+        update_fields = {*update_fields} - {'scope_version'}
+        kwargs['update_fields'] = update_fields
         super().save(*args, **kwargs)
+        self._loaded_scope = scope
+        if not update_fields & {*self.SCOPE_FIELDS, 'subsection_id'}:
+            return
+        # Bump scope_version in the database, never from this (possibly stale)
+        # instance, so two saves can never leave the same version behind.
+        User.objects.filter(pk=self.pk).update(scope_version=models.F('scope_version') + 1)
+        self.refresh_from_db(fields=['scope_version'])
+
+    @classmethod
+    def bump_scope_version(cls, *args, **filters):
+        """Invalidate cached auth/scope for every user matching the filters."""
+        user_ids = cls.objects.filter(*args, **filters).values('id')
+        return cls.objects.filter(id__in=user_ids).update(scope_version=models.F('scope_version') + 1)
 
     def is_ag(self):
         return self.role == 'AG'
@@ -186,6 +240,32 @@ class User(AbstractUser):
         return cls.objects.filter(role='AG', is_active=True).order_by('id').first()
 
 
+@receiver(m2m_changed, sender=User.sections.through)
+@receiver(m2m_changed, sender=User.auditor_subsections.through)
+def bump_scope_on_membership_change(sender, instance, action, reverse, pk_set, **kwargs):
+    if action not in ('post_add', 'post_remove', 'post_clear'):
+        return
+    if not reverse:
+        User.bump_scope_version(id=instance.pk)
+    elif pk_set:
+        User.bump_scope_version(id__in=pk_set)
+    elif action == 'post_clear':
+        # Cleared from the section/subsection side: pk_set is not reported.
+        User.bump_scope_version()
+
+
+@receiver(post_save, sender=Section)
+@receiver(post_delete, sender=Section)
+def bump_scope_on_section_change(sender, instance, **kwargs):
+    User.bump_scope_version(sections=instance.pk)
+
+
+@receiver(post_save, sender=Subsection)
+@receiver(post_delete, sender=Subsection)
+def bump_scope_on_subsection_change(sender, instance, **kwargs):
+    User.bump_scope_version(models.Q(subsection_id=instance.pk) | models.Q(auditor_subsections=instance.pk))
+
+
 class SignupRequest(models.Model):
     STATUS_CHOICES = [
         ('pending', 'Pending'),
@@ -316,6 +396,16 @@ class SignupRequest(models.Model):
         self.save(update_fields=['status', 'approved_by', 'reviewed_at', 'updated_at'])
 
 
+def get_import_storage():
+    """Storage for uploaded user import files (R2), shared by the web and worker processes."""
+    return storages["imports"]
+
+
+def import_upload_path(instance, filename):
+    """Store the upload as UUID.<format>; the original name is kept on the job."""
+    return f"{uuid.uuid4()}.{instance.file_format}"
+
+
 class UserImportJob(models.Model):
     STATUS_CHOICES = [
         ('queued', 'Queued'),
@@ -330,7 +420,12 @@ class UserImportJob(models.Model):
 
     original_filename = models.CharField(max_length=255)
     file_format = models.CharField(max_length=10, choices=FORMAT_CHOICES)
-    payload = models.TextField(help_text='Original uploaded CSV/JSON content.')
+    source = models.FileField(
+        upload_to=import_upload_path,
+        storage=get_import_storage,
+        max_length=255,
+        help_text='Original uploaded CSV/JSON file.',
+    )
     status = models.CharField(max_length=10, choices=STATUS_CHOICES, default='queued')
     created_by = models.ForeignKey(
         'User',
@@ -342,6 +437,11 @@ class UserImportJob(models.Model):
     created_at = models.DateTimeField(auto_now_add=True)
     started_at = models.DateTimeField(null=True, blank=True)
     finished_at = models.DateTimeField(null=True, blank=True)
+    total_rows = models.PositiveIntegerField(default=0)
+    processed_rows = models.PositiveIntegerField(
+        default=0,
+        help_text='Rows committed so far; a failed job resumes after this row.',
+    )
     created_count = models.PositiveIntegerField(default=0)
     skipped_count = models.PositiveIntegerField(default=0)
     error_count = models.PositiveIntegerField(default=0)
@@ -0,0 +1,99 @@
+"""
+Immutable snapshot of what a user manages, built once per request.
+
+Permission and visibility helpers used to ask `user.sections` /
+`user.auditor_subsections` / MailAssignment the same questions many times per
+request. UserScopeMixin rebuilds the snapshot right after authentication and
+stores it on the user instance; everything else reads it via get_user_scope().
+"""
+from dataclasses import dataclass
+from functools import cached_property
+
+from django.db.models import Q
+
+
+@dataclass(frozen=True)
+class UserScope:
+    user_id: int
+    role: str
+    subsection_id: int | None
+    section_ids: frozenset = frozenset()
+    auditor_subsection_ids: frozenset = frozenset()
+
+    @classmethod
+    def for_user(cls, user):
+        """
+        Load the scope, skipping what the role never uses. Section sets
+        preloaded by CachedJWTAuthentication are reused.
+        """
+        scope_sets = user.__dict__.get('_scope_sets')
+        if scope_sets is None:
+            scope_sets = load_scope_sets(user)
+        section_ids, auditor_subsection_ids = scope_sets
+        return cls(
+            user_id=user.id,
+            role=user.role,
+            subsection_id=user.subsection_id,
+            section_ids=section_ids,
+            auditor_subsection_ids=auditor_subsection_ids,
+        )
+
+    @cached_property
+    def active_assignment_mail_ids(self):
+        """
+        Mails with an Active assignment to this user. They change with other
+        users' actions, so they are read once per snapshot, and only when asked for.
+        """
+        from records.models import MailAssignment
+
+        if self.role == 'AG':
+            return frozenset()
+        return frozenset(
+            MailAssignment.objects.filter(
+                Q(assigned_to_id=self.user_id) | Q(reassigned_to_id=self.user_id),
+                status='Active',
+            ).values_list('mail_record_id', flat=True)
+        )
+
+    def manages_section(self, section_id):
+        return bool(section_id) and section_id in self.section_ids
+
+    def has_active_assignment(self, mail_record_id):
+        return mail_record_id in self.active_assignment_mail_ids
+
+
+def load_scope_sets(user):
+    """(managed section ids, auditor subsection ids) — the parts of the scope that scope_version guards."""
+    section_ids = frozenset()
+    auditor_subsection_ids = frozenset()
+    if user.role == 'DAG':
+        section_ids = frozenset(user.sections.values_list('id', flat=True))
+    if user.role == 'auditor':
+        auditor_subsection_ids = frozenset(user.auditor_subsections.values_list('id', flat=True))
+    return section_ids, auditor_subsection_ids
+
+
+def get_user_scope(user):
+    """The user's scope for this request; built on first use outside DRF views."""
+    scope = user.__dict__.get('_user_scope')
+    if scope is None or scope.user_id != user.id or scope.role != user.role:
+        scope = UserScope.for_user(user)
+        user.__dict__['_user_scope'] = scope
+    return scope
+
+
+def refresh_user_scope(user):
+    user.__dict__.pop('_user_scope', None)
+    return get_user_scope(user)
+
+
+class UserScopeMixin:
+    """
+    DRF view mixin: snapshot the caller's scope once, right after authentication,
+    so a user instance reused across requests never carries a stale scope.
+    """
+
+    def perform_authentication(self, request):
+        super().perform_authentication(request)
+        if request.user and request.user.is_authenticated:
+            refresh_user_scope(request.user)
@@ -0,0 +1,16 @@
+from datetime import timedelta
+
+from jobs.queue import task
+
+from .import_jobs import process_user_import_job
+from .models import UserImportJob
+
+
+@task('users.import_users', concurrency=1, timeout=timedelta(minutes=30))
+def import_users(job_id):
+    # Still 'running' here means the previous worker's lease ran out mid-import:
+    # resume after its last committed chunk.
+    UserImportJob.objects.filter(id=job_id, status='running').update(status='failed')
+    job = process_user_import_job(job_id)
+    if job.status == 'failed':
+        raise RuntimeError(job.failure_message)
@@ -1,20 +1,42 @@
+import json
 from io import BytesIO
 from unittest.mock import patch
 
 from django.contrib import admin
+from django.contrib.auth.models import update_last_login
+from django.core.files.base import ContentFile
+from django.core.files.storage import InMemoryStorage
+from django.db import IntegrityError
 from django.test import TestCase
 from django.urls import reverse
 from django.utils import timezone
 
+from rest_framework_simplejwt.tokens import AccessToken
+
+from jobs.queue import run_pending_jobs
+from users.authentication import CachedJWTAuthentication, user_cache
 from users.import_jobs import process_user_import_job
 from users.admin import UserAdmin
 from audit.models import AuditTrail
 from records.models import MailAssignment, MailRecord, RecordAttachment
 from sections.models import Section, Subsection
 from users.models import SignupRequest, User, UserImportJob
+from users.scope import get_user_scope
+
+
+def use_memory_import_storage(test):
+    """Point UserImportJob.source at an in-memory storage for the duration of the test."""
+    storage = InMemoryStorage()
+    patcher = patch.object(UserImportJob._meta.get_field('source'), 'storage', storage)
+    patcher.start()
+    test.addCleanup(patcher.stop)
+    return storage
 
 
 class UserImportTests(TestCase):
+    def setUp(self):
+        use_memory_import_storage(self)
+
     def test_csv_import_falls_back_to_username_when_full_name_missing(self):
         importer = UserAdmin(User, admin.site)
         csv_bytes = BytesIO(
@@ -34,9 +56,10 @@ class UserImportTests(TestCase):
         job = UserImportJob.objects.create(
             original_filename='users.csv',
             file_format='csv',
-            payload=(
-                "username,email,password,full_name,role,section,subsection\n"
-                "nan5,nan5@office.gov,secret,,Auditor,FAW,FAW\n"
+            source=ContentFile(
+                b"username,email,password,full_name,role,section,subsection\n"
+                b"nan5,nan5@office.gov,secret,,Auditor,FAW,FAW\n",
+                name='users.csv',
             ),
         )
 
@@ -49,9 +72,106 @@ class UserImportTests(TestCase):
         self.assertEqual(job.summary['created_preview'], ['nan5'])
         self.assertTrue(User.objects.filter(username='nan5').exists())
 
+    def test_import_job_commits_chunks_and_resumes_after_failure(self):
+        lines = ["username,email,password,full_name,role"]
+        lines += [f"chunk{i},chunk{i}@office.gov,secret,Chunk {i},clerk" for i in range(5)]
+        job = UserImportJob.objects.create(
+            original_filename='users.csv',
+            file_format='csv',
+            source=ContentFile(("\n".join(lines) + "\n").encode(), name='users.csv'),
+        )
+
+        original_import_rows = UserAdmin._import_rows
+        calls = []
+
+        def fail_on_second_chunk(importer, rows, row_start=1):
+            calls.append(row_start)
+            if len(calls) == 2:
+                raise RuntimeError('database went away')
+            return original_import_rows(importer, rows, row_start=row_start)
+
+        with patch.object(UserAdmin, '_import_rows', fail_on_second_chunk):
+            process_user_import_job(job.id, chunk_size=2)
+
+        job.refresh_from_db()
+        self.assertEqual(job.status, 'failed')
+        self.assertEqual((job.processed_rows, job.total_rows), (2, 0))
+        self.assertEqual(job.created_count, 2)
+        self.assertEqual(job.failure_message, 'database went away')
+        self.assertEqual(User.objects.filter(username__startswith='chunk').count(), 2)
+
+        process_user_import_job(job.id, chunk_size=2)
+
+        job.refresh_from_db()
+        self.assertEqual(job.status, 'completed')
+        self.assertEqual((job.processed_rows, job.total_rows), (5, 5))
+        self.assertEqual((job.created_count, job.skipped_count, job.error_count), (5, 0, 0))
+        self.assertEqual(job.summary['created_preview'], [f'chunk{i}' for i in range(5)])
+        self.assertEqual(User.objects.filter(username__startswith='chunk').count(), 5)
+
+    def test_row_fallback_reports_a_failed_row_and_keeps_the_chunk(self):
+        job = UserImportJob.objects.create(
+            original_filename='users.csv',
+            file_format='csv',
+            source=ContentFile(
+                b"username,email,password,full_name,role\n"
+                b"row1,row1@office.gov,secret,Row 1,clerk\n"
+                b"row2,row2@office.gov,secret,Row 2,clerk\n",
+                name='users.csv',
+            ),
+        )
+        User.objects.create_user(username='taken', password='x', email='taken@office.gov', full_name='Taken')
+        original_save = User.save
+
+        def save_colliding(user, *args, **kwargs):
+            # row1's email was taken after the duplicate checks ran (e.g. by a concurrent import).
+            if user.username == 'row1':
+                user.email = 'taken@office.gov'
+            return original_save(user, *args, **kwargs)
+
+        with patch.object(User.objects, 'bulk_create', side_effect=IntegrityError('bulk insert failed')), \
+                patch.object(User, 'save', save_colliding):
+            process_user_import_job(job.id)
+
+        job.refresh_from_db()
+        self.assertEqual(job.status, 'completed')
+        self.assertEqual((job.created_count, job.error_count), (1, 2))
+        self.assertTrue(any('row1' in error for error in job.summary['error_preview']))
+        self.assertTrue(User.objects.filter(username='row2').exists())
+
+    def test_json_import_job_streams_rows_from_the_stored_file(self):
+        rows = [
+            {'username': f'json{i}', 'email': f'json{i}@office.gov', 'password': 'secret',
+             'full_name': f'Json {i}', 'role': 'clerk'}
+            for i in range(3)
+        ]
+        job = UserImportJob.objects.create(
+            original_filename='users.json',
+            file_format='json',
+            source=ContentFile(json.dumps(rows).encode(), name='users.json'),
+        )
+
+        process_user_import_job(job.id, chunk_size=2)
+
+        job.refresh_from_db()
+        self.assertEqual(job.status, 'completed')
+        self.assertEqual((job.processed_rows, job.total_rows, job.created_count), (3, 3, 3))
+
+        not_a_list = UserImportJob.objects.create(
+            original_filename='users.json',
+            file_format='json',
+            source=ContentFile(json.dumps(rows[0]).encode(), name='users.json'),
+        )
+        process_user_import_job(not_a_list.id)
+
+        not_a_list.refresh_from_db()
+        self.assertEqual(not_a_list.status, 'failed')
+        self.assertEqual(not_a_list.failure_message, 'JSON must be an array of user objects')
+
 
 class UserAdminResetAllDataTests(TestCase):
     def setUp(self):
+        self.import_storage = use_memory_import_storage(self)
         self.superuser = User.objects.create_user(
             username='reset_admin',
             password='pass12345',
@@ -120,10 +240,10 @@ class UserAdminResetAllDataTests(TestCase):
             requested_section=self.section,
             requested_subsection=self.subsection,
         )
-        UserImportJob.objects.create(
+        self.import_job = UserImportJob.objects.create(
             original_filename='import.csv',
             file_format='csv',
-            payload='username,email,password,full_name,role\n',
+            source=ContentFile(b'username,email,password,full_name,role\n', name='import.csv'),
             created_by=self.superuser,
         )
 
@@ -137,6 +257,8 @@ class UserAdminResetAllDataTests(TestCase):
                 reverse('admin:users_reset_all_data'),
                 {'confirm': 'yes'},
             )
+            # Blob deletion is handed to the background job queue.
+            run_pending_jobs()
 
         self.assertEqual(response.status_code, 302)
         self.assertEqual(MailRecord.objects.count(), 0)
@@ -146,6 +268,81 @@ class UserAdminResetAllDataTests(TestCase):
         self.assertEqual(Subsection.objects.count(), 0)
         self.assertEqual(SignupRequest.objects.count(), 0)
         self.assertEqual(UserImportJob.objects.count(), 0)
+        self.assertFalse(self.import_storage.exists(self.import_job.source.name))
         self.assertEqual(User.objects.filter(is_superuser=False).count(), 0)
         self.assertTrue(User.objects.filter(id=self.superuser.id).exists())
         delete_mock.assert_called_once_with('pdfs/reset-test.pdf')
+
+
+class CachedJWTAuthenticationTests(TestCase):
+    def setUp(self):
+        user_cache.clear()
+        self.addCleanup(user_cache.clear)
+        self.section_a = Section.objects.create(name='Cache A')
+        self.section_b = Section.objects.create(name='Cache B')
+        self.dag = User.objects.create_user(
+            username='cache_dag',
+            password='pass12345',
+            email='cache_dag@example.com',
+            full_name='Cache DAG',
+            role='DAG',
+        )
+        self.dag.sections.set([self.section_a])
+        self.token = AccessToken.for_user(self.dag)
+        self.auth = CachedJWTAuthentication()
+
+    def test_cached_user_is_reused_until_scope_version_changes(self):
+        first = self.auth.get_user(self.token)
+        self.assertEqual(get_user_scope(first).section_ids, {self.section_a.id})
+
+        with self.assertNumQueries(1):
+            second = self.auth.get_user(self.token)
+        self.assertIsNot(second, first)
+        self.assertEqual(second.__dict__['_scope_sets'][0], {self.section_a.id})
+
+        self.dag.sections.add(self.section_b)
+        third = self.auth.get_user(self.token)
+        self.assertEqual(get_user_scope(third).section_ids, {self.section_a.id, self.section_b.id})
+
+        demoted = User.objects.get(pk=self.dag.pk)
+        demoted.role = 'SrAO'
+        demoted.save()
+        self.assertEqual(self.auth.get_user(self.token).role, 'SrAO')
+
+    def test_saves_from_stale_instances_still_bump_scope_version(self):
+        first = User.objects.get(pk=self.dag.pk)
+        second = User.objects.get(pk=self.dag.pk)
+        start = first.scope_version
+
+        first.role = 'AAO'
+        first.save()
+        second.role = 'SrAO'
+        second.save(update_fields=['role'])
+
+        self.assertEqual(second.scope_version, start + 2)
+        self.assertEqual(User.objects.get(pk=self.dag.pk).scope_version, start + 2)
+
+    def test_only_scope_field_changes_bump_scope_version(self):
+        start = User.objects.get(pk=self.dag.pk).scope_version
+        stale = User.objects.get(pk=self.dag.pk)
+
+        update_last_login(None, self.dag)
+        renamed = User.objects.get(pk=self.dag.pk)
+        renamed.full_name = 'Cache DAG Renamed'
+        renamed.save()
+        self.assertEqual(User.objects.get(pk=self.dag.pk).scope_version, start)
+
+        demoted = User.objects.get(pk=self.dag.pk)
+        demoted.role = 'SrAO'
+        demoted.save()
+        self.assertEqual(User.objects.get(pk=self.dag.pk).scope_version, start + 1)
+
+        # A full save from an instance loaded before the demotion leaves the role alone.
+        stale.full_name = 'Cache DAG Stale'
+        stale.save()
+        self.assertEqual(User.objects.get(pk=self.dag.pk).role, 'SrAO')
+        self.assertEqual(User.objects.get(pk=self.dag.pk).scope_version, start + 1)
+
+        stale.set_password('new-pass12345')
+        stale.save()
+        self.assertEqual(User.objects.get(pk=self.dag.pk).scope_version, start + 2)
@@ -1,4 +1,4 @@
-import React, { useState, useEffect, useMemo, useCallback } from 'react';
+import React, { useState, useEffect, useMemo, useCallback, useRef } from 'react';
 import { useNavigate } from 'react-router-dom';
 import {
   Alert,
@@ -27,6 +27,7 @@ import {
   VisibilityOutlined as VisibilityIcon,
 } from '@mui/icons-material';
 import mailService from '../services/mailService';
+import { subscribeToRecordEvents } from '../services/recordEvents';
 import StatusIndicator, { OverdueBadge } from '../components/StatusIndicator';
 import { PALETTE } from '../utils/constants';
 import { formatDate, calculateTimeInStage, isOverdue } from '../utils/dateHelpers';
@@ -177,8 +178,8 @@ const MailListPage = () => {
     loadSections();
   }, [user]);
 
-  const loadMails = async () => {
-    setLoading(true);
+  const loadMails = async ({ quiet = false } = {}) => {
+    if (!quiet) setLoading(true);
     setError('');
 
     try {
@@ -193,6 +194,23 @@ const MailListPage = () => {
     }
   };
 
+  // Live updates: refresh the current page (without the spinner) shortly after record activity.
+  const loadMailsRef = useRef(loadMails);
+  loadMailsRef.current = loadMails;
+
+  useEffect(() => {
+    let refreshTimer = null;
+    const unsubscribe = subscribeToRecordEvents(() => {
+      clearTimeout(refreshTimer);
+      refreshTimer = setTimeout(() => loadMailsRef.current({ quiet: true }), 1000);
+    });
+
+    return () => {
+      clearTimeout(refreshTimer);
+      unsubscribe();
+    };
+  }, []);
+
   const handleSort = (property) => {
     const isAsc = orderBy === property && order === 'asc';
     setOrder(isAsc ? 'desc' : 'asc');
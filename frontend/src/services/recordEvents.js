@@ -0,0 +1,67 @@
+import api from './api';
+import { EVENTS_BASE_URL } from '../utils/constants';
+
+const EVENT_TYPES = [
+  'mail.created',
+  'mail.reassigned',
+  'assignment.completed',
+  'mail.closed',
+  'resync',
+];
+const RETRY_DELAY_MS = 5000;
+
+/**
+ * Subscribe to live record activity (server-sent events).
+ * The stream URL needs a short-lived ticket, so every (re)connect fetches a new one.
+ * @param {Function} onEvent - Called with (type, data) for each event
+ * @returns {Function} unsubscribe
+ */
+export const subscribeToRecordEvents = (onEvent) => {
+  let source = null;
+  let retryTimer = null;
+  let closed = false;
+
+  const scheduleReconnect = () => {
+    if (closed) return;
+    clearTimeout(retryTimer);
+    retryTimer = setTimeout(connect, RETRY_DELAY_MS);
+  };
+
+  const connect = async () => {
+    if (closed) return;
+    let ticket;
+    try {
+      const response = await api.post('/records/events/ticket/');
+      ticket = response.data.ticket;
+    } catch (error) {
+      console.error('Error opening record events:', error);
+      scheduleReconnect();
+      return;
+    }
+    if (closed) return;
+
+    source = new EventSource(`${EVENTS_BASE_URL}/records/events/?ticket=${encodeURIComponent(ticket)}`);
+    EVENT_TYPES.forEach((type) => {
+      source.addEventListener(type, (event) => {
+        onEvent(type, event.data ? JSON.parse(event.data) : {});
+      });
+    });
+    // The server ends each stream after a while and tickets expire quickly: close instead of
+    // letting EventSource retry the stale URL, and reconnect with a new ticket.
+    source.onerror = () => {
+      source.close();
+      source = null;
+      scheduleReconnect();
+    };
+  };
+
+  connect();
+
+  return () => {
+    closed = true;
+    clearTimeout(retryTimer);
+    if (source) source.close();
+  };
+};
+
+export default subscribeToRecordEvents;
@@ -1,6 +1,8 @@
 import { THEME_TOKENS } from '../theme';
 
 export const API_BASE_URL = import.meta.env.VITE_API_BASE_URL || 'http://localhost:8000/api';
+// Record event stream (served by the backend's ASGI app); same origin as the API unless split out.
+export const EVENTS_BASE_URL = import.meta.env.VITE_EVENTS_BASE_URL || API_BASE_URL;
 
 export const ROLES = {
   AG: 'AG',
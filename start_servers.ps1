@@ -15,6 +15,10 @@ Write-Host ""
 Write-Host "Starting Django Backend Server..." -ForegroundColor Cyan
 Start-Process powershell -ArgumentList "-NoExit -Command `"cd '$backendDir'; python manage.py runserver`"" -WindowStyle Normal
 
+# Start the ASGI server for the live record event stream in a new window
+Write-Host "Starting Event Stream Server..." -ForegroundColor Cyan
+Start-Process powershell -ArgumentList "-NoExit -Command `"cd '$backendDir'; uvicorn config.asgi:application --port 8001 --lifespan off`"" -WindowStyle Normal
+
 # Wait a moment for backend to start
 Start-Sleep -Seconds 2
 
@@ -27,6 +31,7 @@ Write-Host "================================" -ForegroundColor Green
 Write-Host "Servers started successfully!" -ForegroundColor Green
 Write-Host ""
 Write-Host "Backend: http://localhost:8000/" -ForegroundColor Yellow
+Write-Host "Events: http://localhost:8001/api/records/events/" -ForegroundColor Yellow
 Write-Host "Frontend: http://localhost:5173/" -ForegroundColor Yellow
 Write-Host ""
 Write-Host "Close the individual server windows to stop them." -ForegroundColor Gray